@@ -86,7 +86,7 @@ def create_app():
          supports_credentials=True,
          allow_headers=["Content-Type", "Authorization", "Access-Control-Allow-Credentials"],
          methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-         expose_headers=["Content-Type", "Authorization"]
+         expose_headers=["Content-Type", "Authorization", "X-Next-Cursor"]
     )
     
     # Register blueprints
@@ -108,6 +108,10 @@ def create_app():
     app.register_blueprint(approvals.bp)
     app.register_blueprint(locations.bp)
     
+    # CLI commands
+    from app.commands import register_commands
+    register_commands(app)
+    
     # Create tables
     with app.app_context():
         db.create_all()
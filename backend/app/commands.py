@@ -0,0 +1,62 @@
+"""
+Flask CLI maintenance commands.
+Run with: flask <command> (FLASK_APP=run.py)
+"""
+import click
+
+
+def register_commands(app):
+    @app.cli.command('rebuild-scorecards')
+    def rebuild_scorecards_command():
+        """Backfill supplier scorecards from purchase order history."""
+        from app.utils.supplier_scorecards import rebuild_scorecards
+        count = rebuild_scorecards()
+        click.echo(f'Rebuilt {count} supplier scorecards')
+
+    @app.cli.command('purge-notifications')
+    @click.option('--days', type=int, default=None, help='Retention period (default NOTIFICATION_RETENTION_DAYS).')
+    def purge_notifications_command(days):
+        """Delete read notifications older than the retention period."""
+        from app.utils.notification_retention import purge_read_notifications, RETENTION_DAYS
+        deleted = purge_read_notifications(days if days is not None else RETENTION_DAYS)
+        click.echo(f'Deleted {deleted} read notifications')
+
+    @app.cli.command('archive-audit-logs')
+    @click.option('--months', type=int, default=None, help='Retention period (default AUDIT_LOG_RETENTION_MONTHS).')
+    def archive_audit_logs_command(months):
+        """Create upcoming audit log partitions and archive older months."""
+        from app.utils.audit_partitions import maintain_audit_logs, RETENTION_MONTHS
+        result = maintain_audit_logs(months if months is not None else RETENTION_MONTHS)
+        click.echo(f"Archived {result['archived']} {result['mode']} older than {result['cutoff']}")
+
+    @app.cli.command('snapshot-stock')
+    def snapshot_stock_command():
+        """Write a stock ledger snapshot run."""
+        from app.utils.stock_ledger import take_snapshot
+        run = take_snapshot()
+        if run is None:
+            click.echo('Latest snapshot is still current')
+        else:
+            click.echo(f'Snapshot {run.id}: {run.row_count} balances up to movement {run.watermark}')
+
+    @app.cli.command('snapshot-daily-stock')
+    def snapshot_daily_stock_command():
+        """Capture today's stock trend snapshot and apply snapshot retention."""
+        from app.utils.stock_trends import capture_daily_snapshot, downsample_daily_snapshots
+        captured = capture_daily_snapshot()
+        if captured is None:
+            click.echo("Today's snapshot was already captured")
+        else:
+            click.echo(f'Captured {captured} stock quantities')
+        click.echo(f'Downsampled {downsample_daily_snapshots()} old snapshot rows')
+
+    @app.cli.command('reconcile-stock-ledger')
+    @click.option('--apply', is_flag=True, help='Record correcting movements (opening balances on first run).')
+    def reconcile_stock_ledger_command(apply):
+        """Compare live stock quantities with the stock ledger."""
+        from app.utils.stock_ledger import reconcile_stock_ledger
+        differences = reconcile_stock_ledger(apply=apply)
+        for diff in differences:
+            place = f"warehouse {diff['warehouse_id']}" if diff['warehouse_id'] is not None else f"location {diff['location_id']}"
+            click.echo(f"item {diff['item_id']} at {place}: ledger {diff['ledger_quantity']}, actual {diff['actual_quantity']}")
+        click.echo(f"{len(differences)} differences{' corrected' if apply else ''}")
@@ -1,5 +1,6 @@
 from app import db
 from datetime import datetime
+from sqlalchemy import event, inspect, select, case
 from werkzeug.security import generate_password_hash, check_password_hash
 
 class User(db.Model):
@@ -140,10 +141,12 @@ class Stock(db.Model):
     item_id = db.Column(db.Integer, db.ForeignKey('items.id'), nullable=False)
     warehouse_id = db.Column(db.Integer, db.ForeignKey('warehouses.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False, default=0)
+    is_low_stock = db.Column(db.Boolean, nullable=False, default=False)  # quantity < item.reorder_level, see events below
     last_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    item = db.relationship('Item', backref='stock_records')
-    warehouse = db.relationship('Warehouse', backref='stock_records')
+    # Deleting an item or warehouse deletes its stock records (ON DELETE CASCADE in init.sql)
+    item = db.relationship('Item', backref=db.backref('stock_records', cascade='all, delete-orphan'))
+    warehouse = db.relationship('Warehouse', backref=db.backref('stock_records', cascade='all, delete-orphan'))
     
     def to_dict(self):
         return {
@@ -151,6 +154,7 @@ class Stock(db.Model):
             'item_id': self.item_id,
             'warehouse_id': self.warehouse_id,
             'quantity': self.quantity,
+            'is_low_stock': self.is_low_stock,
             'last_updated': self.last_updated.isoformat(),
             'item': self.item.to_dict() if self.item else None
         }
@@ -170,6 +174,7 @@ class PurchaseOrder(db.Model):
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     
     # Approval workflow fields
+    submitted_date = db.Column(db.DateTime)  # Last move to pending_approval
     approved_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     approved_date = db.Column(db.DateTime)
     rejected_by = db.Column(db.Integer, db.ForeignKey('users.id'))
@@ -179,6 +184,7 @@ class PurchaseOrder(db.Model):
     expected_delivery_date = db.Column(db.Date)
     actual_delivery_date = db.Column(db.Date)
     comments = db.Column(db.Text)
+    version = db.Column(db.Integer, nullable=False, default=1)  # Bumped on every workflow transition
     
     supplier = db.relationship('Supplier', backref='purchase_orders')
     warehouse = db.relationship('Warehouse', backref='purchase_orders')
@@ -197,6 +203,7 @@ class PurchaseOrder(db.Model):
             'expected_date': self.expected_date.isoformat() if self.expected_date else None,
             'total_amount': float(self.total_amount) if self.total_amount else 0,
             'created_by': self.created_by,
+            'submitted_date': self.submitted_date.isoformat() if self.submitted_date else None,
             'approved_by': self.approved_by,
             'approved_date': self.approved_date.isoformat() if self.approved_date else None,
             'rejected_by': self.rejected_by,
@@ -206,6 +213,7 @@ class PurchaseOrder(db.Model):
             'expected_delivery_date': self.expected_delivery_date.isoformat() if self.expected_delivery_date else None,
             'actual_delivery_date': self.actual_delivery_date.isoformat() if self.actual_delivery_date else None,
             'comments': self.comments,
+            'version': self.version,
             'lead_time_metrics': self.calculate_lead_times()
         }
     
@@ -237,6 +245,29 @@ class PurchaseOrder(db.Model):
         return metrics
 
 
+class PurchaseOrderLine(db.Model):
+    __tablename__ = 'purchase_order_lines'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    purchase_order_id = db.Column(db.Integer, db.ForeignKey('purchase_orders.id', ondelete='CASCADE'), nullable=False)
+    item_id = db.Column(db.Integer, db.ForeignKey('items.id'), nullable=False)
+    location_id = db.Column(db.Integer, db.ForeignKey('locations.id'))  # Location the quantity is meant to restock
+    quantity = db.Column(db.Integer, nullable=False)
+    unit_price = db.Column(db.Numeric(10, 2), nullable=False)
+    
+    purchase_order = db.relationship('PurchaseOrder', backref=db.backref('lines', cascade='all, delete-orphan'))
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'purchase_order_id': self.purchase_order_id,
+            'item_id': self.item_id,
+            'location_id': self.location_id,
+            'quantity': self.quantity,
+            'unit_price': float(self.unit_price)
+        }
+
+
 class SalesOrder(db.Model):
     __tablename__ = 'sales_orders'
     
@@ -289,6 +320,30 @@ class AuditLog(db.Model):
         }
 
 
+class AuditLogArchive(db.Model):
+    """Audit logs past the retention period (see app/utils/audit_partitions.py)"""
+    __tablename__ = 'audit_logs_archive'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer)
+    action = db.Column(db.String(100), nullable=False)
+    entity_type = db.Column(db.String(50))
+    entity_id = db.Column(db.Integer)
+    details = db.Column(db.Text)
+    timestamp = db.Column(db.DateTime, nullable=False)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'action': self.action,
+            'entity_type': self.entity_type,
+            'entity_id': self.entity_id,
+            'details': self.details,
+            'timestamp': self.timestamp.isoformat()
+        }
+
+
 class Location(db.Model):
     __tablename__ = 'locations'
     
@@ -321,6 +376,7 @@ class StockLocation(db.Model):
     quantity = db.Column(db.Integer, nullable=False, default=0)
     min_threshold = db.Column(db.Integer, default=10)
     max_threshold = db.Column(db.Integer)
+    is_low_stock = db.Column(db.Boolean, db.Computed('quantity < min_threshold', persisted=True))
     last_updated = db.Column(db.DateTime, default=datetime.utcnow)
     updated_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     
@@ -332,6 +388,7 @@ class StockLocation(db.Model):
             'quantity': self.quantity,
             'min_threshold': self.min_threshold,
             'max_threshold': self.max_threshold,
+            'is_low_stock': bool(self.is_low_stock),
             'last_updated': self.last_updated.isoformat() if self.last_updated else None,
             'updated_by': self.updated_by
         }
@@ -448,3 +505,201 @@ class ApprovalHistory(db.Model):
             'comments': self.comments,
             'timestamp': self.timestamp.isoformat()
         }
+
+
+class SupplierScorecard(db.Model):
+    __tablename__ = 'supplier_scorecards'
+    
+    supplier_id = db.Column(db.Integer, db.ForeignKey('suppliers.id', ondelete='CASCADE'), primary_key=True)
+    sent_orders = db.Column(db.Integer, nullable=False, default=0)
+    delivered_orders = db.Column(db.Integer, nullable=False, default=0)
+    on_time_eligible = db.Column(db.Integer, nullable=False, default=0)  # Delivered orders with an expected date
+    on_time_orders = db.Column(db.Integer, nullable=False, default=0)
+    total_delivery_days = db.Column(db.Integer, nullable=False, default=0)
+    delivery_days_orders = db.Column(db.Integer, nullable=False, default=0)  # Delivered orders with a sent date
+    total_spend = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    on_time_rate = db.Column(db.Float)
+    avg_delivery_days = db.Column(db.Float)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    supplier = db.relationship(
+        'Supplier',
+        backref=db.backref('scorecard', uselist=False, cascade='all, delete-orphan')
+    )
+    
+    def to_dict(self):
+        return {
+            'supplier_id': self.supplier_id,
+            'sent_orders': self.sent_orders,
+            'delivered_orders': self.delivered_orders,
+            'on_time_orders': self.on_time_orders,
+            'on_time_rate': self.on_time_rate,
+            'avg_delivery_days': self.avg_delivery_days,
+            'total_spend': float(self.total_spend or 0),
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class EmailOutbox(db.Model):
+    __tablename__ = 'email_outbox'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    to_email = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    claimed_at = db.Column(db.DateTime)
+    sent_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'to_email': self.to_email,
+            'subject': self.subject,
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            'sent_at': self.sent_at.isoformat() if self.sent_at else None
+        }
+
+
+class DashboardSummary(db.Model):
+    __tablename__ = 'dashboard_summary'
+    
+    warehouse_id = db.Column(db.Integer, primary_key=True)  # 0 = all warehouses
+    total_items = db.Column(db.Integer, nullable=False, default=0)  # Items with stock here (all items for 0)
+    total_stock = db.Column(db.BigInteger, nullable=False, default=0)
+    low_stock_items = db.Column(db.Integer, nullable=False, default=0)  # Stock records below reorder level
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'warehouse_id': self.warehouse_id,
+            'total_items': self.total_items,
+            'total_stock': int(self.total_stock),
+            'low_stock_items': self.low_stock_items,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class StockMovement(db.Model):
+    """Append-only stock ledger row (see app/utils/stock_ledger.py)"""
+    __tablename__ = 'stock_movements'
+    
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    # Plain ids rather than foreign keys: history outlives deleted items and places
+    item_id = db.Column(db.Integer, nullable=False)
+    warehouse_id = db.Column(db.Integer)  # Set for warehouse-level stock (stock table)
+    location_id = db.Column(db.Integer)  # Set for location-level stock (stock_locations table)
+    delta = db.Column(db.Integer, nullable=False)
+    quantity_after = db.Column(db.Integer, nullable=False)
+    reason = db.Column(db.String(30), nullable=False)  # adjustment, count, transfer, deleted, opening_balance, reconciliation, other
+    ref_type = db.Column(db.String(50))
+    ref_id = db.Column(db.Integer)
+    user_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'item_id': self.item_id,
+            'warehouse_id': self.warehouse_id,
+            'location_id': self.location_id,
+            'delta': self.delta,
+            'quantity_after': self.quantity_after,
+            'reason': self.reason,
+            'ref_type': self.ref_type,
+            'ref_id': self.ref_id,
+            'user_id': self.user_id,
+            'created_at': self.created_at.isoformat()
+        }
+
+
+class StockSnapshotRun(db.Model):
+    """One snapshot of every non-zero ledger balance, covering movements up to watermark"""
+    __tablename__ = 'stock_snapshot_runs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    watermark = db.Column(db.BigInteger, nullable=False, default=0)  # Last stock_movements.id included
+    covered_until = db.Column(db.DateTime, nullable=False)  # Every included movement is older than this
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'watermark': int(self.watermark),
+            'covered_until': self.covered_until.isoformat(),
+            'row_count': self.row_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class StockSnapshot(db.Model):
+    __tablename__ = 'stock_snapshots'
+    
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    run_id = db.Column(db.Integer, db.ForeignKey('stock_snapshot_runs.id', ondelete='CASCADE'), nullable=False)
+    item_id = db.Column(db.Integer, nullable=False)
+    warehouse_id = db.Column(db.Integer)
+    location_id = db.Column(db.Integer)
+    quantity = db.Column(db.Integer, nullable=False)
+
+
+class StockDailySnapshot(db.Model):
+    """Append-only daily on-hand quantity for trend reporting (see app/utils/stock_trends.py)"""
+    __tablename__ = 'stock_daily_snapshots'
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    snapshot_date = db.Column(db.Date, nullable=False)
+    item_id = db.Column(db.Integer, nullable=False)
+    warehouse_id = db.Column(db.Integer)  # Set for warehouse-level stock (stock table)
+    location_id = db.Column(db.Integer)  # Set for location-level stock (stock_locations table)
+    quantity = db.Column(db.Integer, nullable=False)
+
+    # One row per stock record per day; coalesce because NULLs never conflict in a unique index
+    __table_args__ = (
+        db.Index(
+            'uq_stock_daily_snapshots_record', snapshot_date, item_id,
+            db.func.coalesce(warehouse_id, 0), db.func.coalesce(location_id, 0), unique=True
+        ),
+    )
+
+
+# Low-stock flag maintenance: Stock.is_low_stock compares against the item's
+# reorder level, so it is kept in step on every stock write and whenever an
+# item's reorder level changes. (StockLocation.is_low_stock is a generated column.)
+
+@event.listens_for(Stock, 'before_insert')
+@event.listens_for(Stock, 'before_update')
+def _set_stock_low_flag(mapper, connection, target):
+    state = inspect(target)
+    if state.persistent and not (
+        state.attrs.quantity.history.has_changes() or state.attrs.item_id.history.has_changes()
+    ):
+        return
+    reorder_level = connection.execute(
+        select(Item.reorder_level).where(Item.id == target.item_id)
+    ).scalar()
+    quantity = target.quantity if target.quantity is not None else 0
+    target.is_low_stock = reorder_level is not None and quantity < reorder_level
+
+
+@event.listens_for(Item, 'after_update')
+def _refresh_stock_low_flags(mapper, connection, target):
+    if not inspect(target).attrs.reorder_level.history.has_changes():
+        return
+    stock = Stock.__table__
+    if target.reorder_level is None:
+        is_low = False
+    else:
+        is_low = case((stock.c.quantity < target.reorder_level, True), else_=False)
+    connection.execute(
+        stock.update().where(stock.c.item_id == target.id).values(is_low_stock=is_low)
+    )
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from datetime import datetime, timedelta
+from sqlalchemy import insert, case, func
 from app import db
 from app.models import PurchaseOrder, ApprovalHistory, AuditLog, User, Supplier
 from app.utils.decorators import role_required
@@ -10,31 +11,33 @@ from app.utils.email_templates import (
     get_approval_rejected_template,
     get_order_sent_template
 )
-from app.utils.email_sender import send_email
+from app.utils.email_outbox import queue_email
+from app.utils.workflow import WORKFLOW_PERMISSIONS
+from app.utils.supplier_scorecards import record_orders_sent, record_orders_delivered
+from app.utils.pagination import encode_cursor, decode_cursor, keyset_after, page_size, InvalidCursor
 
 bp = Blueprint('approvals', __name__, url_prefix='/api/approvals')
 
-# Permission matrix for workflow state transitions
-WORKFLOW_PERMISSIONS = {
-    'draft': {
-        'pending_approval': ['admin', 'manager'],
-    },
-    'pending_approval': {
-        'approved': ['admin'],
-        'rejected': ['admin'],
-        'draft': ['admin', 'manager'],  # Can return to draft
-    },
-    'approved': {
-        'sent_to_vendor': ['admin', 'manager'],
-    },
-    'sent_to_vendor': {
-        'delivered': ['admin', 'manager'],
-    },
-    'rejected': {
-        'draft': ['admin', 'manager'],  # Can resubmit
-    },
+# Audit action and details template for each target status
+TRANSITION_AUDIT = {
+    'pending_approval': ('SUBMIT_APPROVAL', 'Submitted PO {po_number} for approval'),
+    'approved': ('APPROVE', 'Approved PO {po_number}'),
+    'rejected': ('REJECT', 'Rejected PO {po_number}'),
+    'sent_to_vendor': ('SEND_TO_VENDOR', 'Sent PO {po_number} to vendor'),
+    'delivered': ('DELIVER', 'Marked PO {po_number} as delivered'),
+    'draft': ('RETURN_TO_DRAFT', 'Returned PO {po_number} to draft'),
 }
 
+MAX_BULK_ORDERS = 1000
+
+# Inbox age buckets: (label, lower bound in days, upper bound in days)
+INBOX_AGE_BUCKETS = (
+    ('under_1_day', 0, 1),
+    ('1_to_3_days', 1, 3),
+    ('3_to_7_days', 3, 7),
+    ('over_7_days', 7, None),
+)
+
 
 def can_transition(user_role, from_status, to_status):
     """Check if user role can perform status transition"""
@@ -45,113 +48,196 @@ def can_transition(user_role, from_status, to_status):
     return user_role in WORKFLOW_PERMISSIONS[from_status][to_status]
 
 
-@bp.route('/purchase-order/<int:order_id>/submit', methods=['POST'])
-@jwt_required()
-@role_required(['admin', 'manager'])
-def submit_for_approval(order_id):
-    """Submit PO for approval (draft -> pending_approval)"""
-    identity = get_jwt_identity()
-    user = User.query.get(int(identity))
-    
-    order = PurchaseOrder.query.get_or_404(order_id)
-    
-    if not can_transition(user.role, order.status, 'pending_approval'):
-        return jsonify({'error': 'Cannot submit this order for approval'}), 403
-    
-    old_status = order.status
-    order.status = 'pending_approval'
-    
-    # Create approval history
-    history = ApprovalHistory(
-        purchase_order_id=order.id,
-        user_id=int(identity),
-        from_status=old_status,
-        to_status='pending_approval',
-        comments=request.json.get('comments')
-    )
-    db.session.add(history)
-    
-    # Create audit log
-    log = AuditLog(
-        user_id=int(identity),
-        action='SUBMIT_APPROVAL',
-        entity_type='PurchaseOrder',
-        entity_id=order.id,
-        details=f'Submitted PO {order.po_number} for approval'
-    )
-    db.session.add(log)
-    db.session.commit()
-    
-    # Send email to admins
-    admins = User.query.filter_by(role='admin').all()
-    supplier = Supplier.query.get(order.supplier_id)
-    for admin in admins:
-        if admin.email:
-            subject, body = get_approval_request_template(
+def allowed_source_statuses(user_role, to_status):
+    """All statuses from which user role may move an order to to_status"""
+    return [
+        from_status for from_status, targets in WORKFLOW_PERMISSIONS.items()
+        if user_role in targets.get(to_status, [])
+    ]
+
+
+def transition_values(to_status, user_id, comments, now):
+    """Column values written by a transition to to_status"""
+    values = {'status': to_status}
+    if to_status == 'pending_approval':
+        values['submitted_date'] = now
+    elif to_status == 'approved':
+        values.update(approved_by=user_id, approved_date=now, comments=comments)
+    elif to_status == 'rejected':
+        values.update(rejected_by=user_id, rejected_date=now, comments=comments)
+    elif to_status == 'sent_to_vendor':
+        values['sent_date'] = now
+    elif to_status == 'delivered':
+        values['delivered_date'] = now
+    return values
+
+
+def queue_transition_emails(to_status, orders, comments=None):
+    """Queue workflow emails for orders moved to to_status, with one lookup per table"""
+    if to_status not in ('pending_approval', 'approved', 'rejected', 'sent_to_vendor') or not orders:
+        return
+    
+    suppliers = {
+        s.id: s for s in Supplier.query.filter(Supplier.id.in_({o.supplier_id for o in orders}))
+    }
+    
+    if to_status == 'pending_approval':
+        admins = [admin for admin in User.query.filter_by(role='admin') if admin.email]
+        for order in orders:
+            supplier = suppliers.get(order.supplier_id)
+            for admin in admins:
+                subject, body = get_approval_request_template(
+                    order.po_number,
+                    supplier.name if supplier else 'Unknown',
+                    float(order.total_amount) if order.total_amount else 0,
+                    admin.username
+                )
+                queue_email(admin.email, subject, body)
+    elif to_status == 'sent_to_vendor':
+        for order in orders:
+            supplier = suppliers.get(order.supplier_id)
+            if supplier and supplier.email:
+                subject, body = get_order_sent_template(
+                    order.po_number,
+                    supplier.name,
+                    supplier.email,
+                    float(order.total_amount) if order.total_amount else 0
+                )
+                queue_email(supplier.email, subject, body)
+    else:
+        requesters = {
+            u.id: u for u in User.query.filter(User.id.in_({o.created_by for o in orders if o.created_by}))
+        }
+        for order in orders:
+            requester = requesters.get(order.created_by)
+            if not requester or not requester.email:
+                continue
+            supplier = suppliers.get(order.supplier_id)
+            args = (
                 order.po_number,
                 supplier.name if supplier else 'Unknown',
                 float(order.total_amount) if order.total_amount else 0,
-                admin.username
+                requester.username
             )
-            send_email(admin.email, subject, body)
+            if to_status == 'approved':
+                subject, body = get_approval_granted_template(*args)
+            else:
+                subject, body = get_approval_rejected_template(*args, comments)
+            queue_email(requester.email, subject, body)
+
+
+# Columns returned by transition UPDATEs (used for history, scorecards and emails)
+TRANSITION_RETURNING = (
+    PurchaseOrder.id,
+    PurchaseOrder.po_number,
+    PurchaseOrder.supplier_id,
+    PurchaseOrder.total_amount,
+    PurchaseOrder.created_by,
+    PurchaseOrder.sent_date,
+    PurchaseOrder.delivered_date,
+    PurchaseOrder.expected_date,
+    PurchaseOrder.expected_delivery_date,
+    PurchaseOrder.actual_delivery_date,
+    PurchaseOrder.version,
+)
+
+
+def record_transitions(rows, from_status_by_id, to_status, user_id, comments, now):
+    """Write history/audit rows and side effects for orders moved to to_status"""
+    action, details = TRANSITION_AUDIT[to_status]
+    db.session.execute(insert(ApprovalHistory), [
+        {
+            'purchase_order_id': row.id,
+            'user_id': user_id,
+            'from_status': from_status_by_id[row.id],
+            'to_status': to_status,
+            'comments': comments,
+            'timestamp': now
+        }
+        for row in rows
+    ])
+    db.session.execute(insert(AuditLog), [
+        {
+            'user_id': user_id,
+            'action': action,
+            'entity_type': 'PurchaseOrder',
+            'entity_id': row.id,
+            'details': details.format(po_number=row.po_number),
+            'timestamp': now
+        }
+        for row in rows
+    ])
+    
+    if to_status == 'sent_to_vendor':
+        record_orders_sent(rows)
+    elif to_status == 'delivered':
+        record_orders_delivered(rows)
+    
+    queue_transition_emails(to_status, rows, comments)
+
+
+def apply_transition(order_id, to_status, forbidden_message):
+    """
+    Move one PO to to_status with a compare-and-set UPDATE.
+    The write only succeeds if the status and version are still the ones
+    the permission check saw, so concurrent clicks produce exactly one
+    transition and the loser gets 409 instead of a duplicate.
+    """
+    identity = int(get_jwt_identity())
+    user_role = get_jwt().get('role')
+    data = request.get_json(silent=True) or {}
+    comments = data.get('comments')
+    
+    order = PurchaseOrder.query.get_or_404(order_id)
+    from_status = order.status
+    expected_version = data.get('version', order.version)
+    
+    if not can_transition(user_role, from_status, to_status):
+        return jsonify({'error': forbidden_message}), 403
+    
+    now = datetime.utcnow()
+    values = transition_values(to_status, identity, comments, now)
+    values['version'] = PurchaseOrder.version + 1
+    
+    row = db.session.execute(
+        db.update(PurchaseOrder).where(
+            PurchaseOrder.id == order_id,
+            PurchaseOrder.status == from_status,
+            PurchaseOrder.version == expected_version
+        ).values(**values).returning(*TRANSITION_RETURNING),
+        execution_options={'synchronize_session': False}
+    ).first()
+    
+    if row is None:
+        db.session.rollback()
+        current = db.session.get(PurchaseOrder, order_id)
+        return jsonify({
+            'error': 'Order was modified by another request. Reload and try again.',
+            'status': current.status if current else None,
+            'version': current.version if current else None
+        }), 409
+    
+    record_transitions([row], {row.id: from_status}, to_status, identity, comments, now)
+    db.session.commit()
     
+    db.session.refresh(order)
     return jsonify(order.to_dict()), 200
 
 
+@bp.route('/purchase-order/<int:order_id>/submit', methods=['POST'])
+@jwt_required()
+@role_required(['admin', 'manager'])
+def submit_for_approval(order_id):
+    """Submit PO for approval (draft -> pending_approval)"""
+    return apply_transition(order_id, 'pending_approval', 'Cannot submit this order for approval')
+
+
 @bp.route('/purchase-order/<int:order_id>/approve', methods=['POST'])
 @jwt_required()
 @role_required(['admin'])
 def approve_order(order_id):
     """Approve PO (pending_approval -> approved)"""
-    identity = get_jwt_identity()
-    user = User.query.get(int(identity))
-    data = request.get_json()
-    
-    order = PurchaseOrder.query.get_or_404(order_id)
-    
-    if not can_transition(user.role, order.status, 'approved'):
-        return jsonify({'error': 'Cannot approve this order'}), 403
-    
-    old_status = order.status
-    order.status = 'approved'
-    order.approved_by = int(identity)
-    order.approved_date = datetime.utcnow()
-    order.comments = data.get('comments')
-    
-    # Create approval history
-    history = ApprovalHistory(
-        purchase_order_id=order.id,
-        user_id=int(identity),
-        from_status=old_status,
-        to_status='approved',
-        comments=data.get('comments')
-    )
-    db.session.add(history)
-    
-    # Create audit log
-    log = AuditLog(
-        user_id=int(identity),
-        action='APPROVE',
-        entity_type='PurchaseOrder',
-        entity_id=order.id,
-        details=f'Approved PO {order.po_number}'
-    )
-    db.session.add(log)
-    db.session.commit()
-    
-    # Send email to requester
-    requester = User.query.get(order.created_by)
-    supplier = Supplier.query.get(order.supplier_id)
-    if requester and requester.email:
-        subject, body = get_approval_granted_template(
-            order.po_number,
-            supplier.name if supplier else 'Unknown',
-            float(order.total_amount) if order.total_amount else 0,
-            requester.username
-        )
-        send_email(requester.email, subject, body)
-    
-    return jsonify(order.to_dict()), 200
+    return apply_transition(order_id, 'approved', 'Cannot approve this order')
 
 
 @bp.route('/purchase-order/<int:order_id>/reject', methods=['POST'])
@@ -159,56 +245,7 @@ def approve_order(order_id):
 @role_required(['admin'])
 def reject_order(order_id):
     """Reject PO (pending_approval -> rejected)"""
-    identity = get_jwt_identity()
-    user = User.query.get(int(identity))
-    data = request.get_json()
-    
-    order = PurchaseOrder.query.get_or_404(order_id)
-    
-    if not can_transition(user.role, order.status, 'rejected'):
-        return jsonify({'error': 'Cannot reject this order'}), 403
-    
-    old_status = order.status
-    order.status = 'rejected'
-    order.rejected_by = int(identity)
-    order.rejected_date = datetime.utcnow()
-    order.comments = data.get('comments')
-    
-    # Create approval history
-    history = ApprovalHistory(
-        purchase_order_id=order.id,
-        user_id=int(identity),
-        from_status=old_status,
-        to_status='rejected',
-        comments=data.get('comments')
-    )
-    db.session.add(history)
-    
-    # Create audit log
-    log = AuditLog(
-        user_id=int(identity),
-        action='REJECT',
-        entity_type='PurchaseOrder',
-        entity_id=order.id,
-        details=f'Rejected PO {order.po_number}'
-    )
-    db.session.add(log)
-    db.session.commit()
-    
-    # Send email to requester
-    requester = User.query.get(order.created_by)
-    supplier = Supplier.query.get(order.supplier_id)
-    if requester and requester.email:
-        subject, body = get_approval_rejected_template(
-            order.po_number,
-            supplier.name if supplier else 'Unknown',
-            float(order.total_amount) if order.total_amount else 0,
-            requester.username,
-            data.get('comments')
-        )
-        send_email(requester.email, subject, body)
-    
-    return jsonify(order.to_dict()), 200
+    return apply_transition(order_id, 'rejected', 'Cannot reject this order')
 
 
 @bp.route('/purchase-order/<int:order_id>/send', methods=['POST'])
@@ -216,51 +253,7 @@ def reject_order(order_id):
 @role_required(['admin', 'manager'])
 def send_to_vendor(order_id):
     """Send PO to vendor (approved -> sent_to_vendor)"""
-    identity = get_jwt_identity()
-    user = User.query.get(int(identity))
-    
-    order = PurchaseOrder.query.get_or_404(order_id)
-    
-    if not can_transition(user.role, order.status, 'sent_to_vendor'):
-        return jsonify({'error': 'Cannot send this order'}), 403
-    
-    old_status = order.status
-    order.status = 'sent_to_vendor'
-    order.sent_date = datetime.utcnow()
-    
-    # Create approval history
-    history = ApprovalHistory(
-        purchase_order_id=order.id,
-        user_id=int(identity),
-        from_status=old_status,
-        to_status='sent_to_vendor',
-        comments=request.json.get('comments')
-    )
-    db.session.add(history)
-    
-    # Create audit log
-    log = AuditLog(
-        user_id=int(identity),
-        action='SEND_TO_VENDOR',
-        entity_type='PurchaseOrder',
-        entity_id=order.id,
-        details=f'Sent PO {order.po_number} to vendor'
-    )
-    db.session.add(log)
-    db.session.commit()
-    
-    # Send email to supplier
-    supplier = Supplier.query.get(order.supplier_id)
-    if supplier and supplier.email:
-        subject, body = get_order_sent_template(
-            order.po_number,
-            supplier.name,
-            supplier.email,
-            float(order.total_amount) if order.total_amount else 0
-        )
-        send_email(supplier.email, subject, body)
-    
-    return jsonify(order.to_dict()), 200
+    return apply_transition(order_id, 'sent_to_vendor', 'Cannot send this order')
 
 
 @bp.route('/purchase-order/<int:order_id>/deliver', methods=['POST'])
@@ -268,56 +261,232 @@ def send_to_vendor(order_id):
 @role_required(['admin', 'manager'])
 def mark_delivered(order_id):
     """Mark PO as delivered (sent_to_vendor -> delivered)"""
-    identity = get_jwt_identity()
-    user = User.query.get(int(identity))
-    
-    order = PurchaseOrder.query.get_or_404(order_id)
-    
-    if not can_transition(user.role, order.status, 'delivered'):
-        return jsonify({'error': 'Cannot mark this order as delivered'}), 403
+    return apply_transition(order_id, 'delivered', 'Cannot mark this order as delivered')
+
+
+@bp.route('/purchase-orders/bulk', methods=['POST'])
+@jwt_required()
+@role_required(['admin', 'manager'])
+def bulk_transition():
+    """Move many POs to one target status in a single transaction"""
+    identity = int(get_jwt_identity())
+    user_role = get_jwt().get('role')
+    data = request.get_json() or {}
+    
+    to_status = data.get('status')
+    comments = data.get('comments')
+    try:
+        order_ids = list(dict.fromkeys(int(order_id) for order_id in data.get('order_ids') or []))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'order_ids must be a list of integers'}), 400
+    
+    if to_status not in TRANSITION_AUDIT:
+        return jsonify({'error': f'Invalid target status: {to_status}'}), 400
+    if not order_ids:
+        return jsonify({'error': 'order_ids is required'}), 400
+    if len(order_ids) > MAX_BULK_ORDERS:
+        return jsonify({'error': f'At most {MAX_BULK_ORDERS} orders per request'}), 400
+    
+    # Permission matrix is checked once for the whole batch
+    source_statuses = allowed_source_statuses(user_role, to_status)
+    if not source_statuses:
+        return jsonify({'error': f'Cannot move orders to {to_status}'}), 403
+    
+    now = datetime.utcnow()
+    values = transition_values(to_status, identity, comments, now)
+    values['version'] = PurchaseOrder.version + 1
+    
+    # One UPDATE per source status: rows are locked, re-checked and updated by the same statement
+    updated = []
+    from_status_by_id = {}
+    for from_status in source_statuses:
+        rows = db.session.execute(
+            db.update(PurchaseOrder).where(
+                PurchaseOrder.id.in_(order_ids),
+                PurchaseOrder.status == from_status
+            ).values(**values).returning(*TRANSITION_RETURNING),
+            execution_options={'synchronize_session': False}
+        ).all()
+        for row in rows:
+            from_status_by_id[row.id] = from_status
+        updated.extend(rows)
+    
+    if updated:
+        record_transitions(updated, from_status_by_id, to_status, identity, comments, now)
     
-    old_status = order.status
-    order.status = 'delivered'
-    order.delivered_date = datetime.utcnow()
+    db.session.commit()
     
-    # Create approval history
-    history = ApprovalHistory(
-        purchase_order_id=order.id,
-        user_id=int(identity),
-        from_status=old_status,
-        to_status='delivered',
-        comments=request.json.get('comments')
-    )
-    db.session.add(history)
+    # Classify the orders that were not updated
+    skipped_ids = [order_id for order_id in order_ids if order_id not in from_status_by_id]
+    current_status = dict(
+        db.session.query(PurchaseOrder.id, PurchaseOrder.status).filter(
+            PurchaseOrder.id.in_(skipped_ids)
+        ).all()
+    ) if skipped_ids else {}
+    
+    results = []
+    for order_id in order_ids:
+        if order_id in from_status_by_id:
+            results.append({
+                'id': order_id,
+                'outcome': 'updated',
+                'from_status': from_status_by_id[order_id],
+                'status': to_status
+            })
+        elif order_id not in current_status:
+            results.append({'id': order_id, 'outcome': 'not_found'})
+        else:
+            results.append({
+                'id': order_id,
+                'outcome': 'invalid_transition',
+                'status': current_status[order_id]
+            })
+    
+    return jsonify({
+        'status': to_status,
+        'requested': len(order_ids),
+        'updated': len(updated),
+        'results': results
+    }), 200
+
+
+@bp.route('/inbox', methods=['GET'])
+@jwt_required()
+@role_required(['admin', 'manager'])
+def approval_inbox():
+    """
+    Orders awaiting approval, oldest submission first.
+    Reads only pending rows through the partial index on
+    (submitted_date, id) WHERE status = 'pending_approval', with keyset
+    pagination so the cost does not grow with order history.
+    """
+    limit = page_size(request.args.get('limit'))
+    supplier_id = request.args.get('supplier_id', type=int)
+    warehouse_id = request.args.get('warehouse_id', type=int)
+    cursor = request.args.get('cursor')
+    
+    filters = [PurchaseOrder.status == 'pending_approval']
+    if supplier_id:
+        filters.append(PurchaseOrder.supplier_id == supplier_id)
+    if warehouse_id:
+        filters.append(PurchaseOrder.warehouse_id == warehouse_id)
+    
+    sort_columns = (PurchaseOrder.submitted_date, PurchaseOrder.id)
+    page_filters = list(filters)
+    if cursor:
+        try:
+            page_filters.append(keyset_after(sort_columns, decode_cursor(cursor, datetime, int)))
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
+    
+    rows = db.session.query(
+        PurchaseOrder.id,
+        PurchaseOrder.po_number,
+        PurchaseOrder.supplier_id,
+        Supplier.name.label('supplier_name'),
+        PurchaseOrder.warehouse_id,
+        PurchaseOrder.total_amount,
+        PurchaseOrder.created_by,
+        User.username.label('requester'),
+        PurchaseOrder.order_date,
+        PurchaseOrder.submitted_date,
+        PurchaseOrder.version
+    ).join(
+        Supplier, Supplier.id == PurchaseOrder.supplier_id
+    ).outerjoin(
+        User, User.id == PurchaseOrder.created_by
+    ).filter(*page_filters).order_by(*sort_columns).limit(limit + 1).all()
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    # Age bucket counts over the whole queue (not just this page), one aggregate
+    now = datetime.utcnow()
+    bucket_columns = []
+    for label, lower, upper in INBOX_AGE_BUCKETS:
+        conditions = [PurchaseOrder.submitted_date <= now - timedelta(days=lower)]
+        if upper is not None:
+            conditions.append(PurchaseOrder.submitted_date > now - timedelta(days=upper))
+        bucket_columns.append(func.count(case((db.and_(*conditions), 1))).label(label))
+    counts = db.session.query(
+        func.count(PurchaseOrder.id).label('total'),
+        *bucket_columns
+    ).filter(*filters).one()
+    
+    orders = []
+    for row in rows:
+        age_hours = (now - row.submitted_date).total_seconds() / 3600 if row.submitted_date else None
+        orders.append({
+            'id': row.id,
+            'po_number': row.po_number,
+            'supplier_id': row.supplier_id,
+            'supplier_name': row.supplier_name,
+            'warehouse_id': row.warehouse_id,
+            'total_amount': float(row.total_amount) if row.total_amount else 0,
+            'created_by': row.created_by,
+            'requester': row.requester or 'Unknown',
+            'order_date': row.order_date.isoformat() if row.order_date else None,
+            'submitted_date': row.submitted_date.isoformat() if row.submitted_date else None,
+            'age_hours': round(age_hours, 1) if age_hours is not None else None,
+            'age_days': int(age_hours // 24) if age_hours is not None else None,
+            'version': row.version
+        })
     
-    # Create audit log
-    log = AuditLog(
-        user_id=int(identity),
-        action='DELIVER',
-        entity_type='PurchaseOrder',
-        entity_id=order.id,
-        details=f'Marked PO {order.po_number} as delivered'
-    )
-    db.session.add(log)
-    db.session.commit()
+    last = rows[-1] if rows else None
+    return jsonify({
+        'orders': orders,
+        'next_cursor': encode_cursor(last.submitted_date, last.id) if has_more else None,
+        'total': counts.total,
+        'age_buckets': {label: getattr(counts, label) for label, _, _ in INBOX_AGE_BUCKETS}
+    }), 200
+
+
+def load_histories(order_ids):
+    """
+    Approval history for the given POs with usernames, newest first,
+    from one query joined to users. Returns {order_id: [entries]}.
+    """
+    histories = {order_id: [] for order_id in order_ids}
+    rows = db.session.query(ApprovalHistory, User.username).outerjoin(
+        User, User.id == ApprovalHistory.user_id
+    ).filter(
+        ApprovalHistory.purchase_order_id.in_(order_ids)
+    ).order_by(
+        ApprovalHistory.purchase_order_id,
+        ApprovalHistory.timestamp.desc(),
+        ApprovalHistory.id.desc()
+    ).all()
     
-    return jsonify(order.to_dict()), 200
+    for entry, username in rows:
+        histories[entry.purchase_order_id].append({
+            **entry.to_dict(),
+            'username': username or 'Unknown'
+        })
+    return histories
 
 
 @bp.route('/purchase-order/<int:order_id>/history', methods=['GET'])
 @jwt_required()
 def get_approval_history(order_id):
     """Get approval history for a purchase order"""
-    history = ApprovalHistory.query.filter_by(purchase_order_id=order_id).order_by(
-        ApprovalHistory.timestamp.desc()
-    ).all()
-    
-    result = []
-    for h in history:
-        user = User.query.get(h.user_id)
-        result.append({
-            **h.to_dict(),
-            'username': user.username if user else 'Unknown'
-        })
-    
-    return jsonify(result), 200
+    return jsonify(load_histories([order_id])[order_id]), 200
+
+
+@bp.route('/purchase-orders/history', methods=['GET'])
+@jwt_required()
+def get_approval_histories():
+    """Get approval histories for many purchase orders (?ids=1,2,3) in one request"""
+    try:
+        order_ids = list(dict.fromkeys(
+            int(order_id) for order_id in request.args.get('ids', '').split(',') if order_id.strip()
+        ))
+    except ValueError:
+        return jsonify({'error': 'ids must be a comma-separated list of integers'}), 400
+    
+    if not order_ids:
+        return jsonify({'error': 'ids is required'}), 400
+    if len(order_ids) > MAX_BULK_ORDERS:
+        return jsonify({'error': f'At most {MAX_BULK_ORDERS} orders per request'}), 400
+    
+    histories = load_histories(order_ids)
+    return jsonify({str(order_id): entries for order_id, entries in histories.items()}), 200
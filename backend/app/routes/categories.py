@@ -1,8 +1,9 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
-from app.models import Category, AuditLog
+from app.models import Category
 from app.utils.decorators import role_required
+from app.utils.audit import log_action
 
 bp = Blueprint('categories', __name__, url_prefix='/api/categories')
 
@@ -39,16 +40,13 @@ def create_category():
     )
     
     db.session.add(category)
-    db.session.commit()
-    
-    log = AuditLog(
+    log_action(
         user_id=int(identity),
         action='CREATE',
         entity_type='Category',
-        entity_id=category.id,
+        entity=category,
         details=f'Created category: {category.name}'
     )
-    db.session.add(log)
     db.session.commit()
     
     return jsonify(category.to_dict()), 201
@@ -69,16 +67,13 @@ def update_category(category_id):
     if 'parent_id' in data:
         category.parent_id = data['parent_id']
     
-    db.session.commit()
-    
-    log = AuditLog(
+    log_action(
         user_id=int(identity),
         action='UPDATE',
         entity_type='Category',
-        entity_id=category.id,
+        entity=category,
         details=f'Updated category: {category.name}'
     )
-    db.session.add(log)
     db.session.commit()
     
     return jsonify(category.to_dict()), 200
@@ -91,14 +86,13 @@ def delete_category(category_id):
     category = Category.query.get_or_404(category_id)
     identity = get_jwt_identity()
     
-    log = AuditLog(
+    log_action(
         user_id=int(identity),
         action='DELETE',
         entity_type='Category',
-        entity_id=category.id,
+        entity=category,
         details=f'Deleted category: {category.name}'
     )
-    db.session.add(log)
     
     db.session.delete(category)
     db.session.commit()
@@ -1,8 +1,13 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
-from app.models import Item, Stock, AuditLog
+from app.models import Item, Stock
 from app.utils.decorators import role_required
+from app.utils.audit import log_action
+from app.utils.stock_ledger import set_movement_reason
+from app.utils.dashboard_summary import (
+    record_stock_change, record_item_created, record_reorder_level_change, record_item_deleted
+)
 
 bp = Blueprint('items', __name__, url_prefix='/api/items')
 
@@ -72,17 +77,15 @@ def create_item():
     )
     
     db.session.add(item)
-    db.session.commit()
-    
+    record_item_created()
     # Log the action
-    log = AuditLog(
+    log_action(
         user_id=int(identity),
         action='CREATE',
         entity_type='Item',
-        entity_id=item.id,
+        entity=item,
         details=f'Created item: {item.name}'
     )
-    db.session.add(log)
     db.session.commit()
     
     return jsonify(item.to_dict()), 201
@@ -108,20 +111,19 @@ def update_item(item_id):
         item.supplier_id = data['supplier_id']
     if 'unit_price' in data:
         item.unit_price = data['unit_price']
-    if 'reorder_level' in data:
+    if 'reorder_level' in data and data['reorder_level'] != item.reorder_level:
+        # Low-stock counts depend on the reorder level of every stock record of this item
+        record_reorder_level_change(item.id, item.reorder_level, data['reorder_level'])
         item.reorder_level = data['reorder_level']
     
-    db.session.commit()
-    
     # Log the action
-    log = AuditLog(
+    log_action(
         user_id=int(identity),
         action='UPDATE',
         entity_type='Item',
-        entity_id=item.id,
+        entity=item,
         details=f'Updated item: {item.name}'
     )
-    db.session.add(log)
     db.session.commit()
     
     return jsonify(item.to_dict()), 200
@@ -135,15 +137,15 @@ def delete_item(item_id):
     identity = get_jwt_identity()
     
     # Log before deletion
-    log = AuditLog(
+    log_action(
         user_id=int(identity),
         action='DELETE',
         entity_type='Item',
-        entity_id=item.id,
+        entity=item,
         details=f'Deleted item: {item.name}'
     )
-    db.session.add(log)
     
+    record_item_deleted(item.id)
     db.session.delete(item)
     db.session.commit()
     
@@ -166,6 +168,8 @@ def adjust_stock(item_id):
         warehouse_id=data['warehouse_id']
     ).first()
     
+    set_movement_reason('adjustment', user_id=int(identity))
+    new_record = stock is None
     if stock:
         old_quantity = stock.quantity
         stock.quantity += data['quantity']
@@ -178,17 +182,16 @@ def adjust_stock(item_id):
         old_quantity = 0
         db.session.add(stock)
     
-    db.session.commit()
-    
+    record_stock_change(stock.warehouse_id, old_quantity, stock.quantity, item.reorder_level, new_record)
     # Log the action
-    log = AuditLog(
+    log_action(
         user_id=int(identity),
         action='STOCK_ADJUSTMENT',
         entity_type='Stock',
-        entity_id=stock.id,
-        details=f'Adjusted stock for {item.name}: {old_quantity} -> {stock.quantity}'
+        entity=stock,
+        details=f'Adjusted stock for {item.name}: {old_quantity} -> {stock.quantity}',
+        buffered=True
     )
-    db.session.add(log)
     db.session.commit()
     
     return jsonify(stock.to_dict()), 200
@@ -1,8 +1,15 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
-from app.models import Location, StockLocation, StockTransfer, Item, AuditLog, User
+from app.models import Location, StockLocation, StockTransfer, Item, User
 from app.utils.decorators import role_required
+from app.utils.audit import log_action
+from app.utils.stock_ledger import set_movement_reason
+from app.utils.response_cache import invalidate_after_commit
+from app.utils.dashboard_summary import CACHE_NAMESPACE
+from app.utils.stock_transfers import apply_transfers, TransferError
+from app.utils.rebalancing import plan_rebalance, execute_plan, PLAN_COLUMNS
+from app.utils.pagination import page_size
 from sqlalchemy import or_, and_
 
 bp = Blueprint('locations', __name__, url_prefix='/api/locations')
@@ -50,14 +57,13 @@ def create_location():
     db.session.add(location)
     
     # Audit log
-    log = AuditLog(
+    log_action(
         user_id=int(identity),
         action='CREATE',
         entity_type='Location',
-        entity_id=None,
+        entity=location,
         details=f'Created location: {location.name}'
     )
-    db.session.add(log)
     db.session.commit()
     
     return jsonify(location.to_dict()), 201
@@ -77,14 +83,13 @@ def update_location(location_id):
     location.capacity = data.get('capacity', location.capacity)
     location.is_active = data.get('is_active', location.is_active)
     
-    log = AuditLog(
+    log_action(
         user_id=int(identity),
         action='UPDATE',
         entity_type='Location',
-        entity_id=location_id,
+        entity=location_id,
         details=f'Updated location: {location.name}'
     )
-    db.session.add(log)
     db.session.commit()
     
     return jsonify(location.to_dict()), 200
@@ -166,6 +171,7 @@ def set_stock_location():
     item_id = data['item_id']
     location_id = data['location_id']
     quantity = data['quantity']
+    set_movement_reason('count', user_id=int(identity))
     
     # Check if stock record exists
     stock = StockLocation.query.filter_by(
@@ -193,14 +199,15 @@ def set_stock_location():
     # Audit log
     item = Item.query.get(item_id)
     location = Location.query.get(location_id)
-    log = AuditLog(
+    log_action(
         user_id=int(identity),
         action=action,
         entity_type='StockLocation',
-        entity_id=stock.id if action == 'UPDATE' else None,
-        details=f'Set stock for {item.name} at {location.name}: {old_qty} → {quantity}'
+        entity=stock,
+        details=f'Set stock for {item.name} at {location.name}: {old_qty} → {quantity}',
+        buffered=True
     )
-    db.session.add(log)
+    invalidate_after_commit(db.session, CACHE_NAMESPACE)
     db.session.commit()
     
     return jsonify(stock.to_dict()), 201 if action == 'CREATE' else 200
@@ -214,80 +221,62 @@ def transfer_stock():
     identity = get_jwt_identity()
     data = request.get_json()
     
-    item_id = data['item_id']
-    from_location_id = data.get('from_location_id')
-    to_location_id = data['to_location_id']
-    quantity = data['quantity']
-    notes = data.get('notes', '')
-    
-    if quantity <= 0:
-        return jsonify({'error': 'Quantity must be positive'}), 400
-    
-    # Get source stock (if from_location_id exists)
-    if from_location_id:
-        from_stock = StockLocation.query.filter_by(
-            item_id=item_id,
-            location_id=from_location_id
-        ).first()
-        
-        if not from_stock or from_stock.quantity < quantity:
-            return jsonify({'error': 'Insufficient stock at source location'}), 400
-        
-        # Decrease source
-        from_stock.quantity -= quantity
-        from_stock.updated_by = int(identity)
-    
-    # Get or create destination stock
-    to_stock = StockLocation.query.filter_by(
-        item_id=item_id,
-        location_id=to_location_id
-    ).first()
-    
-    if to_stock:
-        to_stock.quantity += quantity
-        to_stock.updated_by = int(identity)
-    else:
-        to_stock = StockLocation(
-            item_id=item_id,
-            location_id=to_location_id,
-            quantity=quantity,
-            updated_by=int(identity)
-        )
-        db.session.add(to_stock)
-    
-    # Create transfer record
-    transfer = StockTransfer(
-        item_id=item_id,
-        from_location_id=from_location_id,
-        to_location_id=to_location_id,
-        quantity=quantity,
-        transferred_by=int(identity),
-        notes=notes,
-        status='completed'
-    )
-    db.session.add(transfer)
-    
-    # Audit log
-    item = Item.query.get(item_id)
-    from_loc = Location.query.get(from_location_id) if from_location_id else None
-    to_loc = Location.query.get(to_location_id)
-    
-    from_name = from_loc.name if from_loc else 'External'
-    details = f'Transferred {quantity} units of {item.name} from {from_name} to {to_loc.name}'
-    
-    log = AuditLog(
-        user_id=int(identity),
-        action='TRANSFER',
-        entity_type='StockTransfer',
-        entity_id=None,
-        details=details
-    )
-    db.session.add(log)
+    try:
+        transfer, = apply_transfers([{
+            'item_id': data['item_id'],
+            'from_location_id': data.get('from_location_id'),
+            'to_location_id': data['to_location_id'],
+            'quantity': data['quantity']
+        }], int(identity), notes=data.get('notes', ''))
+    except TransferError as e:
+        return jsonify({'error': str(e)}), 400
     db.session.commit()
     
     return jsonify(transfer.to_dict()), 201
 
 
+@bp.route('/rebalance', methods=['GET'])
+@jwt_required()
+@role_required(['admin', 'manager'])
+def get_rebalance_plan():
+    """
+    Proposed transfers from locations above max_threshold to locations
+    below min_threshold. Optional: item_id, location_id (only cover that
+    location's shortages), limit (transfers listed, largest first).
+    """
+    plan, summary = plan_rebalance(
+        item_id=request.args.get('item_id', type=int),
+        location_id=request.args.get('location_id', type=int)
+    )
+    top = plan.nlargest(page_size(request.args.get('limit')), 'quantity')
+    return jsonify({
+        'summary': summary,
+        'transfers': [{key: int(value) for key, value in row.items()} for row in top.to_dict('records')]
+    }), 200
+
+
+@bp.route('/rebalance', methods=['POST'])
+@jwt_required()
+@role_required(['admin', 'manager'])
+def execute_rebalance():
+    """
+    Execute a rebalancing plan in batches. Send the reviewed "transfers"
+    list, or item_id/location_id to plan and execute in one step.
+    """
+    data = request.get_json() or {}
+    transfers = data.get('transfers')
+    if transfers is None:
+        transfers, _ = plan_rebalance(item_id=data.get('item_id'), location_id=data.get('location_id'))
+    elif not isinstance(transfers, list) or any(
+        not isinstance(t, dict) or any(not isinstance(t.get(key), int) for key in PLAN_COLUMNS)
+        for t in transfers
+    ):
+        return jsonify({'error': 'transfers must be a list of {item_id, from_location_id, to_location_id, quantity}'}), 400
+    
+    result = execute_plan(transfers, int(get_jwt_identity()))
+    return jsonify(result), 200
+
+
 @bp.route('/transfers', methods=['GET'])
 @jwt_required()
 def get_transfers():
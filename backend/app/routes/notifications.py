@@ -1,24 +1,50 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, request, jsonify, Response, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity, decode_token
+from sqlalchemy import insert, select, literal, exists
 from app import db
-from app.models import Notification
-from datetime import datetime
+from app.models import Notification, User
+from app.utils.notification_counters import unread_count, adjust_unread, reset_unread
+from app.utils.notification_stream import event_stream, publish_event, publish_after_commit
+from app.utils.pagination import encode_cursor, decode_cursor, keyset_after, page_size, InvalidCursor
+from datetime import datetime, timedelta
+
+DEFAULT_DEDUPE_WINDOW = timedelta(hours=24)
 
 bp = Blueprint('notifications', __name__, url_prefix='/api/notifications')
 
 @bp.route('/', methods=['GET'])
 @jwt_required()
 def get_notifications():
+    """
+    Most recent notifications first (50 by default, ?limit= up to 200).
+    When more exist, the X-Next-Cursor header holds a cursor for ?cursor=
+    to browse older ones via the (user_id, created_at, id) index.
+    """
     user_id = int(get_jwt_identity())
+    limit = page_size(request.args.get('limit'))
+    cursor = request.args.get('cursor')
     
-    # Get recent notifications (last 50)
-    notifications = Notification.query.filter_by(
-        user_id=user_id
-    ).order_by(
-        Notification.created_at.desc()
-    ).limit(50).all()
+    query = Notification.query.filter_by(user_id=user_id)
+    if cursor:
+        try:
+            query = query.filter(keyset_after(
+                (Notification.created_at, Notification.id),
+                decode_cursor(cursor, datetime, int),
+                descending=True
+            ))
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
     
-    return jsonify([notification.to_dict() for notification in notifications]), 200
+    notifications = query.order_by(
+        Notification.created_at.desc(),
+        Notification.id.desc()
+    ).limit(limit + 1).all()
+    
+    response = jsonify([notification.to_dict() for notification in notifications[:limit]])
+    if len(notifications) > limit:
+        last = notifications[limit - 1]
+        response.headers['X-Next-Cursor'] = encode_cursor(last.created_at, last.id)
+    return response, 200
 
 
 @bp.route('/<int:notification_id>/read', methods=['POST'])
@@ -31,9 +57,18 @@ def mark_as_read(notification_id):
         user_id=user_id
     ).first_or_404()
     
-    notification.is_read = True
+    # Conditional update so concurrent requests decrement the counter only once
+    updated = Notification.query.filter_by(
+        id=notification_id,
+        is_read=False
+    ).update({'is_read': True}, synchronize_session=False)
+    if updated:
+        adjust_unread(user_id, -updated)
     db.session.commit()
     
+    if updated:
+        publish_event(user_id, 'unread_count', {'count': unread_count(user_id)})
+    
     return jsonify(notification.to_dict()), 200
 
 
@@ -46,8 +81,10 @@ def mark_all_as_read():
         user_id=user_id,
         is_read=False
     ).update({'is_read': True})
+    reset_unread(user_id)
     
     db.session.commit()
+    publish_event(user_id, 'unread_count', {'count': 0})
     
     return jsonify({'message': 'All notifications marked as read'}), 200
 
@@ -57,12 +94,43 @@ def mark_all_as_read():
 def get_unread_count():
     user_id = int(get_jwt_identity())
     
-    count = Notification.query.filter_by(
-        user_id=user_id,
-        is_read=False
-    ).count()
+    return jsonify({'count': unread_count(user_id)}), 200
+
+
+@bp.route('/stream', methods=['GET'])
+def stream_notifications():
+    """
+    Server-Sent Events stream of new notifications and unread count changes.
+    EventSource cannot send headers, so the access token is passed as ?token=
+    (refresh tokens are rejected).
+    Served by the gevent stream service so open connections do not hold sync workers.
+    """
+    token = request.args.get('token')
+    if not token:
+        return jsonify({'error': 'Missing token'}), 401
+    try:
+        claims = decode_token(token)
+    except Exception:
+        return jsonify({'error': 'Invalid token'}), 401
+    # Refresh tokens are long-lived and would end up in access logs
+    if claims.get('type') != 'access':
+        return jsonify({'error': 'Access token required'}), 401
+    
+    user = db.session.get(User, int(claims[current_app.config['JWT_IDENTITY_CLAIM']]))
+    if not user:
+        return jsonify({'error': 'User not found'}), 401
+    
+    user_id = user.id
+    initial_events = [('unread_count', {'count': unread_count(user_id)})]
     
-    return jsonify({'count': count}), 200
+    # Return the pooled connection now; the stream itself never touches the database
+    db.session.remove()
+    
+    return Response(
+        event_stream(user_id, initial_events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 
 # Helper function to create notifications (to be used by other routes)
@@ -82,5 +150,83 @@ def create_notification(user_id: int, notification_type: str, title: str, messag
         entity_id=entity_id
     )
     db.session.add(notification)
+    adjust_unread(user_id, 1)
     db.session.commit()
+    
+    publish_event(user_id, 'notification', {
+        **notification.to_dict(),
+        'unread_count': unread_count(user_id)
+    })
     return notification
+
+
+def notify_users(notification_type: str, title: str, message: str, user_ids=None, role: str = None,
+                 entity_type: str = None, entity_id: int = None,
+                 dedupe_window: timedelta = DEFAULT_DEDUPE_WINDOW, commit: bool = True) -> int:
+    """
+    Create the same notification for many users with one INSERT ... SELECT.
+    
+    Recipients are the given user_ids and/or every user with the given role.
+    Users who already received the same (type, entity_type, entity_id) within
+    dedupe_window are skipped (pass dedupe_window=None to disable).
+    Returns the number of notifications created; no ORM objects are loaded.
+    
+    Example:
+        notify_users('low_stock', 'Low Stock Alert', f'{item.name} is running low',
+                     role='manager', entity_type='Item', entity_id=item.id)
+    """
+    if not user_ids and not role:
+        return 0
+    
+    now = datetime.utcnow()
+    recipients = []
+    if user_ids:
+        recipients.append(User.id.in_(list(user_ids)))
+    if role:
+        recipients.append(User.role == role)
+    
+    conditions = [db.or_(*recipients)]
+    if dedupe_window is not None:
+        conditions.append(~exists().where(
+            Notification.user_id == User.id,
+            Notification.type == notification_type,
+            Notification.entity_type.is_not_distinct_from(entity_type),
+            Notification.entity_id.is_not_distinct_from(entity_id),
+            Notification.created_at >= now - dedupe_window
+        ))
+    
+    rows = select(
+        User.id,
+        literal(notification_type),
+        literal(title),
+        literal(message),
+        literal(False),
+        literal(entity_type, Notification.entity_type.type),
+        literal(entity_id, Notification.entity_id.type),
+        literal(now, Notification.created_at.type)
+    ).where(*conditions)
+    
+    created = db.session.execute(
+        insert(Notification).from_select(
+            ['user_id', 'type', 'title', 'message', 'is_read', 'entity_type', 'entity_id', 'created_at'],
+            rows
+        ).returning(Notification.id, Notification.user_id)
+    ).all()
+    
+    for notification_id, user_id in created:
+        adjust_unread(user_id, 1)
+        publish_after_commit(db.session, user_id, 'notification', {
+            'id': notification_id,
+            'user_id': user_id,
+            'type': notification_type,
+            'title': title,
+            'message': message,
+            'is_read': False,
+            'entity_type': entity_type,
+            'entity_id': entity_id,
+            'created_at': now.isoformat()
+        })
+    
+    if commit:
+        db.session.commit()
+    return len(created)
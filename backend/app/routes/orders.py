@@ -1,8 +1,14 @@
 from flask import Blueprint, request, jsonify
+from datetime import datetime
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
-from app.models import PurchaseOrder, SalesOrder, AuditLog
+from app.models import PurchaseOrder, SalesOrder, Warehouse
 from app.utils.decorators import role_required
+from app.utils.audit import log_action
+from app.utils.pagination import page_size
+from app.utils.replenishment import (
+    suggest_reorders, supplier_totals, create_draft_orders, WINDOW_DAYS, COVERAGE_DAYS
+)
 
 bp = Blueprint('orders', __name__, url_prefix='/api/orders')
 
@@ -18,7 +24,9 @@ def get_purchase_orders():
 @jwt_required()
 def get_purchase_order(order_id):
     order = PurchaseOrder.query.get_or_404(order_id)
-    return jsonify(order.to_dict()), 200
+    data = order.to_dict()
+    data['lines'] = [line.to_dict() for line in order.lines]
+    return jsonify(data), 200
 
 
 @bp.route('/purchase', methods=['POST'])
@@ -31,32 +39,99 @@ def create_purchase_order():
     if not data or not data.get('po_number') or not data.get('supplier_id') or not data.get('warehouse_id'):
         return jsonify({'error': 'Missing required fields'}), 400
     
+    status = data.get('status', 'pending')
     order = PurchaseOrder(
         po_number=data['po_number'],
         supplier_id=data['supplier_id'],
         warehouse_id=data['warehouse_id'],
-        status=data.get('status', 'pending'),
+        status=status,
         expected_date=data.get('expected_date'),
         total_amount=data.get('total_amount'),
-        created_by=int(identity)
+        created_by=int(identity),
+        submitted_date=datetime.utcnow() if status == 'pending_approval' else None
     )
     
     db.session.add(order)
-    db.session.commit()
-    
-    log = AuditLog(
+    log_action(
         user_id=int(identity),
         action='CREATE',
         entity_type='PurchaseOrder',
-        entity_id=order.id,
+        entity=order,
         details=f'Created purchase order: {order.po_number}'
     )
-    db.session.add(log)
     db.session.commit()
     
     return jsonify(order.to_dict()), 201
 
 
+def _replenishment_options(source):
+    """Engine keyword arguments from query args or a JSON body; raises ValueError"""
+    options = {
+        'location_id': source.get('location_id'),
+        'supplier_id': source.get('supplier_id'),
+        'window_days': source.get('window_days', WINDOW_DAYS),
+        'coverage_days': source.get('coverage_days', COVERAGE_DAYS),
+    }
+    options = {key: int(value) if value is not None else None for key, value in options.items()}
+    if options['window_days'] < 1 or options['coverage_days'] < 0:
+        raise ValueError('window_days must be positive and coverage_days not negative')
+    return options
+
+
+@bp.route('/replenishment', methods=['GET'])
+@jwt_required()
+@role_required(['admin', 'manager'])
+def get_replenishment_suggestions():
+    """
+    Suggested order quantities per item and location, largest value first,
+    with totals per supplier. Optional: location_id, supplier_id,
+    window_days, coverage_days, limit.
+    """
+    try:
+        options = _replenishment_options(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    suggestions = suggest_reorders(**options)
+    top = suggestions.nlargest(page_size(request.args.get('limit')), 'value')
+    columns = [
+        'item_id', 'location_id', 'supplier_id', 'quantity', 'min_threshold', 'max_threshold',
+        'daily_velocity', 'reorder_point', 'order_up_to', 'suggested_quantity', 'unit_price', 'value'
+    ]
+    
+    return jsonify({
+        'count': len(suggestions),
+        'total_value': round(float(suggestions['value'].sum()), 2),
+        'by_supplier': supplier_totals(suggestions),
+        'suggestions': top[columns].astype(object).where(top[columns].notna(), None).to_dict('records')
+    }), 200
+
+
+@bp.route('/replenishment', methods=['POST'])
+@jwt_required()
+@role_required(['admin', 'manager'])
+def create_replenishment_orders():
+    """Create one draft purchase order per supplier from the current suggestions"""
+    data = request.get_json() or {}
+    if not data.get('warehouse_id'):
+        return jsonify({'error': 'warehouse_id is required'}), 400
+    if not db.session.get(Warehouse, data['warehouse_id']):
+        return jsonify({'error': 'Warehouse not found'}), 404
+    try:
+        options = _replenishment_options(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    suggestions = suggest_reorders(**options)
+    orders, line_count = create_draft_orders(suggestions, data['warehouse_id'], int(get_jwt_identity()))
+    
+    return jsonify({
+        'orders': [order.to_dict() for order in orders],
+        'lines': line_count,
+        'skipped_without_supplier': int(suggestions['supplier_id'].isna().sum())
+    }), 201
+
+
 # Sales Orders
 @bp.route('/sales', methods=['GET'])
 @jwt_required()
@@ -92,16 +167,13 @@ def create_sales_order():
     )
     
     db.session.add(order)
-    db.session.commit()
-    
-    log = AuditLog(
+    log_action(
         user_id=int(identity),
         action='CREATE',
         entity_type='SalesOrder',
-        entity_id=order.id,
+        entity=order,
         details=f'Created sales order: {order.so_number}'
     )
-    db.session.add(log)
     db.session.commit()
     
     return jsonify(order.to_dict()), 201
@@ -1,71 +1,202 @@
-from flask import Blueprint, request, jsonify, current_app, send_file
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
-from app.models import Item, Stock, AuditLog, User, Supplier
+from app.models import Item, Stock, AuditLog, User, Supplier, Warehouse, StockLocation, Location, StockMovement
+from app.utils.decorators import role_required
+from app.utils.dashboard_summary import get_dashboard_summary, ALL_WAREHOUSES, CACHE_NAMESPACE
+from app.utils.response_cache import cached_response
+from app.utils.pagination import encode_cursor, decode_cursor, keyset_after, page_size, InvalidCursor
+from app.utils.db_utils import estimate_count
+from app.utils.audit_search import apply_search
+from app.utils.csv_stream import csv_response
+from app.utils.stock_ledger import on_hand, reconcile_stock_ledger
+from app.utils.stock_trends import stock_trends, BUCKETS, GROUPS
+from app.utils.abc_classification import (
+    report as abc_report, WINDOW_DAYS as ABC_WINDOW_DAYS, CACHE_NAMESPACE as ABC_CACHE_NAMESPACE,
+    CACHE_TTL as ABC_CACHE_TTL, CACHE_STALE_TTL as ABC_CACHE_STALE_TTL
+)
 from sqlalchemy import func, and_, or_
 from datetime import datetime
-import csv
-import io
 
 bp = Blueprint('reports', __name__, url_prefix='/api/reports')
 
 @bp.route('/dashboard', methods=['GET'])
 @jwt_required()
+@cached_response(CACHE_NAMESPACE, ttl=15, stale_ttl=60)
 def get_dashboard():
+    """
+    Dashboard totals read from the precomputed dashboard_summary rows
+    (see app/utils/dashboard_summary.py), with a per-warehouse breakdown.
+    ?warehouse_id= scopes the headline numbers to one warehouse.
+    """
     current_app.logger.info('🔵 Dashboard endpoint called')
     identity = get_jwt_identity()
     current_app.logger.info(f'🔵 User identity: {identity}')
-    total_items = Item.query.count()
-    total_stock = db.session.query(func.sum(Stock.quantity)).scalar() or 0
-    low_stock_items = db.session.query(Item).join(Stock).filter(
-        Stock.quantity < Item.reorder_level
-    ).count()
+    warehouse_id = request.args.get('warehouse_id', ALL_WAREHOUSES, type=int)
+    
+    summaries = get_dashboard_summary()
+    empty = {'total_items': 0, 'total_stock': 0, 'low_stock_items': 0, 'updated_at': None}
+    
+    def summary_for(wid):
+        return summaries[wid].to_dict() if wid in summaries else {'warehouse_id': wid, **empty}
+    
+    headline = summary_for(warehouse_id)
+    warehouses = [
+        {**summary_for(wid), 'warehouse_name': name}
+        for wid, name in db.session.query(Warehouse.id, Warehouse.name).order_by(Warehouse.id)
+    ]
     
     recent_activities = AuditLog.query.order_by(
         AuditLog.timestamp.desc()
     ).limit(10).all()
     
     return jsonify({
-        'total_items': total_items,
-        'total_stock': int(total_stock),
-        'low_stock_items': low_stock_items,
+        'total_items': headline['total_items'],
+        'total_stock': headline['total_stock'],
+        'low_stock_items': headline['low_stock_items'],
+        'warehouses': warehouses,
+        'summary_updated_at': summary_for(ALL_WAREHOUSES)['updated_at'],
         'recent_activities': [log.to_dict() for log in recent_activities]
     }), 200
 
 
+def _low_stock_page(query, id_column, count_query):
+    """Apply ?limit= and ?cursor= (keyset on id_column) and build the page envelope"""
+    limit = page_size(request.args.get('limit'))
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            (after_id,) = decode_cursor(cursor, int)
+        except InvalidCursor as e:
+            return None, (jsonify({'error': str(e)}), 400)
+        query = query.filter(id_column > after_id)
+    
+    rows = query.order_by(id_column).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, {
+        'next_cursor': encode_cursor(rows[-1].row_id) if has_more else None,
+        'total': count_query.scalar()
+    }
+
+
 @bp.route('/low-stock', methods=['GET'])
 @jwt_required()
+@cached_response(CACHE_NAMESPACE, ttl=30, stale_ttl=120)
 def get_low_stock():
-    items = db.session.query(Item, Stock).join(Stock).filter(
-        Stock.quantity < Item.reorder_level
-    ).all()
+    """
+    Stock records below their item's reorder level, paginated (?limit=, ?cursor=)
+    and optionally filtered by ?warehouse_id=. Reads the maintained
+    is_low_stock flag through the partial index idx_stock_low.
+    """
+    warehouse_id = request.args.get('warehouse_id', type=int)
     
-    result = []
-    for item, stock in items:
-        item_dict = item.to_dict()
-        item_dict['current_stock'] = stock.quantity
-        item_dict['warehouse_id'] = stock.warehouse_id
-        result.append(item_dict)
+    filters = [Stock.is_low_stock.is_(True)]
+    if warehouse_id:
+        filters.append(Stock.warehouse_id == warehouse_id)
     
-    return jsonify(result), 200
+    query = db.session.query(
+        Stock.id.label('row_id'),
+        Stock.item_id,
+        Stock.warehouse_id,
+        Stock.quantity,
+        Item.sku,
+        Item.name,
+        Item.reorder_level,
+        Item.unit_price,
+        Warehouse.name.label('warehouse_name')
+    ).join(Item, Item.id == Stock.item_id).outerjoin(
+        Warehouse, Warehouse.id == Stock.warehouse_id
+    ).filter(*filters)
+    
+    rows, page = _low_stock_page(query, Stock.id, db.session.query(func.count(Stock.id)).filter(*filters))
+    if rows is None:
+        return page
+    
+    return jsonify({
+        'items': [{
+            'id': row.item_id,
+            'stock_id': row.row_id,
+            'sku': row.sku,
+            'name': row.name,
+            'current_stock': row.quantity,
+            'reorder_level': row.reorder_level,
+            'shortfall': row.reorder_level - row.quantity,
+            'unit_price': float(row.unit_price) if row.unit_price else 0,
+            'warehouse_id': row.warehouse_id,
+            'warehouse_name': row.warehouse_name
+        } for row in rows],
+        **page
+    }), 200
 
 
-@bp.route('/audit-logs', methods=['GET'])
+@bp.route('/low-stock/locations', methods=['GET'])
 @jwt_required()
-def get_audit_logs():
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 50, type=int)
+@cached_response(CACHE_NAMESPACE, ttl=30, stale_ttl=120)
+def get_low_stock_locations():
+    """
+    Location stock below its min_threshold, paginated (?limit=, ?cursor=) and
+    optionally filtered by ?location_id=. Reads the generated is_low_stock
+    column through the partial index idx_stock_locations_low.
+    """
+    location_id = request.args.get('location_id', type=int)
     
-    # Filtering parameters
-    user_id = request.args.get('user_id', type=int)
-    action = request.args.get('action')
-    entity_type = request.args.get('entity_type')
-    entity_id = request.args.get('entity_id', type=int)
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
+    filters = [StockLocation.is_low_stock.is_(True)]
+    if location_id:
+        filters.append(StockLocation.location_id == location_id)
     
-    # Build query with filters
-    query = AuditLog.query
+    query = db.session.query(
+        StockLocation.id.label('row_id'),
+        StockLocation.item_id,
+        StockLocation.location_id,
+        StockLocation.quantity,
+        StockLocation.min_threshold,
+        Item.sku,
+        Item.name,
+        Location.name.label('location_name')
+    ).join(Item, Item.id == StockLocation.item_id).outerjoin(
+        Location, Location.id == StockLocation.location_id
+    ).filter(*filters)
+    
+    rows, page = _low_stock_page(
+        query, StockLocation.id, db.session.query(func.count(StockLocation.id)).filter(*filters)
+    )
+    if rows is None:
+        return page
+    
+    return jsonify({
+        'items': [{
+            'id': row.item_id,
+            'stock_location_id': row.row_id,
+            'sku': row.sku,
+            'name': row.name,
+            'current_stock': row.quantity,
+            'min_threshold': row.min_threshold,
+            'shortfall': row.min_threshold - row.quantity,
+            'location_id': row.location_id,
+            'location_name': row.location_name
+        } for row in rows],
+        **page
+    }), 200
+
+
+@bp.route('/mail-metrics', methods=['GET'])
+@jwt_required()
+@role_required(['admin'])
+def get_mail_metrics():
+    """SMTP transport metrics (handshakes, messages/sec) across worker processes"""
+    from app.utils.mail_transport import collect_metrics
+    return jsonify(collect_metrics()), 200
+
+
+def _audit_filters(args):
+    """Filter conditions shared by the audit log list and export"""
+    user_id = args.get('user_id', type=int)
+    action = args.get('action')
+    entity_type = args.get('entity_type')
+    entity_id = args.get('entity_id', type=int)
+    start_date = args.get('start_date')
+    end_date = args.get('end_date')
     
     filters = []
     if user_id:
@@ -88,110 +219,308 @@ def get_audit_logs():
             filters.append(AuditLog.timestamp <= end)
         except ValueError:
             pass
+    return filters
+
+
+@bp.route('/audit-logs', methods=['GET'])
+@jwt_required()
+def get_audit_logs():
+    """
+    Filtered audit logs, newest first, with username and email joined in.
+    
+    Paging: ?page=&per_page= (OFFSET), or ?cursor= for keyset paging on
+    (timestamp, id) that stays fast on deep pages. Pass an empty cursor for
+    the first page; follow next_cursor until it is null.
+    Totals: ?count=exact (default), estimate (planner estimate on
+    PostgreSQL) or none.
+    Search: ?q= matches words in details (see app/utils/audit_search.py);
+    page mode then orders by relevance, cursor mode stays newest first.
+    """
+    per_page = page_size(request.args.get('per_page'))
+    count_mode = request.args.get('count', 'exact')
+    if count_mode not in ('exact', 'estimate', 'none'):
+        return jsonify({'error': 'count must be one of exact, estimate, none'}), 400
     
+    # Build query with filters
+    query = AuditLog.query
+    filters = _audit_filters(request.args)
     if filters:
         query = query.filter(and_(*filters))
+    query, rank = apply_search(query, request.args.get('q', ''))
     
-    pagination = query.order_by(
-        AuditLog.timestamp.desc()
-    ).paginate(page=page, per_page=per_page, error_out=False)
+    total = None
+    if count_mode == 'exact':
+        total = query.order_by(None).count()
+    elif count_mode == 'estimate':
+        total = estimate_count(query)
+    
+    logs_query = query.outerjoin(
+        User, User.id == AuditLog.user_id
+    ).add_columns(
+        User.username, User.email
+    )
+    recent_first = (AuditLog.timestamp.desc(), AuditLog.id.desc())
+    
+    result = {'per_page': per_page, 'total': total, 'count': count_mode}
+    
+    if 'cursor' in request.args:
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                after_timestamp, after_id = decode_cursor(cursor, datetime, int)
+            except InvalidCursor as e:
+                return jsonify({'error': str(e)}), 400
+            # The plain upper bound lets PostgreSQL skip newer monthly partitions
+            logs_query = logs_query.filter(
+                AuditLog.timestamp <= after_timestamp,
+                keyset_after(
+                    (AuditLog.timestamp, AuditLog.id),
+                    (after_timestamp, after_id),
+                    descending=True
+                )
+            )
+        rows = logs_query.order_by(*recent_first).limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        last = rows[-1][0] if rows else None
+        result['next_cursor'] = encode_cursor(last.timestamp, last.id) if has_more else None
+    else:
+        page = max(request.args.get('page', 1, type=int), 1)
+        ordering = recent_first if rank is None else (rank.desc(), *recent_first)
+        rows = logs_query.order_by(*ordering).offset((page - 1) * per_page).limit(per_page).all()
+        result['page'] = page
+        result['pages'] = -(-total // per_page) if total is not None else None
     
-    # Enrich logs with user information
-    logs_with_user = []
-    for log in pagination.items:
+    logs = []
+    for log, username, user_email in rows:
         log_dict = log.to_dict()
-        if log.user_id:
-            user = User.query.get(log.user_id)
-            if user:
-                log_dict['username'] = user.username
-                log_dict['user_email'] = user.email
-        logs_with_user.append(log_dict)
+        if username is not None:
+            log_dict['username'] = username
+            log_dict['user_email'] = user_email
+        logs.append(log_dict)
+    result['logs'] = logs
     
-    return jsonify({
-        'logs': logs_with_user,
-        'total': pagination.total,
-        'page': page,
-        'per_page': per_page,
-        'pages': pagination.pages
-    }), 200
+    return jsonify(result), 200
 
 
 @bp.route('/audit-logs/export', methods=['GET'])
 @jwt_required()
 def export_audit_logs():
-    # Same filtering parameters as get_audit_logs
-    user_id = request.args.get('user_id', type=int)
-    action = request.args.get('action')
-    entity_type = request.args.get('entity_type')
-    entity_id = request.args.get('entity_id', type=int)
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
+    """
+    Export filtered audit logs to CSV (streamed).
+    Accepts the same filters and ?q= as get_audit_logs (newest first);
+    ?gzip=1 returns a .csv.gz.
+    """
+    # One joined, column-only query read through a server-side cursor
+    query = db.session.query(
+        AuditLog.id,
+        AuditLog.timestamp,
+        AuditLog.user_id,
+        User.username,
+        User.email,
+        AuditLog.action,
+        AuditLog.entity_type,
+        AuditLog.entity_id,
+        AuditLog.details
+    ).outerjoin(
+        User, User.id == AuditLog.user_id
+    )
     
-    # Build query with filters
-    query = AuditLog.query
+    filters = _audit_filters(request.args)
+    if filters:
+        query = query.filter(and_(*filters))
+    query, _ = apply_search(query, request.args.get('q', ''))
     
-    filters = []
-    if user_id:
-        filters.append(AuditLog.user_id == user_id)
-    if action:
-        filters.append(AuditLog.action == action)
-    if entity_type:
-        filters.append(AuditLog.entity_type == entity_type)
-    if entity_id:
-        filters.append(AuditLog.entity_id == entity_id)
-    if start_date:
+    query = query.order_by(
+        AuditLog.timestamp.desc(), AuditLog.id.desc()
+    ).execution_options(yield_per=1000)
+    
+    def rows():
+        for (log_id, timestamp, user_id, username, user_email,
+             action, entity_type, entity_id, details) in query:
+            yield [
+                log_id,
+                timestamp.isoformat() if timestamp else '',
+                user_id or '',
+                username or '',
+                user_email or '',
+                action,
+                entity_type or '',
+                entity_id or '',
+                details or ''
+            ]
+    
+    header = ['ID', 'Timestamp', 'User ID', 'Username', 'User Email', 'Action', 'Entity Type', 'Entity ID', 'Details']
+    filename = f'audit_logs_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    
+    return csv_response(header, rows(), filename, compress=compress)
+
+
+def _parse_datetime(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+
+
+@bp.route('/stock-movements', methods=['GET'])
+@jwt_required()
+def get_stock_movements():
+    """
+    Stock ledger entries, newest first, filtered by item_id, warehouse_id,
+    location_id, reason, start_date and end_date. Paged with ?limit= and
+    ?cursor= (next_cursor in the response).
+    """
+    limit = page_size(request.args.get('limit'))
+    query = StockMovement.query
+    
+    for name in ('item_id', 'warehouse_id', 'location_id'):
+        value = request.args.get(name, type=int)
+        if value is not None:
+            query = query.filter(getattr(StockMovement, name) == value)
+    reason = request.args.get('reason')
+    if reason:
+        query = query.filter(StockMovement.reason == reason)
+    try:
+        if request.args.get('start_date'):
+            query = query.filter(StockMovement.created_at >= _parse_datetime(request.args['start_date']))
+        if request.args.get('end_date'):
+            query = query.filter(StockMovement.created_at <= _parse_datetime(request.args['end_date']))
+    except ValueError:
+        return jsonify({'error': 'Dates must be ISO 8601'}), 400
+    
+    cursor = request.args.get('cursor')
+    if cursor:
         try:
-            start = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-            filters.append(AuditLog.timestamp >= start)
-        except ValueError:
-            pass
-    if end_date:
+            (before_id,) = decode_cursor(cursor, int)
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
+        query = query.filter(StockMovement.id < before_id)
+    
+    movements = query.order_by(StockMovement.id.desc()).limit(limit + 1).all()
+    has_more = len(movements) > limit
+    movements = movements[:limit]
+    
+    return jsonify({
+        'movements': [movement.to_dict() for movement in movements],
+        'next_cursor': encode_cursor(movements[-1].id) if has_more else None
+    }), 200
+
+
+@bp.route('/stock-on-hand', methods=['GET'])
+@jwt_required()
+def get_stock_on_hand():
+    """
+    Quantities on hand per item and warehouse/location, now or at ?as_of=
+    (ISO 8601), rebuilt from the nearest ledger snapshot plus the movements
+    after it. Optional filters: item_id, warehouse_id, location_id and
+    level=warehouse|location.
+    """
+    as_of = None
+    if request.args.get('as_of'):
         try:
-            end = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-            filters.append(AuditLog.timestamp <= end)
+            as_of = _parse_datetime(request.args['as_of'])
         except ValueError:
-            pass
+            return jsonify({'error': 'as_of must be ISO 8601'}), 400
+    level = request.args.get('level')
+    if level not in (None, 'warehouse', 'location'):
+        return jsonify({'error': 'level must be warehouse or location'}), 400
     
-    if filters:
-        query = query.filter(and_(*filters))
-    
-    logs = query.order_by(AuditLog.timestamp.desc()).all()
-    
-    # Create CSV in memory
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow(['ID', 'Timestamp', 'User ID', 'Username', 'User Email', 'Action', 'Entity Type', 'Entity ID', 'Details'])
-    
-    # Write data rows
-    for log in logs:
-        username = ''
-        user_email = ''
-        if log.user_id:
-            user = User.query.get(log.user_id)
-            if user:
-                username = user.username
-                user_email = user.email
-        
-        writer.writerow([
-            log.id,
-            log.timestamp.isoformat(),
-            log.user_id or '',
-            username,
-            user_email,
-            log.action,
-            log.entity_type or '',
-            log.entity_id or '',
-            log.details or ''
-        ])
-    
-    # Prepare the file for download
-    output.seek(0)
-    
-    return send_file(
-        io.BytesIO(output.getvalue().encode('utf-8')),
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=f'audit_logs_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+    rows, run = on_hand(
+        as_of,
+        item_id=request.args.get('item_id', type=int),
+        warehouse_id=request.args.get('warehouse_id', type=int),
+        location_id=request.args.get('location_id', type=int),
+        level=level
     )
+    
+    return jsonify({
+        'as_of': as_of.isoformat() if as_of else None,
+        'snapshot': run.to_dict() if run else None,
+        'stock': [{
+            'item_id': row.item_id,
+            'warehouse_id': row.warehouse_id,
+            'location_id': row.location_id,
+            'quantity': int(row.quantity)
+        } for row in rows]
+    }), 200
+
+
+@bp.route('/stock-ledger/reconcile', methods=['GET', 'POST'])
+@jwt_required()
+@role_required(['admin'])
+def reconcile_stock():
+    """
+    Differences between live stock quantities and the ledger. POST also
+    records correcting movements so the ledger matches again.
+    """
+    apply = request.method == 'POST'
+    differences = reconcile_stock_ledger(apply=apply, user_id=int(get_jwt_identity()))
+    return jsonify({
+        'applied': apply,
+        'count': len(differences),
+        'differences': differences
+    }), 200
+
+
+@bp.route('/stock-trends', methods=['GET'])
+@jwt_required()
+@cached_response(CACHE_NAMESPACE, ttl=300, stale_ttl=900)
+def get_stock_trends():
+    """
+    On-hand trends from the daily stock snapshots: ?days= (default 90),
+    bucket=day|week|month, group_by=item|category|warehouse|location|total
+    and level=warehouse|location. Optional filters: item_id, category_id,
+    warehouse_id, location_id. ?limit= caps the number of series.
+    """
+    days = request.args.get('days', 90, type=int)
+    if not 1 <= days <= 1825:
+        return jsonify({'error': 'days must be between 1 and 1825'}), 400
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in BUCKETS:
+        return jsonify({'error': f'bucket must be one of {", ".join(BUCKETS)}'}), 400
+    group_by = request.args.get('group_by', 'item')
+    if group_by not in GROUPS:
+        return jsonify({'error': f'group_by must be one of {", ".join(GROUPS)}'}), 400
+    level = request.args.get('level', 'warehouse')
+    if level not in ('warehouse', 'location'):
+        return jsonify({'error': 'level must be warehouse or location'}), 400
+    
+    return jsonify(stock_trends(
+        days=days,
+        bucket=bucket,
+        group_by=group_by,
+        level=level,
+        item_id=request.args.get('item_id', type=int),
+        category_id=request.args.get('category_id', type=int),
+        warehouse_id=request.args.get('warehouse_id', type=int),
+        location_id=request.args.get('location_id', type=int),
+        limit=page_size(request.args.get('limit'))
+    )), 200
+
+
+@bp.route('/abc-classification', methods=['GET'])
+@jwt_required()
+@cached_response(ABC_CACHE_NAMESPACE, ttl=ABC_CACHE_TTL, stale_ttl=ABC_CACHE_STALE_TTL, vary_on_role=False)
+def get_abc_classification():
+    """
+    ABC classes by movement value (transferred and adjusted quantity x unit
+    price) over ?days= (default ABC_WINDOW_DAYS). Optional: category_id,
+    location_id (transfers only: adjustments are per warehouse), class=A|B|C
+    for the listed items, page and per_page. The summary always covers
+    every class. The same for every role, so cached
+    once for all of them.
+    """
+    days = request.args.get('days', ABC_WINDOW_DAYS, type=int)
+    if not 1 <= days <= 3650:
+        return jsonify({'error': 'days must be between 1 and 3650'}), 400
+    abc_class = request.args.get('class')
+    if abc_class not in (None, 'A', 'B', 'C'):
+        return jsonify({'error': 'class must be A, B or C'}), 400
+    
+    return jsonify(abc_report(
+        days=days,
+        category_id=request.args.get('category_id', type=int),
+        location_id=request.args.get('location_id', type=int),
+        abc_class=abc_class,
+        page=max(request.args.get('page', 1, type=int), 1),
+        per_page=page_size(request.args.get('per_page'))
+    )), 200
@@ -1,10 +1,12 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import aliased
 from app import db
-from app.models import Supplier, AuditLog, PurchaseOrder
+from app.models import Supplier, PurchaseOrder, SupplierScorecard, User, Warehouse
 from app.utils.decorators import role_required
-import csv
-import io
+from app.utils.audit import log_action
+from app.utils.csv_stream import csv_response
+from app.utils.pagination import page_size
 from datetime import datetime
 
 bp = Blueprint('suppliers', __name__, url_prefix='/api/suppliers')
@@ -16,6 +18,40 @@ def get_suppliers():
     return jsonify([sup.to_dict() for sup in suppliers]), 200
 
 
+SCORECARD_SORT_COLUMNS = {
+    'on_time_rate': SupplierScorecard.on_time_rate,
+    'avg_delivery_days': SupplierScorecard.avg_delivery_days,
+    'total_spend': SupplierScorecard.total_spend,
+    'sent_orders': SupplierScorecard.sent_orders,
+    'delivered_orders': SupplierScorecard.delivered_orders,
+    'name': Supplier.name,
+}
+
+
+@bp.route('/scorecards', methods=['GET'])
+@jwt_required()
+def get_supplier_scorecards():
+    """Rank suppliers from the precomputed scorecard table (?limit= 50 by default, up to 200)"""
+    sort = request.args.get('sort', 'on_time_rate')
+    order = request.args.get('order', 'desc')
+    limit = page_size(request.args.get('limit'))
+    
+    if sort not in SCORECARD_SORT_COLUMNS:
+        return jsonify({'error': f'Invalid sort field. Use one of: {", ".join(SCORECARD_SORT_COLUMNS)}'}), 400
+    
+    column = SCORECARD_SORT_COLUMNS[sort]
+    ordering = column.asc() if order == 'asc' else column.desc()
+    
+    query = db.session.query(SupplierScorecard, Supplier.name).join(
+        Supplier, Supplier.id == SupplierScorecard.supplier_id
+    ).order_by(ordering.nulls_last(), Supplier.id).limit(limit)
+    
+    return jsonify([
+        {**scorecard.to_dict(), 'supplier_name': name}
+        for scorecard, name in query.all()
+    ]), 200
+
+
 @bp.route('/<int:supplier_id>', methods=['GET'])
 @jwt_required()
 def get_supplier(supplier_id):
@@ -42,16 +78,13 @@ def create_supplier():
     )
     
     db.session.add(supplier)
-    db.session.commit()
-    
-    log = AuditLog(
+    log_action(
         user_id=int(identity),
         action='CREATE',
         entity_type='Supplier',
-        entity_id=supplier.id,
+        entity=supplier,
         details=f'Created supplier: {supplier.name}'
     )
-    db.session.add(log)
     db.session.commit()
     
     return jsonify(supplier.to_dict()), 201
@@ -76,16 +109,13 @@ def update_supplier(supplier_id):
     if 'address' in data:
         supplier.address = data['address']
     
-    db.session.commit()
-    
-    log = AuditLog(
+    log_action(
         user_id=int(identity),
         action='UPDATE',
         entity_type='Supplier',
-        entity_id=supplier.id,
+        entity=supplier,
         details=f'Updated supplier: {supplier.name}'
     )
-    db.session.add(log)
     db.session.commit()
     
     return jsonify(supplier.to_dict()), 200
@@ -98,14 +128,13 @@ def delete_supplier(supplier_id):
     supplier = Supplier.query.get_or_404(supplier_id)
     identity = get_jwt_identity()
     
-    log = AuditLog(
+    log_action(
         user_id=int(identity),
         action='DELETE',
         entity_type='Supplier',
-        entity_id=supplier.id,
+        entity=supplier,
         details=f'Deleted supplier: {supplier.name}'
     )
-    db.session.add(log)
     
     db.session.delete(supplier)
     db.session.commit()
@@ -143,44 +172,62 @@ def get_supplier_orders(supplier_id):
 @bp.route('/<int:supplier_id>/orders/export', methods=['GET'])
 @jwt_required()
 def export_supplier_orders(supplier_id):
-    """Export supplier orders to CSV"""
+    """Export supplier orders to CSV (streamed)"""
     supplier = Supplier.query.get_or_404(supplier_id)
-    orders = PurchaseOrder.query.filter_by(supplier_id=supplier_id).order_by(PurchaseOrder.order_date.desc()).all()
-    
-    # Create CSV in memory
-    output = io.StringIO()
-    writer = csv.writer(output)
     
-    # Write header
-    writer.writerow([
+    requester = aliased(User)
+    approver = aliased(User)
+    
+    # One joined, column-only query read through a server-side cursor
+    query = db.session.query(
+        PurchaseOrder.po_number,
+        PurchaseOrder.order_date,
+        PurchaseOrder.status,
+        PurchaseOrder.total_amount,
+        Warehouse.name,
+        requester.username,
+        approver.username,
+        PurchaseOrder.approved_date,
+        PurchaseOrder.sent_date,
+        PurchaseOrder.delivered_date,
+        PurchaseOrder.comments
+    ).outerjoin(
+        Warehouse, Warehouse.id == PurchaseOrder.warehouse_id
+    ).outerjoin(
+        requester, requester.id == PurchaseOrder.created_by
+    ).outerjoin(
+        approver, approver.id == PurchaseOrder.approved_by
+    ).filter(
+        PurchaseOrder.supplier_id == supplier_id
+    ).order_by(
+        PurchaseOrder.order_date.desc()
+    ).execution_options(yield_per=1000)
+    
+    def format_date(value):
+        return value.strftime('%Y-%m-%d') if value else ''
+    
+    def rows():
+        for (po_number, order_date, status, total_amount, warehouse_name, requested_by,
+             approved_by, approved_date, sent_date, delivered_date, comments) in query:
+            yield [
+                po_number,
+                format_date(order_date),
+                status,
+                float(total_amount) if total_amount is not None else 0,
+                warehouse_name or '',
+                requested_by or '',
+                approved_by or '',
+                format_date(approved_date),
+                format_date(sent_date),
+                format_date(delivered_date),
+                comments or ''
+            ]
+    
+    header = [
         'PO Number', 'Order Date', 'Status', 'Total Amount', 
         'Warehouse', 'Requested By', 'Approved By', 'Approved Date',
         'Sent Date', 'Delivered Date', 'Comments'
-    ])
-    
-    # Write data
-    for order in orders:
-        writer.writerow([
-            order.po_number,
-            order.order_date.strftime('%Y-%m-%d') if order.order_date else '',
-            order.status,
-            float(order.total_amount),
-            order.warehouse.name if order.warehouse else '',
-            order.requested_by_user.username if order.requested_by_user else '',
-            order.approved_by_user.username if order.approved_by_user else '',
-            order.approved_date.strftime('%Y-%m-%d') if order.approved_date else '',
-            order.sent_date.strftime('%Y-%m-%d') if order.sent_date else '',
-            order.delivered_date.strftime('%Y-%m-%d') if order.delivered_date else '',
-            order.comments or ''
-        ])
-    
-    # Prepare file for download
-    output.seek(0)
+    ]
     filename = f"supplier_{supplier.name.replace(' ', '_')}_orders_{datetime.now().strftime('%Y%m%d')}.csv"
     
-    return send_file(
-        io.BytesIO(output.getvalue().encode('utf-8')),
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=filename
-    )
+    return csv_response(header, rows(), filename)
@@ -1,8 +1,10 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
-from app.models import Warehouse, Stock, AuditLog
+from app.models import Warehouse, Stock
 from app.utils.decorators import role_required
+from app.utils.audit import log_action
+from app.utils.dashboard_summary import record_warehouse_deleted
 
 bp = Blueprint('warehouses', __name__, url_prefix='/api/warehouses')
 
@@ -42,16 +44,13 @@ def create_warehouse():
     )
     
     db.session.add(warehouse)
-    db.session.commit()
-    
-    log = AuditLog(
+    log_action(
         user_id=int(identity),
         action='CREATE',
         entity_type='Warehouse',
-        entity_id=warehouse.id,
+        entity=warehouse,
         details=f'Created warehouse: {warehouse.name}'
     )
-    db.session.add(log)
     db.session.commit()
     
     return jsonify(warehouse.to_dict()), 201
@@ -72,16 +71,13 @@ def update_warehouse(warehouse_id):
     if 'capacity' in data:
         warehouse.capacity = data['capacity']
     
-    db.session.commit()
-    
-    log = AuditLog(
+    log_action(
         user_id=int(identity),
         action='UPDATE',
         entity_type='Warehouse',
-        entity_id=warehouse.id,
+        entity=warehouse,
         details=f'Updated warehouse: {warehouse.name}'
     )
-    db.session.add(log)
     db.session.commit()
     
     return jsonify(warehouse.to_dict()), 200
@@ -94,15 +90,15 @@ def delete_warehouse(warehouse_id):
     warehouse = Warehouse.query.get_or_404(warehouse_id)
     identity = get_jwt_identity()
     
-    log = AuditLog(
+    log_action(
         user_id=int(identity),
         action='DELETE',
         entity_type='Warehouse',
-        entity_id=warehouse.id,
+        entity=warehouse,
         details=f'Deleted warehouse: {warehouse.name}'
     )
-    db.session.add(log)
     
+    record_warehouse_deleted(warehouse.id)
     db.session.delete(warehouse)
     db.session.commit()
     
@@ -1,10 +1,154 @@
 from celery import Celery
+from celery.schedules import crontab
 from app.config import Config
 from app.utils.import_processor import process_file_sync
 
 celery = Celery('tasks', broker=Config.CELERY_BROKER_URL, backend=Config.CELERY_RESULT_BACKEND)
 
+celery.conf.beat_schedule = {
+    'drain-email-outbox': {
+        'task': 'app.tasks.drain_email_outbox',
+        'schedule': 60.0,
+    },
+    'reconcile-unread-counters': {
+        'task': 'app.tasks.reconcile_unread_counters',
+        'schedule': 300.0,
+    },
+    'refresh-dashboard-summary': {
+        'task': 'app.tasks.refresh_dashboard_summary',
+        'schedule': 300.0,
+    },
+    'purge-read-notifications': {
+        'task': 'app.tasks.purge_read_notifications',
+        'schedule': 86400.0,
+    },
+    'maintain-audit-log-partitions': {
+        'task': 'app.tasks.maintain_audit_log_partitions',
+        'schedule': 86400.0,
+    },
+    'snapshot-stock-ledger': {
+        'task': 'app.tasks.snapshot_stock_ledger',
+        'schedule': 21600.0,
+    },
+    'snapshot-daily-stock': {
+        'task': 'app.tasks.snapshot_daily_stock',
+        'schedule': 3600.0,  # Captures at most once per UTC day; hourly so a missed run is retried
+    },
+    'refresh-abc-classification': {
+        'task': 'app.tasks.refresh_abc_classification',
+        'schedule': crontab(hour=2, minute=0),
+    },
+}
+
+_flask_app = None
+
+
+def get_flask_app():
+    """Lazily create the Flask app so tasks can run inside an app context"""
+    global _flask_app
+    if _flask_app is None:
+        from app import create_app
+        _flask_app = create_app()
+    return _flask_app
+
+
 @celery.task
 def process_import_file(filepath, job_id):
     """Process large files asynchronously"""
     return process_file_sync(filepath, job_id)
+
+
+@celery.task(bind=True, max_retries=None)
+def deliver_outbox_emails(self, outbox_ids):
+    """Deliver outbox emails committed by a request, retrying failures with backoff"""
+    from app.utils.email_outbox import process_outbox, next_retry_delay
+
+    with get_flask_app().app_context():
+        process_outbox(outbox_ids)
+        retry_in = next_retry_delay(outbox_ids)
+
+    if retry_in is not None:
+        raise self.retry(countdown=retry_in)
+
+
+@celery.task
+def drain_email_outbox(batch_size=100):
+    """Periodic sweep for outbox rows whose dispatch was missed or is due for retry"""
+    from app.utils.email_outbox import process_outbox, release_stale_claims
+
+    with get_flask_app().app_context():
+        release_stale_claims()
+        total = 0
+        while True:
+            attempted = process_outbox(limit=batch_size)
+            total += attempted
+            if attempted < batch_size:
+                break
+    return total
+
+
+@celery.task
+def reconcile_unread_counters():
+    """Correct drift between cached unread counters and the notifications table"""
+    from app.utils.notification_counters import reconcile_unread_counts
+
+    with get_flask_app().app_context():
+        return reconcile_unread_counts()
+
+
+@celery.task
+def purge_read_notifications():
+    """Delete read notifications past the retention period in bounded batches"""
+    from app.utils.notification_retention import purge_read_notifications as purge
+
+    with get_flask_app().app_context():
+        return purge()
+
+
+@celery.task
+def maintain_audit_log_partitions():
+    """Create upcoming audit log partitions and archive months past retention"""
+    from app.utils.audit_partitions import maintain_audit_logs
+
+    with get_flask_app().app_context():
+        return maintain_audit_logs()
+
+
+@celery.task
+def snapshot_stock_ledger():
+    """Snapshot ledger balances so as-of queries replay only recent movements"""
+    from app.utils.stock_ledger import take_snapshot
+
+    with get_flask_app().app_context():
+        run = take_snapshot()
+        return run.id if run else None
+
+
+@celery.task
+def snapshot_daily_stock():
+    """Capture today's stock quantities for trend reports and thin out old snapshots"""
+    from app.utils.stock_trends import capture_daily_snapshot, downsample_daily_snapshots
+
+    with get_flask_app().app_context():
+        captured = capture_daily_snapshot()
+        if captured is None:
+            return None
+        return {'captured': captured, 'downsampled': downsample_daily_snapshots()}
+
+
+@celery.task
+def refresh_abc_classification():
+    """Recompute the default ABC classification report from the day's movements and cache it"""
+    from app.utils.abc_classification import warm_cache
+
+    with get_flask_app().app_context():
+        warm_cache()
+
+
+@celery.task
+def refresh_dashboard_summary():
+    """Recompute dashboard totals to pick up writes that bypass the incremental path"""
+    from app.utils.dashboard_summary import refresh_dashboard_summary as refresh
+
+    with get_flask_app().app_context():
+        return refresh()
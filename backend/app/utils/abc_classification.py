@@ -0,0 +1,158 @@
+"""
+ABC classification of items by movement value.
+An item's movement value is the quantity it moved over the last WINDOW_DAYS
+(completed StockTransfer quantities plus stock adjustments from the stock
+ledger) times its unit price, computed for every item in one aggregated
+query. Items are ranked by value and classed from the cumulative share of
+the items ranked above them: A until A_SHARE of the total value, B until
+B_SHARE, C for the rest and for items that did not move.
+
+Stock adjustments are recorded per warehouse and locations are not tied to
+a warehouse, so with a location filter only transfers into or out of the
+location count; the report says so with adjustments_included=false.
+
+Responses are cached in the CACHE_NAMESPACE response cache for a day. The
+nightly refresh-abc-classification beat task drops them and stores a freshly
+computed default report (default window, no filters, first page), so the
+usual dashboard request never computes it; filtered variants are computed
+on their first request.
+"""
+import os
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from flask import jsonify
+from sqlalchemy import func, or_, select, union_all
+from app import db
+from app.models import Item, StockLocation, StockMovement, StockTransfer
+from app.utils.pagination import page_size
+from app.utils.response_cache import invalidate, store
+
+WINDOW_DAYS = int(os.getenv('ABC_WINDOW_DAYS', 365))
+A_SHARE = 80
+B_SHARE = 95
+CACHE_NAMESPACE = 'abc_classification'
+CACHE_TTL = 86400
+CACHE_STALE_TTL = 3600
+REPORT_ENDPOINT = 'reports.get_abc_classification'
+
+COLUMNS = ['item_id', 'sku', 'name', 'category_id', 'unit_price', 'quantity', 'value']
+
+
+def _movement_value(since, category_id=None, location_id=None):
+    """
+    One row per item: quantity moved since since and its value, highest
+    value first. Adjustments are left out when filtering by location.
+    """
+    transfers = select(
+        StockTransfer.item_id, StockTransfer.quantity.label('quantity')
+    ).where(StockTransfer.status == 'completed', StockTransfer.transfer_date >= since)
+    if location_id is None:
+        adjustments = select(
+            StockMovement.item_id, func.abs(StockMovement.delta).label('quantity')
+        ).where(StockMovement.reason == 'adjustment', StockMovement.created_at >= since)
+        moves = union_all(transfers, adjustments).subquery()
+    else:
+        moves = transfers.where(or_(
+            StockTransfer.from_location_id == location_id, StockTransfer.to_location_id == location_id
+        )).subquery()
+
+    moved = select(
+        moves.c.item_id, func.sum(moves.c.quantity).label('quantity')
+    ).group_by(moves.c.item_id).subquery()
+
+    quantity = func.coalesce(moved.c.quantity, 0)
+    value = quantity * Item.unit_price
+    statement = select(
+        Item.id, Item.sku, Item.name, Item.category_id, Item.unit_price, quantity, value
+    ).outerjoin(moved, moved.c.item_id == Item.id).order_by(value.desc(), Item.id)
+    if category_id is not None:
+        statement = statement.where(Item.category_id == category_id)
+    if location_id is not None:
+        statement = statement.where(Item.id.in_(
+            select(StockLocation.item_id).where(StockLocation.location_id == location_id)
+        ))
+    return pd.DataFrame(db.session.execute(statement).all(), columns=COLUMNS)
+
+
+def classify(frame, a_share=A_SHARE, b_share=B_SHARE):
+    """Add share, cumulative_share (percent) and abc_class to a frame sorted by value, highest first"""
+    values = frame['value'].to_numpy(dtype='float64')
+    total = values.sum()
+    share = values / total * 100 if total else np.zeros_like(values)
+    cumulative = np.cumsum(share)
+    above = cumulative - share  # Share of the items ranked higher
+    moved = values > 0
+    return frame.assign(
+        value=values.round(2),
+        share=share.round(4),
+        cumulative_share=cumulative.round(4),
+        abc_class=np.select([moved & (above < a_share), moved & (above < b_share)], ['A', 'B'], 'C'),
+    )
+
+
+def abc_classification(category_id=None, location_id=None, days=WINDOW_DAYS,
+                       a_share=A_SHARE, b_share=B_SHARE, now=None):
+    """Classified items (DataFrame, highest value first) and per-class totals"""
+    since = (now or datetime.utcnow()) - timedelta(days=days)
+    frame = classify(
+        _movement_value(since, category_id, location_id).astype({'unit_price': 'float64', 'quantity': 'int64'}),
+        a_share, b_share
+    )
+    totals = frame.groupby('abc_class').agg(
+        items=('item_id', 'size'), quantity=('quantity', 'sum'), value=('value', 'sum'), share=('share', 'sum')
+    ).reindex(['A', 'B', 'C'], fill_value=0)
+    summary = {
+        name: {
+            'items': int(row['items']),
+            'quantity': int(row['quantity']),
+            'value': round(float(row['value']), 2),
+            'share': round(float(row['share']), 2),
+        }
+        for name, row in totals.iterrows()
+    }
+    return frame, summary
+
+
+def item_rows(frame):
+    """JSON-ready dicts for classified rows"""
+    return [
+        {
+            'item_id': int(row.item_id),
+            'sku': row.sku,
+            'name': row.name,
+            'category_id': None if pd.isna(row.category_id) else int(row.category_id),
+            'unit_price': float(row.unit_price),
+            'quantity': int(row.quantity),
+            'value': float(row.value),
+            'share': float(row.share),
+            'cumulative_share': float(row.cumulative_share),
+            'class': row.abc_class,
+        }
+        for row in frame.itertuples(index=False)
+    ]
+
+
+def report(days=WINDOW_DAYS, category_id=None, location_id=None, abc_class=None, page=1, per_page=None):
+    """The /api/reports/abc-classification response body for one page"""
+    per_page = per_page or page_size(None)
+    frame, summary = abc_classification(category_id=category_id, location_id=location_id, days=days)
+    if abc_class:
+        frame = frame[frame['abc_class'] == abc_class]
+    rows = frame.iloc[(page - 1) * per_page:page * per_page]
+    return {
+        'days': days,
+        'adjustments_included': location_id is None,
+        'total_value': round(sum(totals['value'] for totals in summary.values()), 2),
+        'summary': summary,
+        'items': item_rows(rows),
+        'total': len(frame),
+        'page': page,
+        'pages': (len(frame) + per_page - 1) // per_page
+    }
+
+
+def warm_cache():
+    """Drop cached reports and store the default one (what a request without parameters gets)"""
+    invalidate(CACHE_NAMESPACE)
+    store(CACHE_NAMESPACE, REPORT_ENDPOINT, jsonify(report()), CACHE_TTL, CACHE_STALE_TTL)
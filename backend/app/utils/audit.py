@@ -0,0 +1,171 @@
+"""
+Audit log writer.
+log_action() stages an entry on the session; the entries are inserted with
+one multi-row INSERT just before the session commits, in the same
+transaction as the change they describe. The entity can be passed as a
+model instance, so new objects get their id at commit time. Entries are
+dropped if the transaction rolls back.
+
+High-volume paths can pass buffered=True: when AUDIT_LOG_BUFFERED is
+enabled those entries are handed, after the commit, to a per-process
+buffer that a background thread writes in batches. Buffered entries can
+be lost if the process dies before a flush.
+"""
+import atexit
+import os
+import threading
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app import db
+from app.models import AuditLog
+
+BUFFERED_ENABLED = os.getenv('AUDIT_LOG_BUFFERED', 'false').lower() in ('1', 'true', 'yes')
+BUFFER_MAX_ROWS = int(os.getenv('AUDIT_LOG_BUFFER_MAX_ROWS', 500))
+BUFFER_FLUSH_SECONDS = float(os.getenv('AUDIT_LOG_BUFFER_FLUSH_SECONDS', 2))
+BUFFER_MAX_PENDING = 50000  # Rows kept for retry while the database is unreachable
+
+
+class _Entry:
+    __slots__ = ('user_id', 'action', 'entity_type', 'entity', 'details', 'timestamp')
+
+    def __init__(self, user_id, action, entity_type, entity, details):
+        self.user_id = user_id
+        self.action = action
+        self.entity_type = entity_type
+        self.entity = entity
+        self.details = details
+        self.timestamp = datetime.utcnow()
+
+    def to_row(self):
+        entity_id = self.entity
+        if entity_id is not None and not isinstance(entity_id, int):
+            entity_id = self.entity.id
+        return {
+            'user_id': self.user_id,
+            'action': self.action,
+            'entity_type': self.entity_type,
+            'entity_id': entity_id,
+            'details': self.details,
+            'timestamp': self.timestamp,
+        }
+
+
+def log_action(user_id, action, entity_type, entity=None, details=None, buffered=False, session=None):
+    """
+    Record an audit entry with the current transaction. entity is a model
+    instance or an id; an instance without an id yet is resolved at commit.
+    """
+    session = session or db.session
+    if entity is not None and not isinstance(entity, int):
+        identity = inspect(entity).identity
+        if identity is not None:
+            entity = identity[0]  # Keep the id, e.g. for objects deleted in this transaction
+    key = 'audit_buffered' if buffered and BUFFERED_ENABLED else 'audit_entries'
+    session.info.setdefault(key, []).append(_Entry(user_id, action, entity_type, entity, details))
+
+
+@event.listens_for(Session, 'before_commit')
+def _write_before_commit(session):
+    entries = session.info.pop('audit_entries', None)
+    if not entries:
+        return
+    session.flush()  # Assign ids to entities created in this transaction
+    session.connection().execute(AuditLog.__table__.insert(), [entry.to_row() for entry in entries])
+
+
+@event.listens_for(Session, 'after_flush')
+def _resolve_buffered(session, flush_context):
+    # Buffered entries leave the session after commit; resolve ids while the entities are still attached
+    for entry in session.info.get('audit_buffered', ()):
+        if entry.entity is not None and not isinstance(entry.entity, int) and entry.entity.id is not None:
+            entry.entity = entry.entity.id
+
+
+@event.listens_for(Session, 'after_commit')
+def _buffer_after_commit(session):
+    entries = session.info.pop('audit_buffered', None)
+    if entries:
+        _buffer.add(db.engine, current_app.logger, [entry.to_row() for entry in entries])
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('audit_entries', None)
+    session.info.pop('audit_buffered', None)
+
+
+class AuditBuffer:
+    """Per-process queue of committed audit rows written in batches by a daemon thread"""
+
+    def __init__(self, max_rows=BUFFER_MAX_ROWS, flush_seconds=BUFFER_FLUSH_SECONDS):
+        self.max_rows = max_rows
+        self.flush_seconds = flush_seconds
+        self._rows = []
+        self._engine = None
+        self._logger = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._worker = None
+        self._worker_pid = None
+
+    def add(self, engine, logger, rows):
+        with self._lock:
+            self._engine = engine
+            self._logger = logger
+            self._rows.extend(rows)
+            full = len(self._rows) >= self.max_rows
+        self._ensure_worker()
+        if full:
+            self._wakeup.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._rows)
+
+    def flush(self):
+        """Write everything buffered so far. Returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+                engine, logger = self._engine, self._logger
+            if not rows:
+                return 0
+            try:
+                with engine.begin() as connection:
+                    for start in range(0, len(rows), self.max_rows):
+                        connection.execute(AuditLog.__table__.insert(), rows[start:start + self.max_rows])
+            except Exception as e:
+                with self._lock:
+                    # Put the rows back for the next attempt, dropping the oldest past the cap
+                    self._rows = (rows + self._rows)[-BUFFER_MAX_PENDING:]
+                if logger is not None:
+                    logger.error(f'Failed to write {len(rows)} buffered audit logs: {str(e)}')
+                return 0
+            return len(rows)
+
+    def _ensure_worker(self):
+        """Start this process's flush thread (restarted after fork)"""
+        with self._lock:
+            if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self._run, name='audit-log-buffer', daemon=True)
+            self._worker_pid = os.getpid()
+        self._worker.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_seconds)
+            self._wakeup.clear()
+            self.flush()
+
+
+_buffer = AuditBuffer()
+atexit.register(_buffer.flush)
+
+
+def flush_audit_buffer():
+    """Write buffered audit rows now (e.g. before a worker exits)"""
+    return _buffer.flush()
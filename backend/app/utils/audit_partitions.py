@@ -0,0 +1,105 @@
+"""
+Audit log partition maintenance and archival.
+On PostgreSQL audit_logs is range-partitioned by month (see
+db-init/add_audit_log_partitions.sql): upcoming partitions are created
+ahead of time and months past the retention period are detached from
+audit_logs and attached to audit_logs_archive, which moves no rows.
+Where audit_logs is a plain table (SQLite, or PostgreSQL before the
+migration) old rows are moved to audit_logs_archive in small batches.
+"""
+import os
+from datetime import date, datetime
+from sqlalchemy import text
+from app import db
+from app.models import AuditLog, AuditLogArchive
+from app.utils.db_utils import dialect_name
+
+RETENTION_MONTHS = int(os.getenv('AUDIT_LOG_RETENTION_MONTHS', 12))
+MONTHS_AHEAD = 2
+BATCH_SIZE = int(os.getenv('AUDIT_LOG_ARCHIVE_BATCH_SIZE', 5000))
+
+_COLUMNS = ('id', 'user_id', 'action', 'entity_type', 'entity_id', 'details', 'timestamp')
+
+
+def is_partitioned():
+    """True when audit_logs is a partitioned PostgreSQL table"""
+    if dialect_name() != 'postgresql':
+        return False
+    relkind = db.session.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass('audit_logs')")
+    ).scalar()
+    return relkind == 'p'
+
+
+def retention_cutoff(months=RETENTION_MONTHS, today=None):
+    """First day of the oldest month that is kept; everything before it is archived"""
+    today = today or datetime.utcnow().date()
+    month_index = today.year * 12 + today.month - 1 - months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def ensure_partitions(months_ahead=MONTHS_AHEAD):
+    """Create missing partitions up to months_ahead months out. Returns False without partitioning."""
+    if not is_partitioned():
+        return False
+    db.session.execute(text('SELECT ensure_audit_log_partitions(:months)'), {'months': months_ahead})
+    db.session.commit()
+    return True
+
+
+def _archive_rows(cutoff, batch_size, max_batches):
+    """Move rows older than cutoff to the archive table in id order, one batch per transaction"""
+    source = [getattr(AuditLog, name) for name in _COLUMNS]
+    moved = 0
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        ids = db.session.execute(
+            db.select(AuditLog.id).where(
+                AuditLog.timestamp < cutoff
+            ).order_by(AuditLog.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+
+        db.session.execute(
+            db.insert(AuditLogArchive).from_select(
+                list(_COLUMNS), db.select(*source).where(AuditLog.id.in_(ids))
+            )
+        )
+        result = db.session.execute(
+            db.delete(AuditLog).where(AuditLog.id.in_(ids)),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+
+        moved += result.rowcount
+        batches += 1
+        if len(ids) < batch_size:
+            break
+
+    return moved
+
+
+def archive_audit_logs(months=RETENTION_MONTHS, batch_size=BATCH_SIZE, max_batches=None):
+    """
+    Archive audit logs older than the retention period. Returns a dict with
+    the mode used ('partitions' or 'rows') and how many partitions or rows
+    were archived.
+    """
+    cutoff = retention_cutoff(months)
+    if is_partitioned():
+        archived = db.session.execute(
+            text('SELECT archive_audit_log_partitions(:cutoff)'), {'cutoff': cutoff}
+        ).scalar()
+        db.session.commit()
+        return {'mode': 'partitions', 'archived': archived, 'cutoff': cutoff.isoformat()}
+
+    moved = _archive_rows(datetime.combine(cutoff, datetime.min.time()), batch_size, max_batches)
+    return {'mode': 'rows', 'archived': moved, 'cutoff': cutoff.isoformat()}
+
+
+def maintain_audit_logs(months=RETENTION_MONTHS):
+    """Periodic job: create upcoming partitions, then archive expired months"""
+    ensure_partitions()
+    return archive_audit_logs(months)
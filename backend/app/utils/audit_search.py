@@ -0,0 +1,114 @@
+"""
+Full-text search over audit log details.
+PostgreSQL matches against the GIN expression index
+idx_audit_logs_details_fts (db-init/add_audit_log_search.sql) and ranks
+with ts_rank. SQLite uses an FTS5 table kept in sync by triggers, created
+on first use (and again whenever audit_logs was recreated, which drops the
+triggers), and ranks with bm25. Where FTS5 is not compiled in, every
+search term becomes a LIKE condition and results are not ranked.
+"""
+import threading
+from sqlalchemy import bindparam, func, literal_column, text, table
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.models import AuditLog
+from app.utils.db_utils import dialect_name
+
+SEARCH_CONFIG = "'simple'"  # No stemming or stop words: SKUs, PO numbers and names match as typed
+MAX_QUERY_LENGTH = 200
+
+_SQLITE_FTS_OBJECTS = ('audit_logs_fts', 'audit_logs_fts_insert', 'audit_logs_fts_delete', 'audit_logs_fts_update')
+_SQLITE_FTS_DDL = (
+    "DROP TABLE IF EXISTS audit_logs_fts",
+    "CREATE VIRTUAL TABLE audit_logs_fts USING fts5(details, content='audit_logs', content_rowid='id')",
+    """CREATE TRIGGER IF NOT EXISTS audit_logs_fts_insert AFTER INSERT ON audit_logs BEGIN
+        INSERT INTO audit_logs_fts(rowid, details) VALUES (new.id, new.details);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS audit_logs_fts_delete AFTER DELETE ON audit_logs BEGIN
+        INSERT INTO audit_logs_fts(audit_logs_fts, rowid, details) VALUES ('delete', old.id, old.details);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS audit_logs_fts_update AFTER UPDATE OF details ON audit_logs BEGIN
+        INSERT INTO audit_logs_fts(audit_logs_fts, rowid, details) VALUES ('delete', old.id, old.details);
+        INSERT INTO audit_logs_fts(rowid, details) VALUES (new.id, new.details);
+    END""",
+    "INSERT INTO audit_logs_fts(audit_logs_fts) VALUES ('rebuild')",
+)
+
+_sqlite_fts_missing = set()  # engine urls whose SQLite lacks FTS5
+_sqlite_fts_lock = threading.Lock()
+
+
+def _terms(q):
+    return q[:MAX_QUERY_LENGTH].split()
+
+
+def _sqlite_fts_objects(connection):
+    return connection.execute(
+        text("SELECT count(*) FROM sqlite_master WHERE name IN :names").bindparams(
+            bindparam('names', expanding=True)
+        ),
+        {'names': list(_SQLITE_FTS_OBJECTS)}
+    ).scalar()
+
+
+def _sqlite_fts_available():
+    """
+    Make sure the FTS5 table and its triggers exist; False if FTS5 is
+    missing. Checked on every search with one sqlite_master lookup, because
+    dropping and recreating audit_logs drops the triggers and leaves the
+    index stale.
+    """
+    engine = db.engine
+    key = str(engine.url)
+    if key in _sqlite_fts_missing:
+        return False
+    if _sqlite_fts_objects(db.session) == len(_SQLITE_FTS_OBJECTS):
+        return True
+    with _sqlite_fts_lock:
+        try:
+            with engine.begin() as connection:
+                if _sqlite_fts_objects(connection) != len(_SQLITE_FTS_OBJECTS):
+                    # Recreate the index too: after audit_logs was recreated it holds rows that are gone
+                    for statement in _SQLITE_FTS_DDL:
+                        connection.execute(text(statement))
+        except OperationalError as e:
+            if 'fts5' in str(e):
+                _sqlite_fts_missing.add(key)
+            return False
+    return True
+
+
+def _fts5_match(q):
+    """Quote every term so user input is never parsed as FTS5 syntax; terms are ANDed"""
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in _terms(q))
+
+
+def apply_search(query, q):
+    """
+    Restrict an AuditLog query to rows whose details match q. Returns the
+    query and a relevance expression (higher is better), or None when the
+    backend cannot rank.
+    """
+    if not _terms(q):
+        return query, None
+
+    if dialect_name() == 'postgresql':
+        # Must match the indexed expression exactly for the GIN index to be used
+        document = func.to_tsvector(literal_column(SEARCH_CONFIG), func.coalesce(AuditLog.details, literal_column("''")))
+        tsquery = func.websearch_to_tsquery(literal_column(SEARCH_CONFIG), q[:MAX_QUERY_LENGTH])
+        return query.filter(document.op('@@')(tsquery)), func.ts_rank(document, tsquery)
+
+    if dialect_name() == 'sqlite' and _sqlite_fts_available():
+        matches = db.select(
+            literal_column('rowid').label('log_id'),
+            literal_column('-bm25(audit_logs_fts)').label('rank')
+        ).select_from(
+            table('audit_logs_fts')
+        ).where(
+            text('audit_logs_fts MATCH :audit_search').bindparams(audit_search=_fts5_match(q))
+        ).subquery()
+        return query.join(matches, matches.c.log_id == AuditLog.id), matches.c.rank
+
+    for term in _terms(q):
+        query = query.filter(func.lower(AuditLog.details).contains(term.lower(), autoescape=True))
+    return query, None
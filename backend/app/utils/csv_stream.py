@@ -0,0 +1,57 @@
+"""
+Streaming CSV helpers.
+Rows are encoded incrementally so exports never hold the whole file in memory.
+Responses can optionally be gzip-compressed on the fly.
+"""
+import csv
+import zlib
+from flask import Response, stream_with_context
+
+
+class _Echo:
+    """File-like object whose write() hands the formatted line back to the caller"""
+    def write(self, value):
+        return value
+
+
+def iter_csv(header, rows, chunk_rows=500):
+    """Yield encoded CSV chunks of up to chunk_rows rows each"""
+    writer = csv.writer(_Echo())
+    chunk = [writer.writerow(header)]
+    
+    for row in rows:
+        chunk.append(writer.writerow(row))
+        if len(chunk) >= chunk_rows:
+            yield ''.join(chunk).encode('utf-8')
+            chunk = []
+    
+    if chunk:
+        yield ''.join(chunk).encode('utf-8')
+
+
+def iter_gzip(chunks, level=6):
+    """Compress a stream of byte chunks into a single gzip member, chunk by chunk"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 writes a gzip header
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def csv_response(header, rows, filename, compress=False):
+    """
+    Build a streaming attachment response for the given header and row
+    iterator. With compress=True the body is a .csv.gz file.
+    """
+    chunks = iter_csv(header, rows)
+    mimetype = 'text/csv'
+    if compress:
+        chunks = iter_gzip(chunks)
+        mimetype = 'application/gzip'
+        filename = f'{filename}.gz'
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,152 @@
+"""
+Dashboard summary maintenance.
+Totals shown on the dashboard are kept in dashboard_summary, one row per
+warehouse plus row 0 for all warehouses. Stock adjustments, item creation,
+reorder level changes and item and warehouse deletes update the rows
+incrementally in the same transaction, touching only the warehouses whose
+stock records are affected. Imports and a periodic task recompute them
+from the base tables.
+"""
+from datetime import datetime
+from sqlalchemy import case, func
+from app import db
+from app.models import DashboardSummary, Item, Stock
+from app.utils.db_utils import insert_ignore
+from app.utils.response_cache import invalidate_after_commit
+
+ALL_WAREHOUSES = 0
+CACHE_NAMESPACE = 'reports'  # Cached report responses derived from items and stock
+
+
+def _apply_deltas(warehouse_ids, deltas):
+    """Atomically add deltas to the summary rows of the given warehouses"""
+    ds = DashboardSummary
+    values = {column: getattr(ds, column) + delta for column, delta in deltas.items() if delta}
+    if not values:
+        return
+    values['updated_at'] = datetime.utcnow()
+
+    for warehouse_id in warehouse_ids:
+        db.session.execute(insert_ignore(ds).values(warehouse_id=warehouse_id))
+    db.session.execute(
+        db.update(ds).where(ds.warehouse_id.in_(warehouse_ids)).values(**values)
+    )
+    invalidate_after_commit(db.session, CACHE_NAMESPACE)
+
+
+def record_stock_change(warehouse_id, old_quantity, new_quantity, reorder_level, new_record=False):
+    """Update the summary for one stock record changing from old_quantity to new_quantity"""
+    reorder_level = reorder_level or 0
+    was_low = not new_record and old_quantity < reorder_level
+    is_low = new_quantity < reorder_level
+    low_delta = int(is_low) - int(was_low)
+
+    _apply_deltas([ALL_WAREHOUSES, warehouse_id], {
+        'total_stock': new_quantity - old_quantity,
+        'low_stock_items': low_delta,
+    })
+    if new_record:
+        _apply_deltas([warehouse_id], {'total_items': 1})
+
+
+def record_item_created(count=1):
+    """Update the summary for newly created items"""
+    _apply_deltas([ALL_WAREHOUSES], {'total_items': count})
+
+
+def _stock_levels(condition):
+    """(warehouse_id, quantity, reorder level) of the matching stock records, locked until commit"""
+    return db.session.query(
+        Stock.warehouse_id, Stock.quantity, func.coalesce(Item.reorder_level, 0)
+    ).join(Item, Item.id == Stock.item_id).filter(condition).with_for_update(of=Stock).all()
+
+
+def _apply_per_warehouse(deltas_by_warehouse, total_items=0):
+    """Apply each warehouse's deltas and their stock and low-stock sums to row 0"""
+    totals = {'total_items': total_items, 'total_stock': 0, 'low_stock_items': 0}
+    for warehouse_id, deltas in deltas_by_warehouse.items():
+        _apply_deltas([warehouse_id], deltas)
+        totals['total_stock'] += deltas.get('total_stock', 0)
+        totals['low_stock_items'] += deltas.get('low_stock_items', 0)
+    _apply_deltas([ALL_WAREHOUSES], totals)
+
+
+def record_reorder_level_change(item_id, old_level, new_level):
+    """Update low-stock counts for an item's stock records when its reorder level changes"""
+    old_level, new_level = old_level or 0, new_level or 0
+    _apply_per_warehouse({
+        warehouse_id: {'low_stock_items': int(quantity < new_level) - int(quantity < old_level)}
+        for warehouse_id, quantity, _ in _stock_levels(Stock.item_id == item_id)
+    })
+
+
+def record_item_deleted(item_id):
+    """Take an item and its stock records out of the summary; call before deleting it"""
+    _apply_per_warehouse({
+        warehouse_id: {
+            'total_items': -1,
+            'total_stock': -quantity,
+            'low_stock_items': -int(quantity < reorder_level),
+        }
+        for warehouse_id, quantity, reorder_level in _stock_levels(Stock.item_id == item_id)
+    }, total_items=-1)
+
+
+def record_warehouse_deleted(warehouse_id):
+    """Take a warehouse's stock records out of the summary; call before deleting it"""
+    levels = _stock_levels(Stock.warehouse_id == warehouse_id)
+    _apply_deltas([ALL_WAREHOUSES], {
+        'total_stock': -sum(quantity for _, quantity, _ in levels),
+        'low_stock_items': -sum(int(quantity < reorder_level) for _, quantity, reorder_level in levels),
+    })
+    db.session.execute(db.delete(DashboardSummary).where(DashboardSummary.warehouse_id == warehouse_id))
+    invalidate_after_commit(db.session, CACHE_NAMESPACE)
+
+
+def refresh_dashboard_summary(commit=True):
+    """
+    Recompute every summary row from items and stock with two aggregate
+    queries. Replaces all rows, so keep it out of request transactions.
+    """
+    low = case((Stock.quantity < func.coalesce(Item.reorder_level, 0), 1), else_=0)
+
+    per_warehouse = db.session.query(
+        Stock.warehouse_id,
+        func.count(func.distinct(Stock.item_id)),
+        func.coalesce(func.sum(Stock.quantity), 0),
+        func.coalesce(func.sum(low), 0)
+    ).join(Item, Item.id == Stock.item_id).group_by(Stock.warehouse_id).all()
+
+    total_items = db.session.query(func.count(Item.id)).scalar() or 0
+
+    now = datetime.utcnow()
+    rows = [{
+        'warehouse_id': ALL_WAREHOUSES,
+        'total_items': total_items,
+        'total_stock': sum(int(row[2]) for row in per_warehouse),
+        'low_stock_items': sum(int(row[3]) for row in per_warehouse),
+        'updated_at': now,
+    }]
+    rows.extend({
+        'warehouse_id': warehouse_id,
+        'total_items': items,
+        'total_stock': int(quantity),
+        'low_stock_items': int(low_count),
+        'updated_at': now,
+    } for warehouse_id, items, quantity, low_count in per_warehouse)
+
+    db.session.execute(db.delete(DashboardSummary))
+    db.session.execute(db.insert(DashboardSummary), rows)
+    invalidate_after_commit(db.session, CACHE_NAMESPACE)
+    if commit:
+        db.session.commit()
+    return len(rows)
+
+
+def get_dashboard_summary():
+    """All summary rows keyed by warehouse id, computing them on first use"""
+    rows = {row.warehouse_id: row for row in DashboardSummary.query.all()}
+    if ALL_WAREHOUSES not in rows:
+        refresh_dashboard_summary()
+        rows = {row.warehouse_id: row for row in DashboardSummary.query.all()}
+    return rows
@@ -0,0 +1,59 @@
+"""
+Dialect-aware SQL helpers.
+Production runs on PostgreSQL; SQLite is supported for local development.
+"""
+import json
+from sqlalchemy import Date, cast, func, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+
+
+def dialect_name():
+    """Name of the dialect the session is bound to ('postgresql', 'sqlite', ...)"""
+    return db.session.get_bind().dialect.name
+
+
+def _dialect_insert(model):
+    name = dialect_name()
+    if name == 'postgresql':
+        return postgresql.insert(model)
+    if name == 'sqlite':
+        return sqlite.insert(model)
+    return None
+
+
+def insert_ignore(model):
+    """INSERT ... ON CONFLICT DO NOTHING for the current dialect"""
+    stmt = _dialect_insert(model)
+    if stmt is None:
+        return insert(model).prefix_with('IGNORE')
+    return stmt.on_conflict_do_nothing()
+
+
+def estimate_count(query):
+    """
+    Planner row estimate for a query on PostgreSQL (EXPLAIN, no scan).
+    Other dialects have no cheap estimate and fall back to an exact count.
+    """
+    if dialect_name() != 'postgresql':
+        return query.order_by(None).count()
+    
+    statement = query.order_by(None).statement
+    compiled = statement.compile(dialect=db.session.get_bind().dialect)
+    plan = db.session.connection().exec_driver_sql(
+        f'EXPLAIN (FORMAT JSON) {compiled}', compiled.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def date_bucket(column, unit):
+    """Start of the day, week (Monday) or month containing a date column"""
+    if dialect_name() == 'postgresql':
+        return cast(func.date_trunc(unit, column), Date)
+    if unit == 'week':
+        return func.date(column, '-6 days', 'weekday 1')
+    if unit == 'month':
+        return func.date(column, 'start of month')
+    return func.date(column)
@@ -0,0 +1,163 @@
+"""
+Transactional email outbox.
+Emails are written to the email_outbox table in the same commit as the
+business change, then delivered by a Celery worker with retries and
+exponential backoff. HTTP requests never wait on SMTP.
+"""
+import os
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+from app.models import EmailOutbox
+from app.utils.email_sender import EmailNotConfigured
+from app.utils.mail_transport import get_transport
+from app.utils.db_utils import dialect_name
+
+MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 6))
+BACKOFF_BASE_SECONDS = int(os.getenv('EMAIL_OUTBOX_BACKOFF_SECONDS', 30))
+BACKOFF_MAX_SECONDS = 3600
+STALE_CLAIM_MINUTES = 15
+
+
+def queue_email(to_email, subject, body):
+    """Stage an email in the outbox as part of the current transaction"""
+    message = EmailOutbox(to_email=to_email, subject=subject, body=body)
+    db.session.add(message)
+    return message
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_outbox_ids(session, flush_context):
+    ids = [obj.id for obj in session.new if isinstance(obj, EmailOutbox)]
+    if ids:
+        session.info.setdefault('outbox_ids', []).extend(ids)
+
+
+@event.listens_for(Session, 'after_commit')
+def _dispatch_after_commit(session):
+    ids = session.info.pop('outbox_ids', None)
+    if ids:
+        dispatch(ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('outbox_ids', None)
+
+
+def dispatch(outbox_ids):
+    """Hand committed outbox rows to the worker; the periodic drain covers broker outages"""
+    from app.tasks import deliver_outbox_emails
+    try:
+        deliver_outbox_emails.delay(list(outbox_ids))
+    except Exception as e:
+        current_app.logger.warning(f'Could not enqueue outbox delivery, will retry on next drain: {str(e)}')
+
+
+def backoff_seconds(attempts):
+    """Exponential backoff: 30s, 60s, 120s, ... capped at one hour"""
+    return min(BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0), BACKOFF_MAX_SECONDS)
+
+
+def claim_messages(outbox_ids=None, limit=100):
+    """
+    Atomically mark due messages as 'sending' so concurrent workers
+    never deliver the same row twice. Returns the claimed rows.
+    """
+    now = datetime.utcnow()
+    query = db.select(EmailOutbox.id).where(
+        EmailOutbox.status == 'pending',
+        EmailOutbox.next_attempt_at <= now
+    )
+    if outbox_ids is not None:
+        query = query.where(EmailOutbox.id.in_(outbox_ids))
+    query = query.order_by(EmailOutbox.id).limit(limit)
+    if dialect_name() == 'postgresql':
+        query = query.with_for_update(skip_locked=True)
+
+    candidate_ids = db.session.execute(query).scalars().all()
+    if not candidate_ids:
+        db.session.commit()
+        return []
+
+    db.session.execute(
+        db.update(EmailOutbox).where(
+            EmailOutbox.id.in_(candidate_ids),
+            EmailOutbox.status == 'pending'
+        ).values(status='sending', claimed_at=now)
+    )
+    db.session.commit()
+
+    return EmailOutbox.query.filter(
+        EmailOutbox.id.in_(candidate_ids),
+        EmailOutbox.status == 'sending',
+        EmailOutbox.claimed_at == now
+    ).order_by(EmailOutbox.id).all()
+
+
+def _mark_sent(message):
+    message.status = 'sent'
+    message.sent_at = datetime.utcnow()
+    message.last_error = None
+
+
+def _mark_failed(message, error, retry=True):
+    message.last_error = str(error)
+    if retry and message.attempts < MAX_ATTEMPTS:
+        message.status = 'pending'
+        message.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff_seconds(message.attempts))
+    else:
+        message.status = 'failed'
+
+
+def deliver_messages(messages):
+    """Send claimed messages as one batch over a pooled session and record each outcome"""
+    results = get_transport().send_messages([
+        (message.to_email, message.subject, message.body) for message in messages
+    ])
+
+    for message, error in zip(messages, results):
+        message.attempts += 1
+        if error is None:
+            _mark_sent(message)
+        elif isinstance(error, EmailNotConfigured):
+            current_app.logger.warning('SMTP not configured. Email not sent.')
+            _mark_failed(message, error, retry=False)
+        else:
+            current_app.logger.error(f'Failed to send outbox email {message.id}: {str(error)}')
+            _mark_failed(message, error)
+    db.session.commit()
+
+
+def next_retry_delay(outbox_ids):
+    """Seconds until the earliest pending retry among the given rows, or None"""
+    next_attempt = db.session.query(db.func.min(EmailOutbox.next_attempt_at)).filter(
+        EmailOutbox.id.in_(outbox_ids),
+        EmailOutbox.status == 'pending'
+    ).scalar()
+    if next_attempt is None:
+        return None
+    return max(int((next_attempt - datetime.utcnow()).total_seconds()), 1)
+
+
+def release_stale_claims():
+    """Return rows claimed by a worker that died mid-delivery to the queue"""
+    cutoff = datetime.utcnow() - timedelta(minutes=STALE_CLAIM_MINUTES)
+    result = db.session.execute(
+        db.update(EmailOutbox).where(
+            EmailOutbox.status == 'sending',
+            EmailOutbox.claimed_at < cutoff
+        ).values(status='pending')
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def process_outbox(outbox_ids=None, limit=100):
+    """Claim and deliver due messages. Returns the number of messages attempted."""
+    messages = claim_messages(outbox_ids, limit)
+    if messages:
+        deliver_messages(messages)
+    return len(messages)
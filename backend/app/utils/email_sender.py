@@ -3,48 +3,76 @@ SMTP email sending utility.
 Configured via environment variables.
 """
 import os
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from flask import current_app
 
 
-def send_email(to_email, subject, body):
+class EmailNotConfigured(Exception):
+    """Raised when SMTP settings are missing"""
+
+
+def get_smtp_settings():
     """
-    Send email using SMTP configuration from environment variables.
-    
+    Read SMTP configuration from environment variables.
+
     Required environment variables:
     - SMTP_HOST: SMTP server host
     - SMTP_PORT: SMTP server port
     - SMTP_USER: SMTP username
     - SMTP_PASSWORD: SMTP password
     - SMTP_FROM_EMAIL: From email address
+
+    Optional:
+    - SMTP_USE_TLS: Set to 'false' for a local SMTP stub without
+      STARTTLS or authentication (SMTP_USER/SMTP_PASSWORD not required)
+    """
+    use_tls = os.getenv('SMTP_USE_TLS', 'true').lower() not in ('0', 'false', 'no')
+    settings = {
+        'host': os.getenv('SMTP_HOST'),
+        'port': int(os.getenv('SMTP_PORT', 587)),
+        'user': os.getenv('SMTP_USER'),
+        'password': os.getenv('SMTP_PASSWORD'),
+        'use_tls': use_tls,
+    }
+    settings['from_email'] = os.getenv('SMTP_FROM_EMAIL', settings['user'] or 'noreply@localhost')
+
+    required = [settings['host']]
+    if use_tls:
+        required += [settings['user'], settings['password']]
+    if not all(required):
+        raise EmailNotConfigured('SMTP not configured')
+
+    return settings
+
+
+def build_message(from_email, to_email, subject, body):
+    msg = MIMEMultipart()
+    msg['From'] = from_email
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain'))
+    return msg
+
+
+def deliver_email(to_email, subject, body):
+    """Send one email over a pooled SMTP session, raising on configuration or SMTP errors"""
+    from app.utils.mail_transport import get_transport
+    get_transport().send(to_email, subject, body)
+
+
+def send_email(to_email, subject, body):
+    """
+    Send email using SMTP configuration from environment variables.
+    Returns True on success, False otherwise (errors are logged).
     """
     try:
-        smtp_host = os.getenv('SMTP_HOST')
-        smtp_port = int(os.getenv('SMTP_PORT', 587))
-        smtp_user = os.getenv('SMTP_USER')
-        smtp_password = os.getenv('SMTP_PASSWORD')
-        from_email = os.getenv('SMTP_FROM_EMAIL', smtp_user)
-        
-        if not all([smtp_host, smtp_user, smtp_password]):
-            current_app.logger.warning('SMTP not configured. Email not sent.')
-            return False
-        
-        msg = MIMEMultipart()
-        msg['From'] = from_email
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        msg.attach(MIMEText(body, 'plain'))
-        
-        server = smtplib.SMTP(smtp_host, smtp_port)
-        server.starttls()
-        server.login(smtp_user, smtp_password)
-        server.send_message(msg)
-        server.quit()
-        
+        deliver_email(to_email, subject, body)
         current_app.logger.info(f'Email sent to {to_email}: {subject}')
         return True
+    except EmailNotConfigured:
+        current_app.logger.warning('SMTP not configured. Email not sent.')
+        return False
     except Exception as e:
         current_app.logger.error(f'Failed to send email: {str(e)}')
         return False
@@ -1,6 +1,7 @@
 import pandas as pd
 from app import db
 from app.models import Item, ImportJob
+from app.utils.dashboard_summary import refresh_dashboard_summary
 from datetime import datetime
 
 def process_file_sync(filepath, job_id):
@@ -53,6 +54,7 @@ def process_file_sync(filepath, job_id):
             except Exception as e:
                 errors.append(f"Row {idx + 2}: {str(e)}")
         
+        refresh_dashboard_summary(commit=False)
         db.session.commit()
         
         job.processed_rows = len(df)
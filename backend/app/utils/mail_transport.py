@@ -0,0 +1,259 @@
+"""
+Pooled SMTP transport.
+Keeps authenticated SMTP sessions alive per worker process, sends batches
+of messages over one session and reconnects transparently when the server
+drops the connection. Tracks handshake and throughput metrics.
+"""
+import os
+import socket
+import smtplib
+import threading
+import time
+from collections import deque
+from app.utils.email_sender import get_smtp_settings, build_message
+from app.utils.redis_client import get_redis, reset_redis
+
+IDLE_TIMEOUT_SECONDS = int(os.getenv('SMTP_POOL_IDLE_TIMEOUT', 60))
+POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', 2))
+CONNECT_TIMEOUT_SECONDS = 30
+RATE_WINDOW_SECONDS = 60
+METRICS_KEY_PREFIX = 'mail_transport:metrics:'
+METRICS_TTL_SECONDS = 3600
+
+# Per-message rejections that leave the session usable
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+
+class MailMetrics:
+    """Per-process counters for the SMTP transport"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.handshakes = 0
+        self.reconnects = 0
+        self.messages_sent = 0
+        self.failures = 0
+        self.batches = 0
+        self._recent = deque()
+
+    def record_handshake(self, reconnect=False):
+        with self._lock:
+            self.handshakes += 1
+            if reconnect:
+                self.reconnects += 1
+
+    def record_sent(self):
+        now = time.time()
+        with self._lock:
+            self.messages_sent += 1
+            self._recent.append(now)
+            self._trim(now)
+
+    def record_failure(self, count=1):
+        with self._lock:
+            self.failures += count
+
+    def record_batch(self):
+        with self._lock:
+            self.batches += 1
+
+    def _trim(self, now):
+        cutoff = now - RATE_WINDOW_SECONDS
+        while self._recent and self._recent[0] < cutoff:
+            self._recent.popleft()
+
+    def snapshot(self):
+        now = time.time()
+        with self._lock:
+            self._trim(now)
+            uptime = max(now - self.started_at, 1e-9)
+            return {
+                'pid': os.getpid(),
+                'handshakes': self.handshakes,
+                'reconnects': self.reconnects,
+                'messages_sent': self.messages_sent,
+                'failures': self.failures,
+                'batches': self.batches,
+                'messages_per_second': round(len(self._recent) / RATE_WINDOW_SECONDS, 3),
+                'lifetime_messages_per_second': round(self.messages_sent / uptime, 3),
+                'messages_per_handshake': round(self.messages_sent / self.handshakes, 2) if self.handshakes else None,
+                'uptime_seconds': int(uptime),
+            }
+
+
+class SMTPConnectionPool:
+    """Small pool of authenticated SMTP sessions, discarded after an idle timeout"""
+
+    def __init__(self, metrics, max_size=POOL_SIZE, idle_timeout=IDLE_TIMEOUT_SECONDS):
+        self.metrics = metrics
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def connect(self, reconnect=False):
+        settings = get_smtp_settings()
+        server = smtplib.SMTP(settings['host'], settings['port'], timeout=CONNECT_TIMEOUT_SECONDS)
+        try:
+            if settings['use_tls']:
+                server.starttls()
+            if settings['user'] and settings['password']:
+                server.login(settings['user'], settings['password'])
+        except Exception:
+            self._close(server)
+            raise
+        self.metrics.record_handshake(reconnect=reconnect)
+        return server
+
+    def acquire(self):
+        now = time.monotonic()
+        with self._lock:
+            while self._idle:
+                server, released_at = self._idle.pop()
+                if now - released_at < self.idle_timeout:
+                    return server
+                self._close(server)
+        return self.connect()
+
+    def release(self, server):
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append((server, time.monotonic()))
+                return
+        self._close(server)
+
+    def discard(self, server):
+        self._close(server)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _ in idle:
+            self._close(server)
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+
+class MailTransport:
+    """Sends messages over pooled SMTP sessions"""
+
+    def __init__(self):
+        self.metrics = MailMetrics()
+        self.pool = SMTPConnectionPool(self.metrics)
+
+    def send_messages(self, messages):
+        """
+        Send (to_email, subject, body) tuples over a single session.
+        Returns a list with None for each delivered message or the
+        exception that prevented delivery.
+        """
+        if not messages:
+            return []
+
+        results = []
+        try:
+            settings = get_smtp_settings()
+            server = self.pool.acquire()
+        except Exception as e:
+            self.metrics.record_failure(len(messages))
+            self.publish_metrics()
+            return [e] * len(messages)
+
+        self.metrics.record_batch()
+        for index, (to_email, subject, body) in enumerate(messages):
+            msg = build_message(settings['from_email'], to_email, subject, body)
+            try:
+                try:
+                    server.send_message(msg)
+                except MESSAGE_ERRORS:
+                    raise
+                except Exception:
+                    # The session was dropped (idle timeout, network); reconnect once and retry
+                    self.pool.discard(server)
+                    server = None
+                    server = self.pool.connect(reconnect=True)
+                    server.send_message(msg)
+            except MESSAGE_ERRORS as e:
+                # Rejected message; the session itself is still usable
+                self.metrics.record_failure()
+                results.append(e)
+            except Exception as e:
+                # Could not re-establish a session: fail the rest of the batch
+                remaining = len(messages) - index
+                self.metrics.record_failure(remaining)
+                results.extend([e] * remaining)
+                if server is not None:
+                    self.pool.discard(server)
+                    server = None
+                break
+            else:
+                self.metrics.record_sent()
+                results.append(None)
+
+        if server is not None:
+            self.pool.release(server)
+        self.publish_metrics()
+
+        return results
+
+    def send(self, to_email, subject, body):
+        """Send a single message, raising on failure"""
+        error = self.send_messages([(to_email, subject, body)])[0]
+        if error is not None:
+            raise error
+
+    def publish_metrics(self):
+        """Share this process's metrics through Redis so any web worker can report them"""
+        client = get_redis()
+        if client is None:
+            return
+        key = f'{METRICS_KEY_PREFIX}{socket.gethostname()}:{os.getpid()}'
+        try:
+            client.hset(key, mapping={k: v for k, v in self.metrics.snapshot().items() if v is not None})
+            client.expire(key, METRICS_TTL_SECONDS)
+        except Exception:
+            reset_redis()
+
+
+_transport = None
+_transport_pid = None
+
+
+def get_transport():
+    """Per-process transport (recreated after fork so sessions are never shared)"""
+    global _transport, _transport_pid
+    if _transport is None or _transport_pid != os.getpid():
+        _transport = MailTransport()
+        _transport_pid = os.getpid()
+    return _transport
+
+
+def collect_metrics():
+    """Metrics of every process that published recently, plus this process"""
+    processes = {}
+    client = get_redis()
+    if client is not None:
+        try:
+            for key in client.scan_iter(f'{METRICS_KEY_PREFIX}*'):
+                processes[key[len(METRICS_KEY_PREFIX):]] = client.hgetall(key)
+        except Exception:
+            reset_redis()
+
+    local_key = f'{socket.gethostname()}:{os.getpid()}'
+    processes.setdefault(local_key, get_transport().metrics.snapshot())
+
+    totals = {'handshakes': 0, 'messages_sent': 0, 'failures': 0, 'reconnects': 0, 'messages_per_second': 0.0}
+    for snapshot in processes.values():
+        for field in totals:
+            totals[field] += type(totals[field])(float(snapshot.get(field, 0) or 0))
+
+    return {'totals': totals, 'processes': processes}
@@ -0,0 +1,171 @@
+"""
+Per-user unread notification counters.
+Counters live in Redis (or an in-process dict when Redis is unavailable)
+and are adjusted after each committed write, so the unread badge is a
+single key lookup instead of a COUNT(*). A missing counter is rebuilt
+from the table on demand and a periodic task corrects any drift.
+"""
+import threading
+import time
+from collections import Counter
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Notification
+from app.utils.redis_client import get_redis, reset_redis
+
+KEY_PREFIX = 'notifications:unread:'
+REDIS_TTL_SECONDS = 86400
+LOCAL_TTL_SECONDS = 300  # Short, because other processes cannot adjust this copy
+
+# Adjust a counter only if it is cached; a missing key is recounted on read
+_ADJUST_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return nil end
+local value = redis.call('INCRBY', KEYS[1], ARGV[1])
+if value < 0 then redis.call('SET', KEYS[1], 0, 'KEEPTTL') value = 0 end
+return value
+"""
+
+_local = {}
+_local_lock = threading.Lock()
+
+
+def _key(user_id):
+    return f'{KEY_PREFIX}{user_id}'
+
+
+def count_unread(user_id):
+    """Authoritative unread count from the table"""
+    return Notification.query.filter_by(user_id=user_id, is_read=False).count()
+
+
+def _local_get(user_id):
+    with _local_lock:
+        entry = _local.get(user_id)
+        if entry is None or entry[1] < time.monotonic():
+            _local.pop(user_id, None)
+            return None
+        return entry[0]
+
+
+def _local_set(user_id, value):
+    with _local_lock:
+        _local[user_id] = (max(value, 0), time.monotonic() + LOCAL_TTL_SECONDS)
+
+
+def _local_adjust(user_id, delta):
+    with _local_lock:
+        entry = _local.get(user_id)
+        if entry is not None:
+            _local[user_id] = (max(entry[0] + delta, 0), entry[1])
+
+
+def unread_count(user_id):
+    """Cached unread count, falling back to a COUNT on a cache miss"""
+    client = get_redis()
+    if client is not None:
+        try:
+            value = client.get(_key(user_id))
+            if value is not None:
+                return int(value)
+            count = count_unread(user_id)
+            client.set(_key(user_id), count, ex=REDIS_TTL_SECONDS, nx=True)
+            return count
+        except Exception:
+            reset_redis()
+
+    value = _local_get(user_id)
+    if value is None:
+        value = count_unread(user_id)
+        _local_set(user_id, value)
+    return value
+
+
+def _apply(deltas, resets):
+    client = get_redis()
+    if client is not None:
+        try:
+            pipe = client.pipeline(transaction=False)
+            for user_id in resets:
+                pipe.set(_key(user_id), 0, ex=REDIS_TTL_SECONDS)
+            for user_id, delta in deltas.items():
+                if delta:
+                    pipe.eval(_ADJUST_SCRIPT, 1, _key(user_id), delta)
+            pipe.execute()
+        except Exception:
+            reset_redis()
+            # Counters may now be stale; drop them so the next read recounts
+            try:
+                client.delete(*[_key(user_id) for user_id in set(resets) | set(deltas)])
+            except Exception:
+                pass
+
+    for user_id in resets:
+        _local_set(user_id, 0)
+    for user_id, delta in deltas.items():
+        _local_adjust(user_id, delta)
+
+
+def adjust_unread(user_id, delta):
+    """Change a user's unread counter by delta once the current transaction commits"""
+    db.session.info.setdefault('unread_deltas', Counter())[user_id] += delta
+
+
+def reset_unread(user_id):
+    """Set a user's unread counter to zero once the current transaction commits"""
+    db.session.info.setdefault('unread_deltas', Counter()).pop(user_id, None)
+    db.session.info.setdefault('unread_resets', set()).add(user_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_after_commit(session):
+    deltas = session.info.pop('unread_deltas', None) or {}
+    resets = session.info.pop('unread_resets', None) or set()
+    if deltas or resets:
+        _apply(deltas, resets)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('unread_deltas', None)
+    session.info.pop('unread_resets', None)
+
+
+def reconcile_unread_counts():
+    """
+    Overwrite every cached counter with the table's value using one
+    GROUP BY over unread rows. Returns the number of counters corrected.
+    """
+    counts = dict(
+        db.session.query(Notification.user_id, db.func.count(Notification.id)).filter(
+            Notification.is_read.is_(False)
+        ).group_by(Notification.user_id).all()
+    )
+    db.session.commit()
+
+    corrected = 0
+    client = get_redis()
+    if client is not None:
+        try:
+            keys = list(client.scan_iter(f'{KEY_PREFIX}*'))
+            if keys:
+                cached = client.mget(keys)
+                pipe = client.pipeline(transaction=False)
+                for key, value in zip(keys, cached):
+                    user_id = int(key[len(KEY_PREFIX):])
+                    actual = counts.get(user_id, 0)
+                    if value is None or int(value) != actual:
+                        pipe.set(key, actual, ex=REDIS_TTL_SECONDS, xx=True)
+                        corrected += 1
+                pipe.execute()
+        except Exception:
+            reset_redis()
+
+    with _local_lock:
+        for user_id, (value, expires_at) in list(_local.items()):
+            actual = counts.get(user_id, 0)
+            if value != actual:
+                _local[user_id] = (actual, expires_at)
+                corrected += 1
+
+    return corrected
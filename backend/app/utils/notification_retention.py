@@ -0,0 +1,46 @@
+"""
+Notification retention.
+Read notifications older than the retention period are deleted in small
+batches, each in its own transaction, so the job never holds long locks
+or builds one huge delete. Unread notifications are always kept.
+"""
+import os
+from datetime import datetime, timedelta
+from app import db
+from app.models import Notification
+
+RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', 90))
+BATCH_SIZE = int(os.getenv('NOTIFICATION_RETENTION_BATCH_SIZE', 5000))
+
+
+def purge_read_notifications(days=RETENTION_DAYS, batch_size=BATCH_SIZE, max_batches=None):
+    """Delete read notifications older than days. Returns the number of rows deleted."""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    deleted = 0
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        ids = db.session.execute(
+            db.select(Notification.id).where(
+                Notification.is_read.is_(True),
+                Notification.created_at < cutoff
+            ).order_by(Notification.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+
+        result = db.session.execute(
+            db.delete(Notification).where(
+                Notification.id.in_(ids),
+                Notification.is_read.is_(True)
+            ),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+
+        deleted += result.rowcount
+        batches += 1
+        if len(ids) < batch_size:
+            break
+
+    return deleted
@@ -0,0 +1,155 @@
+"""
+Notification fan-out for the Server-Sent Events stream.
+Events are published on per-user Redis pub/sub channels. Each process runs
+one pattern subscription and hands events to the streams it serves, so any
+worker can publish and any worker can hold the connection. Without Redis,
+events are delivered to streams served by the publishing process only.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from sqlalchemy import event as orm_event
+from sqlalchemy.orm import Session
+from app.utils.redis_client import get_redis, reset_redis
+
+CHANNEL_PREFIX = 'notifications:user:'
+HEARTBEAT_SECONDS = 15
+MAX_STREAM_SECONDS = int(os.getenv('NOTIFICATION_STREAM_MAX_SECONDS', 900))
+SUBSCRIBER_QUEUE_SIZE = 100
+LISTENER_RETRY_SECONDS = 5
+
+
+class LocalBroker:
+    """Per-process registry of open streams, keyed by user id"""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[user_id].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, user_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def publish(self, user_id, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                pass  # Slow client; it resynchronises from the next unread_count event
+
+
+_broker = LocalBroker()
+_listener = None
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+
+def _listen():
+    """Relay messages from the Redis pattern subscription to local streams"""
+    while True:
+        client = get_redis()
+        if client is None:
+            time.sleep(LISTENER_RETRY_SECONDS)
+            continue
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.psubscribe(f'{CHANNEL_PREFIX}*')
+            while True:
+                message = pubsub.get_message(timeout=1.0)
+                if message is None:
+                    continue
+                user_id = int(message['channel'][len(CHANNEL_PREFIX):])
+                _broker.publish(user_id, message['data'])
+        except Exception:
+            reset_redis()
+            time.sleep(LISTENER_RETRY_SECONDS)
+        finally:
+            try:
+                pubsub.close()
+            except Exception:
+                pass
+
+
+def _ensure_listener():
+    """Start this process's Redis listener (restarted after fork)"""
+    global _listener, _listener_pid
+    if get_redis() is None:
+        return
+    with _listener_lock:
+        if _listener is None or _listener_pid != os.getpid() or not _listener.is_alive():
+            _listener = threading.Thread(target=_listen, name='notification-stream-listener', daemon=True)
+            _listener.start()
+            _listener_pid = os.getpid()
+
+
+def publish_event(user_id, event, data):
+    """Push an event to every open stream of a user, across all workers"""
+    message = json.dumps({'event': event, 'data': data})
+    client = get_redis()
+    if client is not None:
+        try:
+            client.publish(f'{CHANNEL_PREFIX}{user_id}', message)
+            return
+        except Exception:
+            reset_redis()
+    _broker.publish(user_id, message)
+
+
+def publish_after_commit(session, user_id, event, data):
+    """Publish an event once the session's current transaction commits"""
+    session.info.setdefault('stream_events', []).append((user_id, event, data))
+
+
+@orm_event.listens_for(Session, 'after_commit')
+def _publish_after_commit(session):
+    for user_id, event, data in session.info.pop('stream_events', None) or ():
+        publish_event(user_id, event, data)
+
+
+@orm_event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('stream_events', None)
+
+
+def format_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+def event_stream(user_id, initial_events=()):
+    """
+    Generator of SSE frames for one connection. Sends heartbeats so proxies
+    keep the connection open and ends after MAX_STREAM_SECONDS so the
+    browser reconnects with a fresh token.
+    """
+    _ensure_listener()
+    subscriber = _broker.subscribe(user_id)
+    deadline = time.monotonic() + MAX_STREAM_SECONDS
+    try:
+        yield 'retry: 5000\n\n'
+        for event, data in initial_events:
+            yield format_event(event, data)
+
+        while time.monotonic() < deadline:
+            try:
+                message = json.loads(subscriber.get(timeout=HEARTBEAT_SECONDS))
+            except queue.Empty:
+                yield ': heartbeat\n\n'
+                continue
+            yield format_event(message['event'], message['data'])
+    finally:
+        _broker.unsubscribe(user_id, subscriber)
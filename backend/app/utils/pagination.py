@@ -0,0 +1,60 @@
+"""
+Keyset (cursor) pagination helpers.
+A cursor encodes the sort key of the last row of a page, so the next page
+is fetched with an indexed range condition instead of OFFSET.
+"""
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor string cannot be decoded"""
+
+
+def encode_cursor(*values):
+    """Encode sort key values (datetimes, ints, strings) as an opaque URL-safe token"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, *types):
+    """Decode a cursor produced by encode_cursor, converting each value to the given type"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError('wrong number of values')
+        return tuple(
+            datetime.fromisoformat(value) if kind is datetime else kind(value)
+            for kind, value in zip(types, values)
+        )
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {cursor}') from e
+
+
+def keyset_after(columns, values, descending=False):
+    """
+    Row-value condition "(c1, c2, ...) > (v1, v2, ...)" (or < when descending),
+    written out as OR/AND terms so it works on every dialect and can use a
+    composite index on the same columns.
+    """
+    terms = []
+    for index, (column, value) in enumerate(zip(columns, values)):
+        equal_prefix = [c == v for c, v in zip(columns[:index], values[:index])]
+        comparison = column < value if descending else column > value
+        terms.append(and_(*equal_prefix, comparison))
+    return or_(*terms)
+
+
+def page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Clamp a requested page size"""
+    try:
+        size = int(value) if value is not None else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, maximum))
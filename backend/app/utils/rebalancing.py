@@ -0,0 +1,118 @@
+"""
+Inter-location stock rebalancing.
+A location is short of an item by min_threshold - quantity and has a
+surplus of quantity - max_threshold (only where max_threshold is set).
+plan_rebalance() matches shortages with surpluses of the same item
+greedily, largest first: each side is laid out as consecutive ranges on one
+axis per item (cumulative sums) and every overlap between a shortage range
+and a surplus range is one transfer. That needs at most
+shortages + surpluses - 1 transfers per item and runs as a handful of
+vectorized pandas operations over all items at once.
+
+Locations carry no distances, so every pair of locations costs the same and
+minimizing the number of transfers is the objective.
+"""
+import os
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from app import db
+from app.models import Location, StockLocation
+from app.utils.stock_transfers import apply_transfers, TransferError
+
+BATCH_SIZE = int(os.getenv('REBALANCE_BATCH_SIZE', 500))
+PLAN_COLUMNS = ['item_id', 'from_location_id', 'to_location_id', 'quantity']
+
+
+def _load_levels(item_id=None):
+    statement = select(
+        StockLocation.item_id, StockLocation.location_id, StockLocation.quantity,
+        StockLocation.min_threshold, StockLocation.max_threshold
+    ).join(
+        Location, Location.id == StockLocation.location_id
+    ).where(Location.is_active.is_(True))
+    if item_id is not None:
+        statement = statement.where(StockLocation.item_id == item_id)
+    levels = pd.DataFrame(
+        db.session.execute(statement).all(),
+        columns=['item_id', 'location_id', 'quantity', 'min_threshold', 'max_threshold']
+    )
+    return levels.astype({'quantity': 'int64', 'min_threshold': 'float64', 'max_threshold': 'float64'})
+
+
+def _ranges(frame, amount):
+    """Sort by item then amount (largest first) and add each row's [start, end) on its item's axis"""
+    frame = frame.sort_values(['item_id', amount], ascending=[True, False], kind='stable')
+    end = frame.groupby('item_id')[amount].cumsum()
+    return frame.assign(start=end - frame[amount], end=end)
+
+
+def match_shortages(levels, location_id=None):
+    """
+    Transfers (item_id, from_location_id, to_location_id, quantity) that
+    cover shortages from surpluses. With location_id only that location's
+    shortages are covered. Also returns the shortage rows.
+    """
+    quantity = levels['quantity'].to_numpy(dtype='float64')
+    shortage = np.nan_to_num(levels['min_threshold'].to_numpy() - quantity).clip(min=0)
+    surplus = np.nan_to_num(quantity - levels['max_threshold'].to_numpy()).clip(min=0)
+    levels = levels.assign(shortage=shortage.astype('int64'), surplus=surplus.astype('int64'))
+
+    shortages = levels[levels['shortage'] > 0]
+    if location_id is not None:
+        shortages = shortages[shortages['location_id'] == location_id]
+    spare = levels[(levels['surplus'] > 0) & levels['item_id'].isin(shortages['item_id'])]
+    short = shortages[shortages['item_id'].isin(spare['item_id'])]
+
+    pairs = _ranges(short[['item_id', 'location_id', 'shortage']], 'shortage').merge(
+        _ranges(spare[['item_id', 'location_id', 'surplus']], 'surplus'),
+        on='item_id', suffixes=('_to', '_from')
+    )
+    moved = np.minimum(pairs['end_to'], pairs['end_from']) - np.maximum(pairs['start_to'], pairs['start_from'])
+    plan = pd.DataFrame({
+        'item_id': pairs['item_id'],
+        'from_location_id': pairs['location_id_from'],
+        'to_location_id': pairs['location_id_to'],
+        'quantity': moved,
+    })
+    return plan[plan['quantity'] > 0].astype('int64').reset_index(drop=True), shortages
+
+
+def plan_rebalance(item_id=None, location_id=None):
+    """Proposed transfers and a summary of the shortages they cover"""
+    plan, shortages = match_shortages(_load_levels(item_id), location_id)
+    short_units = int(shortages['shortage'].sum())
+    covered = int(plan['quantity'].sum())
+    return plan, {
+        'transfers': len(plan),
+        'units': covered,
+        'short_locations': len(shortages),
+        'short_units': short_units,
+        'uncovered_units': short_units - covered,
+    }
+
+
+def execute_plan(transfers, user_id, batch_size=BATCH_SIZE, notes='Rebalancing'):
+    """
+    Apply a plan (a DataFrame or list of transfer dicts) one batch per
+    transaction. A batch that no longer fits current stock is rolled back
+    and reported; the other batches still go through.
+    """
+    if isinstance(transfers, pd.DataFrame):
+        transfers = [
+            {key: int(value) for key, value in row.items()}
+            for row in transfers[PLAN_COLUMNS].to_dict('records')
+        ]
+
+    executed = 0
+    failed = []
+    for start in range(0, len(transfers), batch_size):
+        batch = transfers[start:start + batch_size]
+        try:
+            apply_transfers(batch, user_id, notes=notes)
+            db.session.commit()
+            executed += len(batch)
+        except TransferError as e:
+            db.session.rollback()
+            failed.append({'offset': start, 'count': len(batch), 'error': str(e)})
+    return {'executed': executed, 'failed': failed}
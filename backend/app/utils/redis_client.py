@@ -0,0 +1,54 @@
+"""
+Shared Redis client.
+Uses REDIS_URL, falling back to the Celery broker URL. Returns None when
+Redis is not configured or unreachable so callers can use an in-process
+fallback instead.
+"""
+import os
+import time
+import redis
+from app.config import Config
+
+RETRY_INTERVAL_SECONDS = 30
+
+_client = None
+_retry_at = 0.0
+
+
+def get_redis_url():
+    url = os.getenv('REDIS_URL') or Config.CELERY_BROKER_URL
+    if not url or not url.startswith(('redis://', 'rediss://', 'unix://')):
+        return None
+    return url
+
+
+def get_redis():
+    """Return a connected Redis client, or None if Redis is unavailable"""
+    global _client, _retry_at
+
+    if _client is not None:
+        return _client
+    if time.monotonic() < _retry_at:
+        return None
+
+    url = get_redis_url()
+    if not url:
+        _retry_at = float('inf')
+        return None
+
+    try:
+        client = redis.Redis.from_url(url, socket_connect_timeout=1, socket_timeout=2, decode_responses=True)
+        client.ping()
+    except redis.RedisError:
+        _retry_at = time.monotonic() + RETRY_INTERVAL_SECONDS
+        return None
+
+    _client = client
+    return _client
+
+
+def reset_redis():
+    """Drop the cached client after a connection error so the next call reconnects"""
+    global _client, _retry_at
+    _client = None
+    _retry_at = time.monotonic() + RETRY_INTERVAL_SECONDS
@@ -0,0 +1,214 @@
+"""
+Replenishment suggestions.
+Every item/location pair is loaded into pandas with its thresholds, its
+outbound velocity (completed StockTransfer quantity shipped out of the
+location over WINDOW_DAYS) and the quantity already on open purchase
+orders. Order quantities for all pairs are computed in one vectorized pass:
+
+    reorder point = min_threshold + daily velocity * lead time
+    order-up-to   = max_threshold (never below the reorder point), or
+                    reorder point + daily velocity * COVERAGE_DAYS when unset
+    suggested     = order-up-to - (on hand + on order), for pairs whose
+                    on hand + on order is below the reorder point
+
+The lead time is the supplier's average delivery days from its scorecard,
+else LEAD_TIME_DAYS. The aggregation runs in SQL, so the frames hold one
+row per pair.
+"""
+import os
+from uuid import uuid4
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+from app import db
+from app.models import (
+    Item, Location, PurchaseOrder, PurchaseOrderLine, StockLocation, StockTransfer, SupplierScorecard
+)
+from app.utils.audit import log_action
+from app.utils.workflow import OPEN_PO_STATUSES
+
+WINDOW_DAYS = int(os.getenv('REPLENISHMENT_WINDOW_DAYS', 90))
+COVERAGE_DAYS = int(os.getenv('REPLENISHMENT_COVERAGE_DAYS', 30))
+LEAD_TIME_DAYS = float(os.getenv('REPLENISHMENT_LEAD_TIME_DAYS', 14))
+
+KEYS = ['item_id', 'location_id']
+
+
+def _frame(statement, columns):
+    return pd.DataFrame(db.session.execute(statement).all(), columns=columns)
+
+
+def _load_pairs(location_id=None, supplier_id=None):
+    statement = select(
+        StockLocation.item_id,
+        StockLocation.location_id,
+        StockLocation.quantity,
+        func.coalesce(StockLocation.min_threshold, Item.reorder_level, 0),
+        StockLocation.max_threshold,
+        Item.supplier_id,
+        Item.unit_price,
+    ).join(
+        Item, Item.id == StockLocation.item_id
+    ).join(
+        Location, Location.id == StockLocation.location_id
+    ).where(Location.is_active.is_(True))
+    if location_id is not None:
+        statement = statement.where(StockLocation.location_id == location_id)
+    if supplier_id is not None:
+        statement = statement.where(Item.supplier_id == supplier_id)
+
+    pairs = _frame(statement, KEYS + ['quantity', 'min_threshold', 'max_threshold', 'supplier_id', 'unit_price'])
+    return pairs.astype({
+        'quantity': 'int64',
+        'min_threshold': 'int64',
+        'max_threshold': 'float64',  # NaN when unset
+        'supplier_id': 'Int64',  # Nullable: items without a supplier
+        'unit_price': 'float64',
+    })
+
+
+def _load_outbound(since):
+    return _frame(
+        select(
+            StockTransfer.item_id, StockTransfer.from_location_id, func.sum(StockTransfer.quantity)
+        ).where(
+            StockTransfer.from_location_id.isnot(None),
+            StockTransfer.status == 'completed',
+            StockTransfer.transfer_date >= since
+        ).group_by(StockTransfer.item_id, StockTransfer.from_location_id),
+        KEYS + ['outbound']
+    )
+
+
+def _load_on_order():
+    return _frame(
+        select(
+            PurchaseOrderLine.item_id, PurchaseOrderLine.location_id, func.sum(PurchaseOrderLine.quantity)
+        ).join(
+            PurchaseOrder, PurchaseOrder.id == PurchaseOrderLine.purchase_order_id
+        ).where(
+            PurchaseOrder.status.in_(OPEN_PO_STATUSES),
+            PurchaseOrderLine.location_id.isnot(None)
+        ).group_by(PurchaseOrderLine.item_id, PurchaseOrderLine.location_id),
+        KEYS + ['on_order']
+    )
+
+
+def _load_lead_times():
+    return _frame(
+        select(SupplierScorecard.supplier_id, SupplierScorecard.avg_delivery_days).where(
+            SupplierScorecard.avg_delivery_days.isnot(None)
+        ),
+        ['supplier_id', 'lead_time_days']
+    ).astype({'supplier_id': 'Int64'})
+
+
+def compute_suggestions(pairs, window_days=WINDOW_DAYS, coverage_days=COVERAGE_DAYS,
+                        lead_time_days=LEAD_TIME_DAYS):
+    """
+    Add velocity and suggestion columns to a pairs frame (see the module
+    docstring). Expects outbound, on_order and lead_time_days columns, NaN
+    where unknown. Returns only the rows with something to order.
+    """
+    quantity = pairs['quantity'].to_numpy(dtype='float64')
+    position = quantity + pairs['on_order'].fillna(0).to_numpy()
+    daily = pairs['outbound'].fillna(0).to_numpy(dtype='float64') / window_days
+    lead = pairs['lead_time_days'].fillna(lead_time_days).to_numpy()
+    maximum = pairs['max_threshold'].to_numpy()
+
+    reorder_point = pairs['min_threshold'].to_numpy() + daily * lead
+    order_up_to = np.where(
+        np.isnan(maximum), reorder_point + daily * coverage_days, np.fmax(maximum, reorder_point)
+    )
+    suggested = np.where(position < reorder_point, np.ceil(order_up_to - position), 0).clip(min=0)
+
+    result = pairs.assign(
+        daily_velocity=daily.round(3),
+        reorder_point=np.ceil(reorder_point).astype('int64'),
+        order_up_to=np.ceil(order_up_to).astype('int64'),
+        suggested_quantity=suggested.astype('int64'),
+    )
+    result = result[result['suggested_quantity'] > 0]
+    return result.assign(value=(result['suggested_quantity'] * result['unit_price']).round(2))
+
+
+def suggest_reorders(location_id=None, supplier_id=None, window_days=WINDOW_DAYS,
+                     coverage_days=COVERAGE_DAYS, now=None):
+    """Suggested order quantities for every item/location pair that needs one, as a DataFrame"""
+    since = (now or datetime.utcnow()) - timedelta(days=window_days)
+    pairs = _load_pairs(location_id, supplier_id).merge(
+        _load_outbound(since), on=KEYS, how='left'
+    ).merge(
+        _load_on_order(), on=KEYS, how='left'
+    ).merge(
+        _load_lead_times(), on='supplier_id', how='left'
+    )
+    return compute_suggestions(pairs, window_days, coverage_days)
+
+
+def supplier_totals(suggestions):
+    """Lines, units and value per supplier (supplier_id None: items without one)"""
+    totals = suggestions.groupby('supplier_id', dropna=False).agg(
+        lines=('item_id', 'size'), quantity=('suggested_quantity', 'sum'), value=('value', 'sum')
+    ).reset_index()
+    return [
+        {
+            'supplier_id': None if pd.isna(row.supplier_id) else int(row.supplier_id),
+            'lines': int(row.lines),
+            'quantity': int(row.quantity),
+            'value': round(float(row.value), 2),
+        }
+        for row in totals.itertuples(index=False)
+    ]
+
+
+def create_draft_orders(suggestions, warehouse_id, user_id=None):
+    """
+    One draft purchase order per supplier, delivered to warehouse_id, with a
+    line per suggested item/location. Items without a supplier are skipped.
+    Returns the orders and the number of lines written.
+    """
+    suggestions = suggestions[suggestions['supplier_id'].notna()]
+    if suggestions.empty:
+        return [], 0
+
+    now = datetime.utcnow()
+    totals = suggestions.groupby('supplier_id')['value'].sum()
+    orders = {}
+    for supplier, total in totals.items():
+        order = PurchaseOrder(
+            po_number=f'RPL-{uuid4().hex}',  # Placeholder until the id is known
+            supplier_id=int(supplier),
+            warehouse_id=warehouse_id,
+            status='draft',
+            total_amount=round(float(total), 2),
+            created_by=user_id,
+            comments='Generated from replenishment suggestions'
+        )
+        db.session.add(order)
+        orders[supplier] = order
+    db.session.flush()
+    # The id makes the number unique even when two runs land in the same second
+    for order in orders.values():
+        order.po_number = f'RPL-{now:%Y%m%d}-{order.id}'
+
+    lines = pd.DataFrame({
+        'purchase_order_id': suggestions['supplier_id'].map({supplier: order.id for supplier, order in orders.items()}),
+        'item_id': suggestions['item_id'],
+        'location_id': suggestions['location_id'],
+        'quantity': suggestions['suggested_quantity'],
+        'unit_price': suggestions['unit_price'],
+    })
+    db.session.execute(db.insert(PurchaseOrderLine), lines.to_dict('records'))
+
+    for order in orders.values():
+        log_action(
+            user_id=user_id,
+            action='CREATE',
+            entity_type='PurchaseOrder',
+            entity=order,
+            details=f'Created draft purchase order {order.po_number} from replenishment suggestions'
+        )
+    db.session.commit()
+    return list(orders.values()), len(lines)
@@ -0,0 +1,257 @@
+"""
+Response cache for expensive read endpoints.
+Cached JSON responses are keyed by endpoint, query string and role. A miss
+is computed by one request while concurrent requests for the same key wait
+for its result (single flight). Once an entry is older than its TTL, one
+request refreshes it while the others keep getting the stale copy until
+stale_ttl runs out. Entries live in Redis when available, otherwise in
+process memory.
+"""
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, current_app, request
+from flask_jwt_extended import get_jwt
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.utils.redis_client import get_redis, reset_redis
+
+KEY_PREFIX = 'response_cache:'
+LOCK_TIMEOUT_SECONDS = 30
+WAIT_TIMEOUT_SECONDS = 10
+WAIT_INTERVAL_SECONDS = 0.05
+LOCAL_MAX_ENTRIES = 1024
+
+# Release a lock only if this request still holds it
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+return 0
+"""
+
+
+class LocalBackend:
+    """In-process store used when Redis is unavailable (per worker process)"""
+
+    def __init__(self, max_entries=LOCAL_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._locks = {}
+        self._generations = {}
+        self._mutex = threading.Lock()
+
+    def get(self, key):
+        with self._mutex:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl):
+        with self._mutex:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def acquire(self, key, token):
+        now = time.monotonic()
+        with self._mutex:
+            holder = self._locks.get(key)
+            if holder is not None and holder[1] > now:
+                return False
+            self._locks[key] = (token, now + LOCK_TIMEOUT_SECONDS)
+            return True
+
+    def release(self, key, token):
+        with self._mutex:
+            holder = self._locks.get(key)
+            if holder is not None and holder[0] == token:
+                del self._locks[key]
+
+    def generation(self, namespace):
+        with self._mutex:
+            return self._generations.get(namespace, 0)
+
+    def bump(self, namespace):
+        with self._mutex:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+
+class RedisBackend:
+    """Shared store so every worker sees the same entries and locks"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, value, ex=max(int(ttl), 1))
+
+    def acquire(self, key, token):
+        return bool(self.client.set(f'{key}:lock', token, nx=True, ex=LOCK_TIMEOUT_SECONDS))
+
+    def release(self, key, token):
+        self.client.eval(_RELEASE_SCRIPT, 1, f'{key}:lock', token)
+
+    def generation(self, namespace):
+        return int(self.client.get(f'{KEY_PREFIX}gen:{namespace}') or 0)
+
+    def bump(self, namespace):
+        self.client.incr(f'{KEY_PREFIX}gen:{namespace}')
+
+
+_local_backend = LocalBackend()
+
+
+def get_backend():
+    client = get_redis()
+    if client is not None:
+        return RedisBackend(client)
+    return _local_backend
+
+
+def invalidate(namespace):
+    """Drop every cached response of a namespace by moving it to a new generation"""
+    try:
+        get_backend().bump(namespace)
+    except Exception:
+        reset_redis()
+    _local_backend.bump(namespace)
+
+
+def invalidate_after_commit(session, namespace):
+    """Invalidate a namespace once the session's current transaction commits"""
+    session.info.setdefault('cache_invalidations', set()).add(namespace)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    for namespace in session.info.pop('cache_invalidations', None) or ():
+        invalidate(namespace)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('cache_invalidations', None)
+
+
+def _build_key(backend, namespace, endpoint, args, role=None, user=None):
+    parts = [namespace, str(backend.generation(namespace)), endpoint]
+    if role is not None:
+        parts.append(f'role={role}')
+    if user is not None:
+        parts.append(f'user={user}')
+    parts.append('&'.join(f'{k}={v}' for k, v in sorted(args)))
+    return KEY_PREFIX + ':'.join(parts)
+
+
+def _cache_key(backend, namespace, vary_on_role, vary_on_user):
+    claims = get_jwt() if (vary_on_role or vary_on_user) else {}
+    return _build_key(
+        backend, namespace, request.endpoint or request.path, request.args.items(multi=True),
+        role=claims.get('role', '') if vary_on_role else None,
+        user=claims.get('sub', '') if vary_on_user else None
+    )
+
+
+def _load(raw):
+    return json.loads(raw) if raw else None
+
+
+def _entry(response):
+    return {
+        'body': response.get_data(as_text=True),
+        'status': response.status_code,
+        'mimetype': response.mimetype,
+        'stored_at': time.time(),
+    }
+
+
+def store(namespace, endpoint, response, ttl, stale_ttl, args=None):
+    """
+    Cache a response for endpoint and query args outside of a request, e.g.
+    from a task that precomputes it. Only for views cached with
+    vary_on_role=False and vary_on_user=False.
+    """
+    try:
+        backend = get_backend()
+        key = _build_key(backend, namespace, endpoint, (args or {}).items())
+        backend.set(key, json.dumps(_entry(response)), ttl + stale_ttl)
+    except Exception:
+        reset_redis()
+
+
+def _serve(entry, state):
+    response = Response(entry['body'], status=entry['status'], mimetype=entry['mimetype'])
+    response.headers['X-Cache'] = state
+    response.headers['Age'] = str(max(int(time.time() - entry['stored_at']), 0))
+    return response
+
+
+def cached_response(namespace, ttl=30, stale_ttl=120, vary_on_role=True, vary_on_user=False):
+    """
+    Cache a JSON view for ttl seconds, serving it stale for up to stale_ttl
+    more while one request recomputes it. Only 200 responses are cached.
+    Must be applied below @jwt_required() so the role is available.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                backend = get_backend()
+                key = _cache_key(backend, namespace, vary_on_role, vary_on_user)
+                entry = _load(backend.get(key))
+            except Exception:
+                reset_redis()
+                return view(*args, **kwargs)
+
+            if entry is not None and time.time() - entry['stored_at'] < ttl:
+                return _serve(entry, 'HIT')
+
+            token = uuid.uuid4().hex
+            try:
+                leader = backend.acquire(key, token)
+                if not leader:
+                    if entry is not None:
+                        # Someone else is refreshing: serve the stale copy
+                        return _serve(entry, 'STALE')
+                    # Someone else is computing this miss: wait for its result
+                    deadline = time.monotonic() + WAIT_TIMEOUT_SECONDS
+                    while time.monotonic() < deadline:
+                        time.sleep(WAIT_INTERVAL_SECONDS)
+                        entry = _load(backend.get(key))
+                        if entry is not None:
+                            return _serve(entry, 'COALESCED')
+            except Exception:
+                reset_redis()
+                leader = False
+
+            if not leader:
+                return view(*args, **kwargs)
+
+            try:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    try:
+                        backend.set(key, json.dumps(_entry(response)), ttl + stale_ttl)
+                    except Exception:
+                        reset_redis()
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            finally:
+                try:
+                    backend.release(key, token)
+                except Exception:
+                    reset_redis()
+
+        return wrapper
+    return decorator
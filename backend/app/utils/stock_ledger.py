@@ -0,0 +1,240 @@
+"""
+Stock movement ledger and snapshots.
+Every change to a Stock or StockLocation quantity is collected at flush
+time and appended to stock_movements just before the commit, in the same
+transaction as the change. Routes label the movements of their
+transaction with set_movement_reason().
+
+Snapshot runs store every non-zero balance as of a watermark (the last
+movement included). Each run is built from the previous run plus the
+movements after it, and on-hand quantities at any time are one snapshot
+read plus a replay of the movements since. The watermark lags real time
+by SETTLE_SECONDS so transactions still in flight are not skipped.
+"""
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import event, func, inspect, literal, select, union_all
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Stock, StockLocation, StockMovement, StockSnapshot, StockSnapshotRun
+
+SETTLE_SECONDS = int(os.getenv('STOCK_SNAPSHOT_SETTLE_SECONDS', 300))
+
+
+def set_movement_reason(reason, ref=None, user_id=None, ref_type=None):
+    """
+    Label the stock movements written by the current transaction. ref is a
+    model instance (its id is read at commit time) or an id with ref_type.
+    """
+    db.session.info['stock_movement'] = {
+        'reason': reason,
+        'ref': ref,
+        'ref_type': ref_type or (type(ref).__name__ if ref is not None and not isinstance(ref, int) else None),
+        'user_id': user_id,
+    }
+
+
+def _movement(obj, delta, quantity_after, reason=None):
+    return {
+        'item_id': obj.item_id,
+        'warehouse_id': obj.warehouse_id if isinstance(obj, Stock) else None,
+        'location_id': obj.location_id if isinstance(obj, StockLocation) else None,
+        'delta': delta,
+        'quantity_after': quantity_after,
+        'reason': reason,
+        'created_at': datetime.utcnow(),
+    }
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_movements(session, flush_context):
+    # new/dirty/deleted and attribute history still describe the flush that just ran
+    rows = []
+    for obj in session.new:
+        if isinstance(obj, (Stock, StockLocation)) and obj.quantity:
+            rows.append(_movement(obj, obj.quantity, obj.quantity))
+
+    for obj in session.dirty:
+        if not isinstance(obj, (Stock, StockLocation)):
+            continue
+        history = inspect(obj).attrs.quantity.history
+        if not history.has_changes() or not history.deleted:
+            continue  # Unchanged, or the old value was never loaded (reconciliation corrects it)
+        delta = (obj.quantity or 0) - (history.deleted[0] or 0)
+        if delta:
+            rows.append(_movement(obj, delta, obj.quantity))
+
+    for obj in session.deleted:
+        if isinstance(obj, (Stock, StockLocation)) and obj.quantity:
+            rows.append(_movement(obj, -obj.quantity, 0, reason='deleted'))
+
+    if rows:
+        session.info.setdefault('stock_movements', []).extend(rows)
+
+
+@event.listens_for(Session, 'before_commit')
+def _write_movements(session):
+    session.flush()
+    rows = session.info.pop('stock_movements', None)
+    if not rows:
+        return
+    context = session.info.get('stock_movement') or {}
+    ref = context.get('ref')
+    labels = {
+        'ref_type': context.get('ref_type'),
+        'ref_id': ref if ref is None or isinstance(ref, int) else ref.id,
+        'user_id': context.get('user_id'),
+    }
+    for row in rows:
+        row['reason'] = row['reason'] or context.get('reason', 'other')
+        row.update(labels)
+    session.connection().execute(StockMovement.__table__.insert(), rows)
+
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _clear_movements(session):
+    session.info.pop('stock_movement', None)
+    session.info.pop('stock_movements', None)
+
+
+def _scope(model, item_id=None, warehouse_id=None, location_id=None, level=None):
+    filters = []
+    if item_id is not None:
+        filters.append(model.item_id == item_id)
+    if warehouse_id is not None:
+        filters.append(model.warehouse_id == warehouse_id)
+    if location_id is not None:
+        filters.append(model.location_id == location_id)
+    if level == 'warehouse':
+        filters.append(model.warehouse_id.isnot(None))
+    elif level == 'location':
+        filters.append(model.location_id.isnot(None))
+    return filters
+
+
+def _balances(run, movement_filters=(), **scope):
+    """Non-zero balances per (item, warehouse, location): run's rows plus the movements after it"""
+    parts = []
+    if run is not None:
+        parts.append(select(
+            StockSnapshot.item_id, StockSnapshot.warehouse_id, StockSnapshot.location_id,
+            StockSnapshot.quantity.label('quantity')
+        ).where(StockSnapshot.run_id == run.id, *_scope(StockSnapshot, **scope)))
+    parts.append(select(
+        StockMovement.item_id, StockMovement.warehouse_id, StockMovement.location_id,
+        StockMovement.delta.label('quantity')
+    ).where(
+        StockMovement.id > (run.watermark if run is not None else 0),
+        *movement_filters,
+        *_scope(StockMovement, **scope)
+    ))
+    combined = union_all(*parts).subquery()
+    total = func.sum(combined.c.quantity)
+    return select(
+        combined.c.item_id, combined.c.warehouse_id, combined.c.location_id, total.label('quantity')
+    ).group_by(
+        combined.c.item_id, combined.c.warehouse_id, combined.c.location_id
+    ).having(total != 0)
+
+
+def latest_run(before=None):
+    """Most recent snapshot run, or the most recent one covering only movements up to before"""
+    query = StockSnapshotRun.query
+    if before is not None:
+        query = query.filter(StockSnapshotRun.covered_until <= before)
+    return query.order_by(StockSnapshotRun.covered_until.desc(), StockSnapshotRun.id.desc()).first()
+
+
+def take_snapshot(now=None):
+    """Write a snapshot run from the previous one and the movements since. Returns the run, or None."""
+    covered_until = (now or datetime.utcnow()) - timedelta(seconds=SETTLE_SECONDS)
+    previous = latest_run()
+    if previous is not None and previous.covered_until >= covered_until:
+        return None
+
+    watermark = db.session.query(func.max(StockMovement.id)).filter(
+        StockMovement.created_at < covered_until
+    ).scalar() or 0
+    if previous is not None:
+        watermark = max(watermark, previous.watermark)
+
+    run = StockSnapshotRun(watermark=watermark, covered_until=covered_until)
+    db.session.add(run)
+    db.session.flush()
+
+    balances = _balances(previous, [StockMovement.id <= watermark]).subquery()
+    result = db.session.execute(
+        db.insert(StockSnapshot).from_select(
+            ['run_id', 'item_id', 'warehouse_id', 'location_id', 'quantity'],
+            select(literal(run.id), balances.c.item_id, balances.c.warehouse_id,
+                   balances.c.location_id, balances.c.quantity)
+        )
+    )
+    run.row_count = result.rowcount
+    db.session.commit()
+    return run
+
+
+def on_hand(as_of=None, item_id=None, warehouse_id=None, location_id=None, level=None):
+    """
+    Non-zero quantities per (item, warehouse, location) at as_of (now when
+    None). Returns the rows and the snapshot run they were replayed from.
+    """
+    run = latest_run(as_of)
+    movement_filters = [StockMovement.created_at <= as_of] if as_of is not None else []
+    rows = db.session.execute(_balances(
+        run, movement_filters,
+        item_id=item_id, warehouse_id=warehouse_id, location_id=location_id, level=level
+    )).all()
+    return rows, run
+
+
+def reconcile_stock_ledger(apply=False, user_id=None):
+    """
+    Compare live Stock/StockLocation quantities with the ledger. With
+    apply=True a correcting movement is written for every difference
+    ('opening_balance' while the ledger is empty). Returns the differences.
+    """
+    ledger = {(row.item_id, row.warehouse_id, row.location_id): int(row.quantity) for row in on_hand()[0]}
+    live = {}
+    for item_id, warehouse_id, quantity in db.session.query(Stock.item_id, Stock.warehouse_id, Stock.quantity):
+        live[(item_id, warehouse_id, None)] = quantity or 0
+    for item_id, location_id, quantity in db.session.query(
+        StockLocation.item_id, StockLocation.location_id, StockLocation.quantity
+    ):
+        live[(item_id, None, location_id)] = quantity or 0
+
+    differences = []
+    for key in sorted(set(ledger) | set(live), key=lambda k: tuple(-1 if v is None else v for v in k)):
+        actual = live.get(key, 0)
+        recorded = ledger.get(key, 0)
+        if actual != recorded:
+            item_id, warehouse_id, location_id = key
+            differences.append({
+                'item_id': item_id,
+                'warehouse_id': warehouse_id,
+                'location_id': location_id,
+                'ledger_quantity': recorded,
+                'actual_quantity': actual,
+                'difference': actual - recorded,
+            })
+
+    if apply and differences:
+        reason = 'reconciliation' if ledger else 'opening_balance'
+        now = datetime.utcnow()
+        db.session.execute(db.insert(StockMovement), [
+            {
+                'item_id': diff['item_id'],
+                'warehouse_id': diff['warehouse_id'],
+                'location_id': diff['location_id'],
+                'delta': diff['difference'],
+                'quantity_after': diff['actual_quantity'],
+                'reason': reason,
+                'user_id': user_id,
+                'created_at': now,
+            }
+            for diff in differences
+        ])
+    db.session.commit()
+    return differences
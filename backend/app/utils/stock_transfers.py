@@ -0,0 +1,104 @@
+"""
+Stock transfers between locations.
+apply_transfers() moves any number of transfers in the caller's
+transaction: the StockLocation rows involved are loaded (and locked on
+PostgreSQL) with one query, every transfer is validated against the running
+quantities before anything changes, and the StockTransfer rows and audit
+entries are staged together. The caller commits.
+"""
+from app import db
+from app.models import Item, Location, StockLocation, StockTransfer
+from app.utils.audit import log_action
+from app.utils.dashboard_summary import CACHE_NAMESPACE
+from app.utils.response_cache import invalidate_after_commit
+from app.utils.stock_ledger import set_movement_reason
+
+
+class TransferError(ValueError):
+    """A transfer in the batch is invalid; nothing was changed"""
+
+
+def _by_id(model, ids, label):
+    rows = {row.id: row for row in model.query.filter(model.id.in_(ids))} if ids else {}
+    if len(rows) != len(ids):
+        raise TransferError(f'{label} not found')
+    return rows
+
+
+def apply_transfers(transfers, user_id, notes=''):
+    """
+    Apply transfers given as dicts with item_id, from_location_id (None for
+    stock received from outside), to_location_id and quantity. Raises
+    TransferError before changing anything if one of them cannot be made.
+    Returns the new StockTransfer objects.
+    """
+    if not transfers:
+        return []
+    if any(t['quantity'] <= 0 for t in transfers):
+        raise TransferError('Quantity must be positive')
+
+    item_ids = {t['item_id'] for t in transfers}
+    location_ids = {t['to_location_id'] for t in transfers} | {
+        t['from_location_id'] for t in transfers if t.get('from_location_id')
+    }
+    items = _by_id(Item, item_ids, 'Item')
+    locations = _by_id(Location, location_ids, 'Location')
+
+    # Lock in id order so concurrent batches touching the same rows cannot deadlock
+    stock = {
+        (row.item_id, row.location_id): row
+        for row in StockLocation.query.filter(
+            StockLocation.item_id.in_(item_ids), StockLocation.location_id.in_(location_ids)
+        ).order_by(StockLocation.id).with_for_update()
+    }
+
+    quantities = {key: row.quantity for key, row in stock.items()}
+    for t in transfers:
+        if t.get('from_location_id'):
+            source = (t['item_id'], t['from_location_id'])
+            if quantities.get(source, 0) < t['quantity']:
+                raise TransferError('Insufficient stock at source location')
+            quantities[source] -= t['quantity']
+        destination = (t['item_id'], t['to_location_id'])
+        quantities[destination] = quantities.get(destination, 0) + t['quantity']
+
+    for (item_id, location_id), quantity in quantities.items():
+        row = stock.get((item_id, location_id))
+        if row is None:
+            db.session.add(StockLocation(
+                item_id=item_id, location_id=location_id, quantity=quantity, updated_by=user_id
+            ))
+        elif row.quantity != quantity:
+            row.quantity = quantity
+            row.updated_by = user_id
+
+    created = []
+    for t in transfers:
+        transfer = StockTransfer(
+            item_id=t['item_id'],
+            from_location_id=t.get('from_location_id'),
+            to_location_id=t['to_location_id'],
+            quantity=t['quantity'],
+            transferred_by=user_id,
+            notes=notes,
+            status='completed'
+        )
+        db.session.add(transfer)
+        created.append(transfer)
+
+        from_loc = locations.get(t.get('from_location_id'))
+        from_name = from_loc.name if from_loc else 'External'
+        log_action(
+            user_id=user_id,
+            action='TRANSFER',
+            entity_type='StockTransfer',
+            entity=transfer,
+            details=f"Transferred {t['quantity']} units of {items[t['item_id']].name} "
+                    f"from {from_name} to {locations[t['to_location_id']].name}",
+            buffered=True
+        )
+
+    # A single transfer is referenced from its ledger movements; a batch shares one label
+    set_movement_reason('transfer', ref=created[0] if len(created) == 1 else None, user_id=user_id)
+    invalidate_after_commit(db.session, CACHE_NAMESPACE)
+    return created
@@ -0,0 +1,203 @@
+"""
+Daily stock snapshots for trend reporting.
+capture_daily_snapshot() copies every non-zero Stock and StockLocation
+quantity into the append-only stock_daily_snapshots table with one
+INSERT ... SELECT per source table, once per UTC day. A unique index on
+(day, stock record) and ON CONFLICT DO NOTHING make a retried or
+overlapping run a no-op instead of writing the day twice. Rows are never
+updated; downsample_daily_snapshots() thins old history instead: every day
+is kept for DAILY_DAYS, then the last snapshot of each week until
+WEEKLY_DAYS, then the last of each month until RETENTION_DAYS.
+"""
+import os
+from datetime import date, datetime, timedelta
+from sqlalchemy import Date, func, literal, literal_column, null, select
+from app import db
+from app.models import Category, Item, Location, Stock, StockDailySnapshot, StockLocation, Warehouse
+from app.utils.db_utils import date_bucket, insert_ignore
+
+DAILY_DAYS = int(os.getenv('STOCK_TREND_DAILY_DAYS', 120))
+WEEKLY_DAYS = int(os.getenv('STOCK_TREND_WEEKLY_DAYS', 730))
+RETENTION_DAYS = int(os.getenv('STOCK_TREND_RETENTION_DAYS', 1825))
+
+BUCKETS = ('day', 'week', 'month')
+GROUPS = ('item', 'category', 'warehouse', 'location', 'total')
+
+_COLUMNS = ['snapshot_date', 'item_id', 'warehouse_id', 'location_id', 'quantity']
+
+
+def _insert_snapshot(day):
+    """Copy current quantities for day, skipping stock records already captured for it"""
+    snapshot_date = literal(day, Date)
+    sources = (
+        select(snapshot_date, Stock.item_id, Stock.warehouse_id, null(), Stock.quantity).where(
+            Stock.quantity != 0
+        ),
+        select(snapshot_date, StockLocation.item_id, null(), StockLocation.location_id, StockLocation.quantity).where(
+            StockLocation.quantity != 0
+        ),
+    )
+    return sum(
+        db.session.execute(insert_ignore(StockDailySnapshot).from_select(_COLUMNS, source)).rowcount
+        for source in sources
+    )
+
+
+def capture_daily_snapshot(day=None):
+    """Snapshot today's (or day's) quantities. Returns the row count, or None if already captured."""
+    day = day or datetime.utcnow().date()
+    captured = db.session.query(StockDailySnapshot.id).filter(
+        StockDailySnapshot.snapshot_date == day
+    ).first()
+    if captured:
+        return None
+
+    rows = _insert_snapshot(day)
+    db.session.commit()
+    return rows
+
+
+def _dates_to_keep(dates, today):
+    """Every date within DAILY_DAYS, the last per week until WEEKLY_DAYS, the last per month until RETENTION_DAYS"""
+    daily_from = today - timedelta(days=DAILY_DAYS)
+    weekly_from = today - timedelta(days=WEEKLY_DAYS)
+    retained_from = today - timedelta(days=RETENTION_DAYS)
+
+    keep = set()
+    last_in_bucket = {}
+    for day in dates:
+        if day >= daily_from:
+            keep.add(day)
+            continue
+        if day >= weekly_from:
+            bucket = ('week',) + tuple(day.isocalendar()[:2])
+        elif day >= retained_from:
+            bucket = ('month', day.year, day.month)
+        else:
+            continue
+        if bucket not in last_in_bucket or day > last_in_bucket[bucket]:
+            last_in_bucket[bucket] = day
+    return keep | set(last_in_bucket.values())
+
+
+def downsample_daily_snapshots(today=None):
+    """Delete snapshot dates dropped by the retention policy, one date per transaction. Returns rows deleted."""
+    today = today or datetime.utcnow().date()
+    dates = [
+        _as_date(value) for value in db.session.execute(
+            select(StockDailySnapshot.snapshot_date).where(
+                StockDailySnapshot.snapshot_date < today - timedelta(days=DAILY_DAYS)
+            ).distinct()
+        ).scalars()
+    ]
+    keep = _dates_to_keep(dates, today)
+
+    deleted = 0
+    for day in sorted(set(dates) - keep):
+        result = db.session.execute(
+            db.delete(StockDailySnapshot).where(StockDailySnapshot.snapshot_date == day),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+        deleted += result.rowcount
+    return deleted
+
+
+def _as_date(value):
+    # date_bucket() yields strings on SQLite
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def _group_key(group_by):
+    return {
+        'item': StockDailySnapshot.item_id,
+        'category': func.coalesce(Item.category_id, 0),  # 0: uncategorized
+        'warehouse': StockDailySnapshot.warehouse_id,
+        'location': StockDailySnapshot.location_id,
+        'total': literal_column("'total'"),
+    }[group_by]
+
+
+def _labels(group_by, keys):
+    keys = [key for key in keys if key is not None]
+    if group_by == 'total' or not keys:
+        return {}
+    if group_by == 'item':
+        return {item.id: f'{item.sku} - {item.name}' for item in Item.query.filter(Item.id.in_(keys))}
+    model = {'category': Category, 'warehouse': Warehouse, 'location': Location}[group_by]
+    labels = {row.id: row.name for row in model.query.filter(model.id.in_(keys))}
+    if group_by == 'category':
+        labels[0] = 'Uncategorized'
+    return labels
+
+
+def stock_trends(days=90, bucket='day', group_by='item', level='warehouse', item_id=None,
+                 category_id=None, warehouse_id=None, location_id=None, limit=50, today=None):
+    """
+    On-hand series over the last days days, one per group, bucketed by day,
+    week or month. A bucket's quantity is the average of the daily totals
+    captured in it. When there are more than limit groups, the largest by
+    quantity on the latest snapshot date are returned.
+    """
+    end = today or datetime.utcnow().date()
+    start = end - timedelta(days=days - 1)
+    # warehouse-level and location-level rows can describe the same units, so never mix them
+    level = 'location' if group_by == 'location' else 'warehouse' if group_by == 'warehouse' else level
+
+    key = _group_key(group_by).label('key')
+    filters = [StockDailySnapshot.snapshot_date.between(start, end)]
+    if level == 'location':
+        filters.append(StockDailySnapshot.location_id.isnot(None))
+    else:
+        filters.append(StockDailySnapshot.warehouse_id.isnot(None))
+    if item_id is not None:
+        filters.append(StockDailySnapshot.item_id == item_id)
+    if warehouse_id is not None:
+        filters.append(StockDailySnapshot.warehouse_id == warehouse_id)
+    if location_id is not None:
+        filters.append(StockDailySnapshot.location_id == location_id)
+    if category_id is not None:
+        filters.append(Item.category_id == category_id)
+    joins_item = group_by == 'category' or category_id is not None
+
+    def scoped(statement):
+        statement = statement.select_from(StockDailySnapshot)
+        if joins_item:
+            statement = statement.join(Item, Item.id == StockDailySnapshot.item_id)
+        return statement.where(*filters)
+
+    if group_by != 'total':
+        latest = scoped(select(func.max(StockDailySnapshot.snapshot_date))).scalar_subquery()
+        top = scoped(select(key)).where(
+            StockDailySnapshot.snapshot_date == latest
+        ).group_by(key).order_by(func.sum(StockDailySnapshot.quantity).desc()).limit(limit)
+        filters.append(_group_key(group_by).in_(top.scalar_subquery()))
+
+    daily = scoped(select(
+        StockDailySnapshot.snapshot_date, key, func.sum(StockDailySnapshot.quantity).label('quantity')
+    )).group_by(StockDailySnapshot.snapshot_date, key).subquery()
+    period = date_bucket(daily.c.snapshot_date, bucket).label('bucket')
+    rows = db.session.execute(
+        select(period, daily.c.key, func.avg(daily.c.quantity).label('quantity'))
+        .group_by(period, daily.c.key)
+        .order_by(daily.c.key, period)
+    ).all()
+
+    series = {}
+    for row in rows:
+        series.setdefault(row.key, []).append({
+            'date': _as_date(row.bucket).isoformat(),
+            'quantity': round(float(row.quantity), 2),
+        })
+    labels = _labels(group_by, list(series))
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'bucket': bucket,
+        'group_by': group_by,
+        'level': level,
+        'series': [
+            {'key': key, 'label': labels.get(key), 'points': points}
+            for key, points in series.items()
+        ],
+    }
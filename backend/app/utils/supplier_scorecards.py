@@ -0,0 +1,144 @@
+"""
+Supplier scorecard maintenance.
+Scorecards are updated incrementally as purchase orders move through the
+approval workflow, so ranking suppliers never has to scan purchase_orders.
+rebuild_scorecards() applies the same per-order rules to the whole history:
+an order counts as sent once it has a sent date and as delivered once it
+has a delivered date, and only orders with both dates count towards
+avg_delivery_days.
+"""
+from collections import defaultdict
+from decimal import Decimal
+from sqlalchemy import case, or_, select
+from app import db
+from app.models import SupplierScorecard, PurchaseOrder
+from app.utils.db_utils import insert_ignore
+
+COUNTER_COLUMNS = (
+    'sent_orders',
+    'delivered_orders',
+    'on_time_eligible',
+    'on_time_orders',
+    'total_delivery_days',
+    'delivery_days_orders',
+    'total_spend',
+)
+
+
+def _sent_deltas(order):
+    """Counter deltas contributed by an order reaching sent_to_vendor"""
+    return {
+        'sent_orders': 1,
+        'total_spend': Decimal(order.total_amount or 0),
+    }
+
+
+def _delivered_deltas(order):
+    """Counter deltas contributed by an order reaching delivered"""
+    deltas = {'delivered_orders': 1}
+
+    if order.delivered_date and order.sent_date:
+        deltas['total_delivery_days'] = (order.delivered_date.date() - order.sent_date.date()).days
+        deltas['delivery_days_orders'] = 1
+
+    expected = order.expected_delivery_date or (order.expected_date.date() if order.expected_date else None)
+    if expected:
+        actual = order.actual_delivery_date or (order.delivered_date.date() if order.delivered_date else None)
+        deltas['on_time_eligible'] = 1
+        deltas['on_time_orders'] = 1 if actual and actual <= expected else 0
+
+    return deltas
+
+
+def _group_by_supplier(orders, deltas_fn):
+    totals = defaultdict(lambda: defaultdict(int))
+    for order in orders:
+        for column, value in deltas_fn(order).items():
+            totals[order.supplier_id][column] += value
+    return totals
+
+
+def _apply_deltas(supplier_id, deltas):
+    """Atomically add deltas to a supplier's counters and refresh derived rates"""
+    db.session.execute(insert_ignore(SupplierScorecard).values(supplier_id=supplier_id))
+
+    sc = SupplierScorecard
+    new = {
+        column: getattr(sc, column) + deltas.get(column, 0)
+        for column in COUNTER_COLUMNS
+    }
+
+    # SET expressions are evaluated against the old row, so derived rates
+    # are computed from the incremented counters in the same statement.
+    values = dict(new)
+    values['on_time_rate'] = case(
+        (new['on_time_eligible'] > 0, new['on_time_orders'] * 1.0 / new['on_time_eligible']),
+        else_=None
+    )
+    values['avg_delivery_days'] = case(
+        (new['delivery_days_orders'] > 0, new['total_delivery_days'] * 1.0 / new['delivery_days_orders']),
+        else_=None
+    )
+
+    db.session.execute(
+        db.update(sc).where(sc.supplier_id == supplier_id).values(**values)
+    )
+
+
+def record_orders_sent(orders):
+    """Update scorecards for orders that were just sent to the vendor"""
+    for supplier_id, deltas in _group_by_supplier(orders, _sent_deltas).items():
+        _apply_deltas(supplier_id, deltas)
+
+
+def record_orders_delivered(orders):
+    """Update scorecards for orders that were just marked delivered"""
+    for supplier_id, deltas in _group_by_supplier(orders, _delivered_deltas).items():
+        _apply_deltas(supplier_id, deltas)
+
+
+def rebuild_scorecards(batch_size=5000):
+    """
+    Recompute every scorecard from purchase order history.
+    Uses the same per-order rules as the incremental path.
+    Returns the number of scorecards written.
+    """
+    query = select(
+        PurchaseOrder.supplier_id,
+        PurchaseOrder.total_amount,
+        PurchaseOrder.sent_date,
+        PurchaseOrder.delivered_date,
+        PurchaseOrder.expected_date,
+        PurchaseOrder.expected_delivery_date,
+        PurchaseOrder.actual_delivery_date,
+    ).where(
+        or_(PurchaseOrder.sent_date.isnot(None), PurchaseOrder.delivered_date.isnot(None))
+    ).execution_options(yield_per=batch_size)
+
+    totals = defaultdict(lambda: defaultdict(int))
+    for order in db.session.execute(query):
+        if order.sent_date:
+            for column, value in _sent_deltas(order).items():
+                totals[order.supplier_id][column] += value
+        if order.delivered_date:
+            for column, value in _delivered_deltas(order).items():
+                totals[order.supplier_id][column] += value
+
+    rows = []
+    for supplier_id, counters in totals.items():
+        row = {'supplier_id': supplier_id}
+        row.update({column: counters.get(column, 0) for column in COUNTER_COLUMNS})
+        row['on_time_rate'] = (
+            row['on_time_orders'] / row['on_time_eligible'] if row['on_time_eligible'] else None
+        )
+        row['avg_delivery_days'] = (
+            row['total_delivery_days'] / row['delivery_days_orders'] if row['delivery_days_orders'] else None
+        )
+        rows.append(row)
+
+    db.session.execute(db.delete(SupplierScorecard))
+    if rows:
+        db.session.execute(db.insert(SupplierScorecard), rows)
+    db.session.commit()
+
+    return len(rows)
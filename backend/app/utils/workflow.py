@@ -0,0 +1,32 @@
+"""
+Purchase order workflow.
+The status transition matrix shared by the approval routes and by code that
+needs to know which statuses an order can be in.
+"""
+
+# Permission matrix for workflow state transitions
+WORKFLOW_PERMISSIONS = {
+    'draft': {
+        'pending_approval': ['admin', 'manager'],
+    },
+    'pending_approval': {
+        'approved': ['admin'],
+        'rejected': ['admin'],
+        'draft': ['admin', 'manager'],  # Can return to draft
+    },
+    'approved': {
+        'sent_to_vendor': ['admin', 'manager'],
+    },
+    'sent_to_vendor': {
+        'delivered': ['admin', 'manager'],
+    },
+    'rejected': {
+        'draft': ['admin', 'manager'],  # Can resubmit
+    },
+}
+
+PO_STATUSES = tuple(sorted(set(WORKFLOW_PERMISSIONS).union(*WORKFLOW_PERMISSIONS.values())))
+
+# Every status an order can still be delivered from counts as open
+CLOSED_PO_STATUSES = ('rejected', 'delivered')
+OPEN_PO_STATUSES = tuple(status for status in PO_STATUSES if status not in CLOSED_PO_STATUSES)
@@ -0,0 +1,16 @@
+"""
+Entry point for the notification stream service.
+Runs under gunicorn's gevent worker so each open SSE connection is a
+greenlet rather than a sync worker:
+
+    gunicorn --worker-class gevent --worker-connections 1000 --bind 0.0.0.0:5001 stream:app
+"""
+from gevent import monkey
+monkey.patch_all()
+
+from psycogreen.gevent import patch_psycopg
+patch_psycopg()
+
+from app import create_app
+
+app = create_app()
@@ -0,0 +1,58 @@
+"""
+Shared fixtures.
+Tests run against a throwaway SQLite file (a file rather than :memory: so
+requests on other threads see the same data) and an in-memory Celery
+broker, so no PostgreSQL, Redis or SMTP server is needed.
+"""
+import os
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix='inventory-tests-')
+os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(_db_dir, "test.db")}'
+os.environ['CELERY_BROKER_URL'] = 'memory://'
+os.environ['CELERY_RESULT_BACKEND'] = 'cache+memory://'
+os.environ['JWT_SECRET_KEY'] = 'test-jwt-secret-key-of-at-least-32-bytes'
+
+import pytest
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import User
+from app import tasks
+from app.utils import response_cache
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app()
+    app.config['TESTING'] = True
+    tasks._flask_app = app  # Celery tasks share the test app and database
+    return app
+
+
+@pytest.fixture
+def database(app, monkeypatch):
+    """Fresh tables and an empty response cache for every test, inside an app context"""
+    monkeypatch.setattr(response_cache, '_local_backend', response_cache.LocalBackend())
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield db
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app, database):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(database):
+    """Create a user and return it with Authorization headers for its role"""
+    def make(username, role):
+        user = User(username=username, email=f'{username}@example.com', role=role)
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        token = create_access_token(identity=str(user.id), additional_claims={'role': role})
+        return user, {'Authorization': f'Bearer {token}'}
+    return make
@@ -0,0 +1,70 @@
+"""ABC classification report and its nightly cache refresh"""
+from datetime import datetime
+import pytest
+from app import db
+from app.models import Item, Location, StockLocation, StockMovement, StockTransfer
+from app.tasks import refresh_abc_classification
+
+
+@pytest.fixture
+def moved_items(make_user):
+    user, _ = make_user('manager', 'manager')
+    source, destination = Location(name='Dock'), Location(name='Shelf')
+    fast = Item(sku='FAST', name='Fast mover', unit_price=10)
+    slow = Item(sku='SLOW', name='Slow mover', unit_price=1)
+    db.session.add_all([source, destination, fast, slow])
+    db.session.commit()
+    db.session.add_all([
+        StockTransfer(item_id=fast.id, from_location_id=source.id, to_location_id=destination.id,
+                      quantity=90, transferred_by=user.id, status='completed', transfer_date=datetime.utcnow()),
+        StockTransfer(item_id=slow.id, from_location_id=source.id, to_location_id=destination.id,
+                      quantity=100, transferred_by=user.id, status='completed', transfer_date=datetime.utcnow()),
+    ])
+    db.session.add_all([
+        StockLocation(item_id=fast.id, location_id=destination.id, quantity=90),
+        StockLocation(item_id=slow.id, location_id=destination.id, quantity=100),
+        StockMovement(item_id=slow.id, warehouse_id=1, delta=-400, quantity_after=0, reason='adjustment'),
+    ])
+    db.session.commit()
+    return destination
+
+
+def test_refresh_caches_the_default_report(client, make_user, moved_items):
+    _, headers = make_user('viewer', 'viewer')
+
+    refresh_abc_classification()
+    response = client.get('/api/reports/abc-classification', headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers['X-Cache'] == 'HIT'
+    body = response.get_json()
+    assert body['total_value'] == 1400
+    assert [(row['sku'], row['class']) for row in body['items']] == [('FAST', 'A'), ('SLOW', 'A')]
+
+
+def test_refresh_replaces_a_stale_report(client, make_user, moved_items):
+    _, headers = make_user('viewer', 'viewer')
+    refresh_abc_classification()
+    Item.query.filter_by(sku='FAST').update({'unit_price': 20})
+    db.session.commit()
+
+    assert client.get('/api/reports/abc-classification', headers=headers).get_json()['total_value'] == 1400
+    refresh_abc_classification()
+    response = client.get('/api/reports/abc-classification', headers=headers)
+
+    assert response.headers['X-Cache'] == 'HIT'
+    assert response.get_json()['total_value'] == 2300
+
+
+def test_location_filter_leaves_out_warehouse_adjustments(client, make_user, moved_items):
+    _, headers = make_user('viewer', 'viewer')
+
+    everywhere = client.get('/api/reports/abc-classification', headers=headers).get_json()
+    at_location = client.get(
+        f'/api/reports/abc-classification?location_id={moved_items.id}', headers=headers
+    ).get_json()
+
+    assert everywhere['adjustments_included'] is True
+    assert {row['sku']: row['quantity'] for row in everywhere['items']} == {'FAST': 90, 'SLOW': 500}
+    assert at_location['adjustments_included'] is False
+    assert {row['sku']: row['quantity'] for row in at_location['items']} == {'FAST': 90, 'SLOW': 100}
@@ -0,0 +1,103 @@
+"""Compare-and-set workflow transitions in app/routes/approvals.py"""
+import threading
+import pytest
+from app import db
+from app.models import ApprovalHistory, AuditLog, PurchaseOrder, Supplier, Warehouse
+from app.routes import approvals
+
+
+@pytest.fixture
+def pending_order(make_user):
+    requester, _ = make_user('requester', 'manager')
+    supplier = Supplier(name='Acme', email='acme@example.com')
+    warehouse = Warehouse(name='Main')
+    db.session.add_all([supplier, warehouse])
+    db.session.commit()
+    order = PurchaseOrder(
+        po_number='PO-1', supplier_id=supplier.id, warehouse_id=warehouse.id,
+        status='pending_approval', total_amount=100, created_by=requester.id
+    )
+    db.session.add(order)
+    db.session.commit()
+    return order.id
+
+
+def _order_rows(order_id):
+    history = ApprovalHistory.query.filter_by(purchase_order_id=order_id).count()
+    audit = AuditLog.query.filter_by(entity_type='PurchaseOrder', entity_id=order_id).count()
+    return history, audit
+
+
+def test_concurrent_approve_and_reject_apply_one_transition(app, make_user, pending_order, monkeypatch):
+    _, approver_headers = make_user('approver', 'admin')
+    _, rejecter_headers = make_user('rejecter', 'admin')
+    db.session.remove()
+
+    # Both requests pass the permission check on the same version before either writes
+    barrier = threading.Barrier(2, timeout=10)
+    can_transition = approvals.can_transition
+
+    def checked_together(*args):
+        allowed = can_transition(*args)
+        barrier.wait()
+        return allowed
+
+    monkeypatch.setattr(approvals, 'can_transition', checked_together)
+
+    responses = {}
+
+    def post(action, headers):
+        response = app.test_client().post(
+            f'/api/approvals/purchase-order/{pending_order}/{action}', headers=headers, json={}
+        )
+        responses[action] = response
+
+    threads = [
+        threading.Thread(target=post, args=('approve', approver_headers)),
+        threading.Thread(target=post, args=('reject', rejecter_headers)),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(response.status_code for response in responses.values()) == [200, 409]
+    winner = next(action for action, response in responses.items() if response.status_code == 200)
+    loser = responses['reject' if winner == 'approve' else 'approve']
+
+    order = db.session.get(PurchaseOrder, pending_order)
+    assert order.status == ('approved' if winner == 'approve' else 'rejected')
+    assert order.version == 2
+    assert loser.get_json()['status'] == order.status
+    assert loser.get_json()['version'] == 2
+    assert _order_rows(pending_order) == (1, 1)
+
+
+def test_stale_version_is_rejected(client, make_user, pending_order):
+    _, headers = make_user('approver', 'admin')
+    order = db.session.get(PurchaseOrder, pending_order)
+    order.version = 3  # Someone else moved it since the client loaded version 2
+    db.session.commit()
+
+    response = client.post(
+        f'/api/approvals/purchase-order/{pending_order}/approve', headers=headers, json={'version': 2}
+    )
+
+    assert response.status_code == 409
+    assert response.get_json()['version'] == 3
+    db.session.expire_all()
+    assert db.session.get(PurchaseOrder, pending_order).status == 'pending_approval'
+    assert _order_rows(pending_order) == (0, 0)
+
+
+def test_current_version_is_accepted(client, make_user, pending_order):
+    _, headers = make_user('approver', 'admin')
+
+    response = client.post(
+        f'/api/approvals/purchase-order/{pending_order}/approve', headers=headers, json={'version': 1}
+    )
+
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'approved'
+    assert response.get_json()['version'] == 2
+    assert _order_rows(pending_order) == (1, 1)
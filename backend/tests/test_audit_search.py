@@ -0,0 +1,41 @@
+"""Audit log full-text search (SQLite FTS5 path)"""
+import pytest
+from app import db
+from app.models import AuditLog
+from app.utils.audit_search import _sqlite_fts_available, apply_search
+
+
+def _search(q):
+    query, _ = apply_search(AuditLog.query, q)
+    return sorted(log.details for log in query)
+
+
+def _log(details):
+    db.session.add(AuditLog(action='UPDATE', entity_type='Item', details=details))
+    db.session.commit()
+
+
+@pytest.fixture
+def fts(database):
+    if not _sqlite_fts_available():
+        pytest.skip('SQLite built without FTS5')
+
+
+def test_search_matches_all_terms(fts):
+    _log('Adjusted stock for Hex Bolt: 10 -> 25')
+    _log('Adjusted stock for Wing Nut: 4 -> 0')
+
+    assert _search('bolt adjusted') == ['Adjusted stock for Hex Bolt: 10 -> 25']
+
+
+def test_search_survives_recreating_the_audit_log_table(fts):
+    _log('Deleted item: Hex Bolt')
+    assert _search('bolt') == ['Deleted item: Hex Bolt']
+
+    # drop_all()/create_all() drops the triggers that keep the index in sync
+    AuditLog.__table__.drop(db.engine)
+    AuditLog.__table__.create(db.engine)
+    _log('Created item: Wing Nut')
+
+    assert _search('nut') == ['Created item: Wing Nut']
+    assert _search('bolt') == []
@@ -0,0 +1,79 @@
+"""Incremental dashboard summary maintenance matches a full recompute"""
+import pytest
+from app import db
+from app.models import DashboardSummary, Item, Warehouse
+from app.utils.dashboard_summary import ALL_WAREHOUSES, refresh_dashboard_summary
+
+
+def _summary():
+    """Summary rows; a warehouse row of zeros reads the same as a missing one"""
+    db.session.expire_all()
+    return {
+        row.warehouse_id: (row.total_items, row.total_stock, row.low_stock_items)
+        for row in DashboardSummary.query.all()
+        if row.warehouse_id == ALL_WAREHOUSES or (row.total_items, row.total_stock, row.low_stock_items) != (0, 0, 0)
+    }
+
+
+def _recomputed():
+    refresh_dashboard_summary(commit=False)
+    rows = _summary()
+    db.session.rollback()
+    return rows
+
+
+@pytest.fixture
+def stocked(client, make_user):
+    _, headers = make_user('manager', 'admin')
+    north, south = Warehouse(name='North'), Warehouse(name='South')
+    db.session.add_all([north, south])
+    db.session.commit()
+    item_ids = []
+    for sku, reorder_level in [('BOLT', 10), ('NUT', 5)]:
+        response = client.post('/api/items', headers=headers, json={
+            'sku': sku, 'name': sku.title(), 'unit_price': 1, 'reorder_level': reorder_level
+        })
+        item_ids.append(response.get_json()['id'])
+    for item_id, warehouse, quantity in [
+        (item_ids[0], north, 8), (item_ids[0], south, 20), (item_ids[1], north, 3)
+    ]:
+        response = client.post(f'/api/items/{item_id}/stock', headers=headers, json={
+            'warehouse_id': warehouse.id, 'quantity': quantity
+        })
+        assert response.status_code == 200
+    return headers, item_ids, north.id
+
+
+def test_stock_changes_keep_the_summary_in_step(stocked):
+    assert _summary() == _recomputed()
+    assert _summary()[0] == (2, 31, 2)
+
+
+def test_reorder_level_change_updates_low_stock_per_warehouse(client, stocked):
+    headers, (bolt, _), _ = stocked
+
+    response = client.put(f'/api/items/{bolt}', headers=headers, json={'reorder_level': 25})
+
+    assert response.status_code == 200
+    assert _summary() == _recomputed()
+    assert _summary()[0][2] == 3
+
+
+def test_item_delete_removes_its_stock(client, stocked):
+    headers, (bolt, _), _ = stocked
+
+    assert client.delete(f'/api/items/{bolt}', headers=headers).status_code == 200
+
+    assert db.session.get(Item, bolt) is None
+    assert _summary() == _recomputed()
+    assert _summary()[0] == (1, 3, 1)
+
+
+def test_warehouse_delete_removes_its_row(client, stocked):
+    headers, _, north = stocked
+
+    assert client.delete(f'/api/warehouses/{north}', headers=headers).status_code == 200
+
+    assert north not in _summary()
+    assert _summary() == _recomputed()
+    assert _summary()[0] == (2, 20, 0)
@@ -0,0 +1,168 @@
+"""Transactional email outbox (app/utils/email_outbox.py) and its delivery tasks"""
+from datetime import datetime, timedelta
+import smtplib
+import pytest
+from celery.exceptions import Retry
+from app import db
+from app.models import EmailOutbox
+from app.tasks import deliver_outbox_emails, drain_email_outbox
+from app.utils import email_outbox
+from app.utils.email_outbox import (
+    MAX_ATTEMPTS, STALE_CLAIM_MINUTES, backoff_seconds, claim_messages, queue_email, release_stale_claims
+)
+from app.utils.email_sender import EmailNotConfigured
+
+
+class StubTransport:
+    """Stands in for the pooled SMTP transport; fails while error is set"""
+
+    def __init__(self):
+        self.sent = []
+        self.error = None
+
+    def send_messages(self, messages):
+        if self.error is not None:
+            return [self.error] * len(messages)
+        self.sent.extend(messages)
+        return [None] * len(messages)
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    stub = StubTransport()
+    monkeypatch.setattr(email_outbox, 'get_transport', lambda: stub)
+    return stub
+
+
+@pytest.fixture
+def dispatched(monkeypatch, database):
+    """Outbox ids handed to the worker after each commit"""
+    calls = []
+    monkeypatch.setattr(email_outbox, 'dispatch', calls.append)
+    return calls
+
+
+@pytest.fixture
+def retries(monkeypatch):
+    """Countdowns the delivery task asked to retry with"""
+    countdowns = []
+
+    def retry(countdown):
+        countdowns.append(countdown)
+        return Retry(when=countdown)
+
+    monkeypatch.setattr(deliver_outbox_emails, 'retry', retry)
+    return countdowns
+
+
+def _queue(to_email='buyer@example.com'):
+    message = queue_email(to_email, 'Purchase Order Approved - PO-1', 'Approved.')
+    db.session.commit()
+    return message.id
+
+
+def test_queued_email_is_dispatched_after_commit(dispatched):
+    message = queue_email('buyer@example.com', 'Subject', 'Body')
+    db.session.flush()
+    assert dispatched == []
+
+    db.session.commit()
+
+    assert dispatched == [[message.id]]
+    assert db.session.get(EmailOutbox, message.id).status == 'pending'
+
+
+def test_rolled_back_email_is_dropped(dispatched):
+    queue_email('buyer@example.com', 'Subject', 'Body')
+    db.session.flush()
+    db.session.rollback()
+    db.session.commit()
+
+    assert dispatched == []
+    assert EmailOutbox.query.count() == 0
+
+
+def test_delivery_marks_messages_sent(dispatched, transport, retries):
+    outbox_id = _queue()
+
+    deliver_outbox_emails.run(dispatched[0])
+
+    message = db.session.get(EmailOutbox, outbox_id)
+    assert (message.status, message.attempts, message.sent_at is not None) == ('sent', 1, True)
+    assert transport.sent == [('buyer@example.com', 'Purchase Order Approved - PO-1', 'Approved.')]
+    assert retries == []
+
+
+def test_claimed_messages_are_not_claimed_twice(dispatched):
+    outbox_id = _queue()
+
+    assert [message.id for message in claim_messages()] == [outbox_id]
+    assert claim_messages() == []
+    assert db.session.get(EmailOutbox, outbox_id).status == 'sending'
+
+
+def test_smtp_failure_is_retried_with_backoff(dispatched, transport, retries):
+    outbox_id = _queue()
+    transport.error = smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+
+    with pytest.raises(Retry):
+        deliver_outbox_emails.run(dispatched[0])
+
+    message = db.session.get(EmailOutbox, outbox_id)
+    assert (message.status, message.attempts) == ('pending', 1)
+    assert 'Connection unexpectedly closed' in message.last_error
+    assert message.next_attempt_at > datetime.utcnow() + timedelta(seconds=backoff_seconds(1) - 5)
+    assert backoff_seconds(1) - 5 <= retries[0] <= backoff_seconds(1)
+
+    # Not due yet: the periodic drain leaves it alone
+    assert drain_email_outbox.run() == 0
+
+    # Once due, the drain retries it over a working connection
+    transport.error = None
+    message.next_attempt_at = datetime.utcnow()
+    db.session.commit()
+    assert drain_email_outbox.run() == 1
+
+    message = db.session.get(EmailOutbox, outbox_id)
+    assert (message.status, message.attempts, message.last_error) == ('sent', 2, None)
+    assert len(transport.sent) == 1
+
+
+def test_message_fails_after_max_attempts(dispatched, transport, retries):
+    outbox_id = _queue()
+    db.session.get(EmailOutbox, outbox_id).attempts = MAX_ATTEMPTS - 1
+    db.session.commit()
+    transport.error = smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+
+    deliver_outbox_emails.run(dispatched[0])
+
+    message = db.session.get(EmailOutbox, outbox_id)
+    assert (message.status, message.attempts) == ('failed', MAX_ATTEMPTS)
+    assert retries == []
+
+
+def test_unconfigured_smtp_is_not_retried(dispatched, transport, retries):
+    outbox_id = _queue()
+    transport.error = EmailNotConfigured('SMTP_HOST is not set')
+
+    deliver_outbox_emails.run(dispatched[0])
+
+    assert db.session.get(EmailOutbox, outbox_id).status == 'failed'
+    assert retries == []
+
+
+def test_stale_claims_are_released_and_delivered(dispatched, transport):
+    stale_id, fresh_id = _queue('stale@example.com'), _queue('fresh@example.com')
+    claim_messages()
+    db.session.get(EmailOutbox, stale_id).claimed_at = (
+        datetime.utcnow() - timedelta(minutes=STALE_CLAIM_MINUTES + 1)
+    )
+    db.session.commit()
+
+    assert release_stale_claims() == 1
+    assert db.session.get(EmailOutbox, stale_id).status == 'pending'
+    assert db.session.get(EmailOutbox, fresh_id).status == 'sending'
+
+    assert drain_email_outbox.run() == 1
+    assert db.session.get(EmailOutbox, stale_id).status == 'sent'
+    assert [to_email for to_email, _, _ in transport.sent] == ['stale@example.com']
@@ -0,0 +1,48 @@
+"""Token checks on the notification SSE stream"""
+import pytest
+from flask_jwt_extended import create_access_token, create_refresh_token
+from app import db
+
+
+def _stream(client, token):
+    return client.get(f'/api/notifications/stream?token={token}', buffered=False)
+
+
+def test_stream_accepts_an_access_token(client, make_user):
+    user, _ = make_user('viewer', 'viewer')
+
+    response = _stream(client, create_access_token(identity=str(user.id), additional_claims={'role': 'viewer'}))
+    try:
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        frames = iter(response.response)
+        assert next(frames) == b'retry: 5000\n\n'
+        assert next(frames).startswith(b'event: unread_count')
+    finally:
+        response.close()
+
+
+@pytest.mark.parametrize('token', ['', 'not-a-jwt'])
+def test_stream_rejects_missing_or_invalid_tokens(client, token):
+    assert _stream(client, token).status_code == 401
+
+
+def test_stream_rejects_a_refresh_token(client, make_user):
+    user, _ = make_user('viewer', 'viewer')
+
+    response = _stream(client, create_refresh_token(identity=str(user.id)))
+
+    assert response.status_code == 401
+    assert response.get_json()['error'] == 'Access token required'
+
+
+def test_stream_rejects_a_deleted_user(client, make_user):
+    user, _ = make_user('viewer', 'viewer')
+    token = create_access_token(identity=str(user.id), additional_claims={'role': 'viewer'})
+    db.session.delete(user)
+    db.session.commit()
+
+    response = _stream(client, token)
+
+    assert response.status_code == 401
+    assert response.get_json()['error'] == 'User not found'
@@ -0,0 +1,36 @@
+"""Daily stock snapshots are written once per day and stock record"""
+from datetime import date
+import pytest
+from app import db
+from app.models import Item, Location, Stock, StockDailySnapshot, StockLocation, Warehouse
+from app.utils.stock_trends import _insert_snapshot, capture_daily_snapshot
+
+DAY = date(2026, 1, 15)
+
+
+@pytest.fixture
+def stock(database):
+    item, warehouse, location = Item(sku='BOLT', name='Bolt', unit_price=1), Warehouse(name='Main'), Location(name='Shelf')
+    db.session.add_all([item, warehouse, location])
+    db.session.commit()
+    db.session.add_all([
+        Stock(item_id=item.id, warehouse_id=warehouse.id, quantity=40),
+        StockLocation(item_id=item.id, location_id=location.id, quantity=15),
+    ])
+    db.session.commit()
+
+
+def test_capture_runs_once_per_day(stock):
+    assert capture_daily_snapshot(DAY) == 2
+    assert capture_daily_snapshot(DAY) is None
+    assert StockDailySnapshot.query.filter_by(snapshot_date=DAY).count() == 2
+
+
+def test_overlapping_capture_does_not_write_the_day_twice(stock):
+    # Two runs that both passed the already-captured check
+    assert _insert_snapshot(DAY) == 2
+    assert _insert_snapshot(DAY) == 0
+    db.session.commit()
+
+    rows = StockDailySnapshot.query.filter_by(snapshot_date=DAY).all()
+    assert sorted(row.quantity for row in rows) == [15, 40]
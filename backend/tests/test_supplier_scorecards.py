@@ -0,0 +1,43 @@
+"""Incremental scorecards match a rebuild from purchase order history"""
+from datetime import datetime
+from app import db
+from app.models import PurchaseOrder, Supplier, SupplierScorecard, Warehouse
+from app.utils.supplier_scorecards import (
+    COUNTER_COLUMNS, rebuild_scorecards, record_orders_delivered, record_orders_sent
+)
+
+
+def _scorecard(supplier_id):
+    db.session.expire_all()
+    scorecard = db.session.get(SupplierScorecard, supplier_id)
+    return {column: getattr(scorecard, column) for column in COUNTER_COLUMNS + ('avg_delivery_days', 'on_time_rate')}
+
+
+def test_rebuild_reproduces_incremental_counters(database):
+    supplier, warehouse = Supplier(name='Acme'), Warehouse(name='Main')
+    db.session.add_all([supplier, warehouse])
+    db.session.commit()
+
+    def order(number, **dates):
+        return PurchaseOrder(
+            po_number=number, supplier_id=supplier.id, warehouse_id=warehouse.id,
+            status='draft', total_amount=100, **dates
+        )
+
+    delivered = order('PO-1', sent_date=datetime(2026, 3, 1), delivered_date=datetime(2026, 3, 5))
+    open_order = order('PO-2', sent_date=datetime(2026, 3, 2))
+    never_sent = order('PO-3', delivered_date=datetime(2026, 3, 6))  # Delivered without a sent date
+    db.session.add_all([delivered, open_order, never_sent])
+    db.session.commit()
+
+    record_orders_sent([delivered, open_order])
+    record_orders_delivered([delivered, never_sent])
+    db.session.commit()
+    incremental = _scorecard(supplier.id)
+
+    assert incremental['delivered_orders'] == 2
+    assert incremental['delivery_days_orders'] == 1
+    assert incremental['avg_delivery_days'] == 4
+
+    rebuild_scorecards()
+    assert _scorecard(supplier.id) == incremental
@@ -0,0 +1,34 @@
+"""Supplier scorecard ranking"""
+import pytest
+from app import db
+from app.models import Supplier, SupplierScorecard
+
+
+@pytest.fixture
+def scorecards(database):
+    suppliers = [Supplier(name=f'Supplier {n}') for n in range(3)]
+    db.session.add_all(suppliers)
+    db.session.commit()
+    db.session.add_all(
+        SupplierScorecard(supplier_id=supplier.id, on_time_rate=rate)
+        for supplier, rate in zip(suppliers, [90, 70, 80])
+    )
+    db.session.commit()
+
+
+@pytest.mark.parametrize('limit, expected', [('2', 2), ('-1', 1), ('0', 1), ('abc', 3), ('100000', 3)])
+def test_scorecard_limit_is_clamped(client, make_user, scorecards, limit, expected):
+    _, headers = make_user('viewer', 'viewer')
+
+    response = client.get(f'/api/suppliers/scorecards?limit={limit}', headers=headers)
+
+    assert response.status_code == 200
+    assert len(response.get_json()) == expected
+
+
+def test_scorecards_are_ranked(client, make_user, scorecards):
+    _, headers = make_user('viewer', 'viewer')
+
+    response = client.get('/api/suppliers/scorecards?sort=on_time_rate&order=desc', headers=headers)
+
+    assert [row['supplier_name'] for row in response.get_json()] == ['Supplier 0', 'Supplier 2', 'Supplier 1']
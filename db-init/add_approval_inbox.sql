@@ -0,0 +1,17 @@
+-- Approval inbox: submission timestamp and a partial index over pending orders only.
+-- GET /api/approvals/inbox reads pending_approval rows in (submitted_date, id) order
+-- with keyset pagination, so the index stays small as order history grows.
+ALTER TABLE purchase_orders ADD COLUMN IF NOT EXISTS submitted_date TIMESTAMP;
+
+-- Backfill from the latest submission in the approval history, falling back to the order date
+UPDATE purchase_orders po
+SET submitted_date = COALESCE(
+    (SELECT MAX(ah.timestamp) FROM approval_history ah
+     WHERE ah.purchase_order_id = po.id AND ah.to_status = 'pending_approval'),
+    po.order_date
+)
+WHERE po.status = 'pending_approval' AND po.submitted_date IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_purchase_orders_pending_inbox
+    ON purchase_orders(submitted_date, id)
+    WHERE status = 'pending_approval';
@@ -0,0 +1,12 @@
+-- Audit log browsing.
+-- GET /api/reports/audit-logs orders by (timestamp, id) newest first and pages
+-- with ?cursor= on the same key; this composite index serves both without a
+-- sort and replaces the single-column timestamp index.
+CREATE INDEX IF NOT EXISTS idx_audit_logs_timestamp_id
+    ON audit_logs(timestamp DESC, id DESC);
+
+DROP INDEX IF EXISTS idx_audit_logs_timestamp;
+
+-- ?count=estimate reads the planner's row estimate, which is only as fresh as
+-- the table statistics. autovacuum keeps them current; after a bulk load run:
+--   ANALYZE audit_logs;
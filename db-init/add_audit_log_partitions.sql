@@ -0,0 +1,174 @@
+-- Monthly range partitioning for audit_logs.
+-- audit_logs becomes a table partitioned by timestamp with one partition per month
+-- (audit_logs_YYYY_MM) plus audit_logs_default as a safety net, so date-filtered
+-- queries only touch the months they ask for. Partitions older than the retention
+-- period are detached and attached to audit_logs_archive by the
+-- maintain-audit-log-partitions beat task (see app/utils/audit_partitions.py).
+-- Safe to re-run: an already partitioned audit_logs is left as is.
+
+-- Archive: same shape, holds the partitions detached from audit_logs
+CREATE TABLE IF NOT EXISTS audit_logs_archive (
+    id INTEGER NOT NULL,
+    user_id INTEGER,
+    action VARCHAR(100) NOT NULL,
+    entity_type VARCHAR(50),
+    entity_id INTEGER,
+    details TEXT,
+    timestamp TIMESTAMP NOT NULL,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+CREATE INDEX IF NOT EXISTS idx_audit_logs_archive_timestamp_id ON audit_logs_archive(timestamp DESC, id DESC);
+
+-- Create (if missing) the partition holding the month of month_start.
+-- Rows that landed in the default partition for that month are moved into it.
+CREATE OR REPLACE FUNCTION create_audit_log_partition(month_start DATE)
+RETURNS TEXT AS $$
+DECLARE
+    range_start DATE := date_trunc('month', month_start)::DATE;
+    range_end DATE := (date_trunc('month', month_start) + INTERVAL '1 month')::DATE;
+    partition_name TEXT := 'audit_logs_' || to_char(month_start, 'YYYY_MM');
+    has_default BOOLEAN := to_regclass('audit_logs_default') IS NOT NULL;
+    default_rows BOOLEAN := FALSE;
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    IF has_default THEN
+        EXECUTE format(
+            'SELECT EXISTS (SELECT 1 FROM audit_logs_default WHERE timestamp >= %L AND timestamp < %L)',
+            range_start, range_end
+        ) INTO default_rows;
+    END IF;
+
+    IF default_rows THEN
+        ALTER TABLE audit_logs DETACH PARTITION audit_logs_default;
+    END IF;
+
+    EXECUTE format(
+        'CREATE TABLE %I PARTITION OF audit_logs FOR VALUES FROM (%L) TO (%L)',
+        partition_name, range_start, range_end
+    );
+
+    IF default_rows THEN
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM audit_logs_default WHERE timestamp >= %L AND timestamp < %L RETURNING *) '
+            'INSERT INTO audit_logs SELECT * FROM moved',
+            range_start, range_end
+        );
+        ALTER TABLE audit_logs ATTACH PARTITION audit_logs_default DEFAULT;
+    END IF;
+
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Make sure partitions exist for the current month and the next months_ahead months
+CREATE OR REPLACE FUNCTION ensure_audit_log_partitions(months_ahead INTEGER DEFAULT 2)
+RETURNS INTEGER AS $$
+DECLARE
+    offset_months INTEGER;
+BEGIN
+    FOR offset_months IN 0..months_ahead LOOP
+        PERFORM create_audit_log_partition((date_trunc('month', CURRENT_DATE) + make_interval(months => offset_months))::DATE);
+    END LOOP;
+    RETURN months_ahead + 1;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Move every monthly partition that ends on or before cutoff from audit_logs to
+-- audit_logs_archive. Detaching is a catalog change; no rows are copied.
+CREATE OR REPLACE FUNCTION archive_audit_log_partitions(cutoff DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    part RECORD;
+    range_start DATE;
+    archived INTEGER := 0;
+BEGIN
+    FOR part IN
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'audit_logs'
+          AND child.relname ~ '^audit_logs_[0-9]{4}_[0-9]{2}$'
+        ORDER BY child.relname
+    LOOP
+        range_start := to_date(substring(part.relname FROM '([0-9]{4}_[0-9]{2})$'), 'YYYY_MM');
+        IF (range_start + INTERVAL '1 month')::DATE > cutoff THEN
+            CONTINUE;
+        END IF;
+        EXECUTE format('ALTER TABLE audit_logs DETACH PARTITION %I', part.relname);
+        EXECUTE format(
+            'ALTER TABLE audit_logs_archive ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+            part.relname, range_start, (range_start + INTERVAL '1 month')::DATE
+        );
+        archived := archived + 1;
+    END LOOP;
+    RETURN archived;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Convert an existing plain audit_logs table
+DO $$
+DECLARE
+    first_month DATE;
+    month_start DATE;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('audit_logs')) IS DISTINCT FROM 'r' THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE audit_logs RENAME TO audit_logs_unpartitioned;
+    DROP INDEX IF EXISTS idx_audit_logs_user;
+    DROP INDEX IF EXISTS idx_audit_logs_timestamp;
+    DROP INDEX IF EXISTS idx_audit_logs_timestamp_id;
+    DROP INDEX IF EXISTS idx_audit_logs_entity;
+    UPDATE audit_logs_unpartitioned SET timestamp = CURRENT_TIMESTAMP WHERE timestamp IS NULL;
+
+    CREATE TABLE audit_logs (
+        id INTEGER NOT NULL DEFAULT nextval('audit_logs_id_seq'),
+        user_id INTEGER REFERENCES users(id),
+        action VARCHAR(100) NOT NULL,
+        entity_type VARCHAR(50),
+        entity_id INTEGER,
+        details TEXT,
+        timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id, timestamp)
+    ) PARTITION BY RANGE (timestamp);
+    ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id;
+
+    CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT;
+
+    first_month := COALESCE(
+        (SELECT date_trunc('month', MIN(timestamp))::DATE FROM audit_logs_unpartitioned),
+        date_trunc('month', CURRENT_DATE)::DATE
+    );
+    month_start := first_month;
+    WHILE month_start <= date_trunc('month', CURRENT_DATE)::DATE LOOP
+        PERFORM create_audit_log_partition(month_start);
+        month_start := (month_start + INTERVAL '1 month')::DATE;
+    END LOOP;
+    PERFORM ensure_audit_log_partitions(2);
+
+    CREATE INDEX idx_audit_logs_user ON audit_logs(user_id);
+    CREATE INDEX idx_audit_logs_timestamp_id ON audit_logs(timestamp DESC, id DESC);
+    CREATE INDEX idx_audit_logs_entity ON audit_logs(entity_type, entity_id);
+
+    INSERT INTO audit_logs (id, user_id, action, entity_type, entity_id, details, timestamp)
+    SELECT id, user_id, action, entity_type, entity_id, details, timestamp
+    FROM audit_logs_unpartitioned;
+
+    DROP TABLE audit_logs_unpartitioned;
+END $$;
+
+SELECT ensure_audit_log_partitions(2);
+
+-- Grant permissions
+GRANT ALL ON audit_logs TO inventory_user;
+GRANT ALL ON audit_logs_archive TO inventory_user;
+GRANT ALL PRIVILEGES ON ALL TABLES IN SCHEMA public TO inventory_user;
+GRANT EXECUTE ON FUNCTION create_audit_log_partition(DATE) TO inventory_user;
+GRANT EXECUTE ON FUNCTION ensure_audit_log_partitions(INTEGER) TO inventory_user;
+GRANT EXECUTE ON FUNCTION archive_audit_log_partitions(DATE) TO inventory_user;
@@ -0,0 +1,7 @@
+-- Full-text search over audit log details (GET /api/reports/audit-logs?q=).
+-- Expression GIN index; the query in app/utils/audit_search.py uses exactly this
+-- expression so matches are answered from the index. The 'simple' configuration
+-- does no stemming, so SKUs, PO numbers and names match as typed. On the
+-- partitioned audit_logs table the index is created on every partition.
+CREATE INDEX IF NOT EXISTS idx_audit_logs_details_fts
+    ON audit_logs USING GIN (to_tsvector('simple', coalesce(details, '')));
@@ -0,0 +1,13 @@
+-- Precomputed dashboard totals: one row per warehouse plus warehouse_id = 0 for all warehouses.
+-- Stock adjustments and item creation update the rows incrementally; other writes and the
+-- refresh-dashboard-summary beat task recompute them. The table is filled on first read.
+CREATE TABLE IF NOT EXISTS dashboard_summary (
+    warehouse_id INTEGER PRIMARY KEY,  -- 0 = all warehouses
+    total_items INTEGER NOT NULL DEFAULT 0,
+    total_stock BIGINT NOT NULL DEFAULT 0,
+    low_stock_items INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Grant permissions
+GRANT ALL ON dashboard_summary TO inventory_user;
@@ -0,0 +1,22 @@
+-- Transactional email outbox, drained by the Celery worker
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id SERIAL PRIMARY KEY,
+    to_email VARCHAR(120) NOT NULL,
+    subject VARCHAR(255) NOT NULL,
+    body TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',  -- pending, sending, sent, failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    claimed_at TIMESTAMP,
+    sent_at TIMESTAMP
+);
+
+-- Only undelivered rows are ever scanned by the worker
+CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox(next_attempt_at) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_email_outbox_sending ON email_outbox(claimed_at) WHERE status = 'sending';
+
+-- Grant permissions
+GRANT ALL ON email_outbox TO inventory_user;
+GRANT USAGE, SELECT ON SEQUENCE email_outbox_id_seq TO inventory_user;
@@ -0,0 +1,19 @@
+-- Low-stock flags for the paginated low-stock reports.
+-- stock.is_low_stock (quantity < items.reorder_level) spans two tables, so the
+-- application keeps it in step on every stock write and reorder level change.
+-- stock_locations.is_low_stock only needs its own row and is a generated column.
+ALTER TABLE stock ADD COLUMN IF NOT EXISTS is_low_stock BOOLEAN NOT NULL DEFAULT FALSE;
+
+UPDATE stock s
+SET is_low_stock = TRUE
+FROM items i
+WHERE i.id = s.item_id AND s.quantity < i.reorder_level AND NOT s.is_low_stock;
+
+ALTER TABLE stock_locations
+    ADD COLUMN IF NOT EXISTS is_low_stock BOOLEAN GENERATED ALWAYS AS (quantity < min_threshold) STORED;
+
+-- Partial indexes: only low rows are indexed, so the reports stay cheap as stock grows
+CREATE INDEX IF NOT EXISTS idx_stock_low ON stock(id) WHERE is_low_stock;
+CREATE INDEX IF NOT EXISTS idx_stock_low_warehouse ON stock(warehouse_id, id) WHERE is_low_stock;
+CREATE INDEX IF NOT EXISTS idx_stock_locations_low ON stock_locations(id) WHERE is_low_stock;
+CREATE INDEX IF NOT EXISTS idx_stock_locations_low_location ON stock_locations(location_id, id) WHERE is_low_stock;
@@ -0,0 +1,6 @@
+-- Unread notification counters are cached per user (Redis or in-process) and
+-- rebuilt from the table on a cache miss or by the periodic reconcile task.
+-- This partial index keeps those COUNT / GROUP BY queries on unread rows only.
+CREATE INDEX IF NOT EXISTS idx_notifications_user_unread
+    ON notifications(user_id)
+    WHERE is_read = FALSE;
@@ -0,0 +1,5 @@
+-- Batched notification fan-out (notify_users) skips users who already received the
+-- same (type, entity_type, entity_id) within the dedupe window. The NOT EXISTS probe
+-- for each recipient is answered from this index.
+CREATE INDEX IF NOT EXISTS idx_notifications_dedupe
+    ON notifications(user_id, type, entity_id, created_at);
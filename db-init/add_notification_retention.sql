@@ -0,0 +1,14 @@
+-- Notification list and retention.
+-- GET /api/notifications reads one user's newest rows and pages older ones by
+-- (created_at, id); this composite index serves both without a sort. It also
+-- covers lookups by user_id alone, and unread lookups use idx_notifications_user_unread,
+-- so the single-column user_id and is_read indexes are dropped.
+CREATE INDEX IF NOT EXISTS idx_notifications_user_created
+    ON notifications(user_id, created_at DESC, id DESC);
+
+DROP INDEX IF EXISTS idx_notifications_user_id;
+DROP INDEX IF EXISTS idx_notifications_is_read;
+
+-- Read notifications older than NOTIFICATION_RETENTION_DAYS (default 90) are deleted
+-- daily by the purge-read-notifications beat task. First run on a large table:
+--   docker-compose exec backend flask purge-notifications --days 90
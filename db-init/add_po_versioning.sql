@@ -0,0 +1,4 @@
+-- Optimistic concurrency control for purchase order workflow transitions.
+-- Every transition runs: UPDATE ... WHERE id = :id AND status = :from AND version = :v
+-- and bumps version, so concurrent approve/reject clicks cannot both succeed.
+ALTER TABLE purchase_orders ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
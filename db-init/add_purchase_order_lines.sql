@@ -0,0 +1,18 @@
+-- Purchase order lines.
+-- Written by the replenishment engine (app/utils/replenishment.py) for the draft
+-- purchase orders it creates; quantities on open orders count as on order.
+CREATE TABLE IF NOT EXISTS purchase_order_lines (
+    id SERIAL PRIMARY KEY,
+    purchase_order_id INTEGER NOT NULL REFERENCES purchase_orders(id) ON DELETE CASCADE,
+    item_id INTEGER NOT NULL REFERENCES items(id),
+    location_id INTEGER REFERENCES locations(id),  -- Location the quantity is meant to restock
+    quantity INTEGER NOT NULL CHECK (quantity > 0),
+    unit_price NUMERIC(10, 2) NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_purchase_order_lines_order ON purchase_order_lines(purchase_order_id);
+CREATE INDEX IF NOT EXISTS idx_purchase_order_lines_item_location ON purchase_order_lines(item_id, location_id);
+
+-- Grant permissions
+GRANT ALL ON purchase_order_lines TO inventory_user;
+GRANT USAGE, SELECT ON SEQUENCE purchase_order_lines_id_seq TO inventory_user;
@@ -0,0 +1,63 @@
+-- Append-only stock movement ledger with periodic snapshots.
+-- Every stock / stock_locations quantity change is written to stock_movements in the
+-- same transaction (app/utils/stock_ledger.py). The snapshot-stock-ledger beat task
+-- stores all non-zero balances in stock_snapshots, so "on hand as of D" reads one
+-- snapshot run and replays the movements after its watermark.
+CREATE TABLE IF NOT EXISTS stock_movements (
+    id BIGSERIAL PRIMARY KEY,
+    item_id INTEGER NOT NULL,  -- Plain ids: history outlives deleted items and places
+    warehouse_id INTEGER,  -- Warehouse-level stock (stock table)
+    location_id INTEGER,  -- Location-level stock (stock_locations table)
+    delta INTEGER NOT NULL,
+    quantity_after INTEGER NOT NULL,
+    reason VARCHAR(30) NOT NULL,  -- adjustment, count, transfer, deleted, opening_balance, reconciliation, other
+    ref_type VARCHAR(50),
+    ref_id INTEGER,
+    user_id INTEGER,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS stock_snapshot_runs (
+    id SERIAL PRIMARY KEY,
+    watermark BIGINT NOT NULL DEFAULT 0,  -- Last stock_movements.id included
+    covered_until TIMESTAMP NOT NULL,
+    row_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS stock_snapshots (
+    id BIGSERIAL PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES stock_snapshot_runs(id) ON DELETE CASCADE,
+    item_id INTEGER NOT NULL,
+    warehouse_id INTEGER,
+    location_id INTEGER,
+    quantity INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_stock_movements_item ON stock_movements(item_id, id);
+CREATE INDEX IF NOT EXISTS idx_stock_movements_warehouse ON stock_movements(warehouse_id, id) WHERE warehouse_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_stock_movements_location ON stock_movements(location_id, id) WHERE location_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_stock_movements_created ON stock_movements(created_at);
+CREATE INDEX IF NOT EXISTS idx_stock_snapshot_runs_covered ON stock_snapshot_runs(covered_until);
+CREATE INDEX IF NOT EXISTS idx_stock_snapshots_run_item ON stock_snapshots(run_id, item_id);
+
+-- Opening balances for stock that existed before the ledger
+INSERT INTO stock_movements (item_id, warehouse_id, delta, quantity_after, reason)
+SELECT item_id, warehouse_id, quantity, quantity, 'opening_balance'
+FROM stock
+WHERE quantity <> 0
+  AND NOT EXISTS (SELECT 1 FROM stock_movements);
+
+INSERT INTO stock_movements (item_id, location_id, delta, quantity_after, reason)
+SELECT item_id, location_id, quantity, quantity, 'opening_balance'
+FROM stock_locations
+WHERE quantity <> 0
+  AND NOT EXISTS (SELECT 1 FROM stock_movements WHERE location_id IS NOT NULL);
+
+-- Grant permissions
+GRANT ALL ON stock_movements TO inventory_user;
+GRANT ALL ON stock_snapshot_runs TO inventory_user;
+GRANT ALL ON stock_snapshots TO inventory_user;
+GRANT USAGE, SELECT ON SEQUENCE stock_movements_id_seq TO inventory_user;
+GRANT USAGE, SELECT ON SEQUENCE stock_snapshot_runs_id_seq TO inventory_user;
+GRANT USAGE, SELECT ON SEQUENCE stock_snapshots_id_seq TO inventory_user;
@@ -0,0 +1,33 @@
+-- Daily on-hand snapshots for trend reporting.
+-- The snapshot-daily-stock beat task appends every non-zero stock / stock_locations
+-- quantity once per UTC day (app/utils/stock_trends.py). Rows are never updated;
+-- old days are deleted down to one per week, then one per month.
+CREATE TABLE IF NOT EXISTS stock_daily_snapshots (
+    id BIGSERIAL PRIMARY KEY,
+    snapshot_date DATE NOT NULL,
+    item_id INTEGER NOT NULL,
+    warehouse_id INTEGER,  -- Warehouse-level stock (stock table)
+    location_id INTEGER,  -- Location-level stock (stock_locations table)
+    quantity INTEGER NOT NULL
+);
+
+-- Rows arrive in date order, so a BRIN index covers date-range scans at a tiny size
+CREATE INDEX IF NOT EXISTS idx_stock_daily_snapshots_date ON stock_daily_snapshots USING BRIN (snapshot_date);
+CREATE INDEX IF NOT EXISTS idx_stock_daily_snapshots_item ON stock_daily_snapshots(item_id, snapshot_date);
+
+-- Drop duplicates written by overlapping captures before the unique index (keeps the first row)
+DELETE FROM stock_daily_snapshots a
+USING stock_daily_snapshots b
+WHERE a.id > b.id
+  AND a.snapshot_date = b.snapshot_date
+  AND a.item_id = b.item_id
+  AND COALESCE(a.warehouse_id, 0) = COALESCE(b.warehouse_id, 0)
+  AND COALESCE(a.location_id, 0) = COALESCE(b.location_id, 0);
+
+-- One row per stock record per day, so a retried or overlapping capture cannot write a day twice
+CREATE UNIQUE INDEX IF NOT EXISTS uq_stock_daily_snapshots_record
+    ON stock_daily_snapshots(snapshot_date, item_id, COALESCE(warehouse_id, 0), COALESCE(location_id, 0));
+
+-- Grant permissions
+GRANT ALL ON stock_daily_snapshots TO inventory_user;
+GRANT USAGE, SELECT ON SEQUENCE stock_daily_snapshots_id_seq TO inventory_user;
@@ -0,0 +1,23 @@
+-- Supplier scorecards, maintained incrementally by the approval workflow
+CREATE TABLE IF NOT EXISTS supplier_scorecards (
+    supplier_id INTEGER PRIMARY KEY REFERENCES suppliers(id) ON DELETE CASCADE,
+    sent_orders INTEGER NOT NULL DEFAULT 0,
+    delivered_orders INTEGER NOT NULL DEFAULT 0,
+    on_time_eligible INTEGER NOT NULL DEFAULT 0,  -- delivered orders that had an expected date
+    on_time_orders INTEGER NOT NULL DEFAULT 0,
+    total_delivery_days INTEGER NOT NULL DEFAULT 0,
+    delivery_days_orders INTEGER NOT NULL DEFAULT 0,  -- delivered orders with a sent date (avg_delivery_days denominator)
+    total_spend NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    on_time_rate DOUBLE PRECISION,
+    avg_delivery_days DOUBLE PRECISION,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Tables created before delivery_days_orders existed
+ALTER TABLE supplier_scorecards ADD COLUMN IF NOT EXISTS delivery_days_orders INTEGER NOT NULL DEFAULT 0;
+
+-- Backfill from existing purchase orders (and after adding the column above) with:
+--   docker-compose exec backend flask rebuild-scorecards
+
+-- Grant permissions
+GRANT ALL ON supplier_scorecards TO inventory_user;
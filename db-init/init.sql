@@ -98,6 +98,7 @@ CREATE TABLE IF NOT EXISTS stock (
     item_id INTEGER NOT NULL REFERENCES items(id) ON DELETE CASCADE,
     warehouse_id INTEGER NOT NULL REFERENCES warehouses(id) ON DELETE CASCADE,
     quantity INTEGER NOT NULL DEFAULT 0,
+    is_low_stock BOOLEAN NOT NULL DEFAULT FALSE,  -- quantity < items.reorder_level, maintained by the application
     last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     UNIQUE(item_id, warehouse_id)
 );
@@ -110,6 +111,7 @@ CREATE TABLE IF NOT EXISTS stock_locations (
     quantity INTEGER NOT NULL DEFAULT 0,
     min_threshold INTEGER DEFAULT 10,
     max_threshold INTEGER,
+    is_low_stock BOOLEAN GENERATED ALWAYS AS (quantity < min_threshold) STORED,
     last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_by INTEGER REFERENCES users(id),
     UNIQUE(item_id, location_id),
@@ -130,6 +132,48 @@ CREATE TABLE IF NOT EXISTS stock_transfers (
     CHECK (quantity > 0)
 );
 
+-- Stock Movements table (append-only ledger of every stock quantity change)
+CREATE TABLE IF NOT EXISTS stock_movements (
+    id BIGSERIAL PRIMARY KEY,
+    item_id INTEGER NOT NULL,  -- Plain ids: history outlives deleted items and places
+    warehouse_id INTEGER,  -- Warehouse-level stock (stock table)
+    location_id INTEGER,  -- Location-level stock (stock_locations table)
+    delta INTEGER NOT NULL,
+    quantity_after INTEGER NOT NULL,
+    reason VARCHAR(30) NOT NULL,  -- adjustment, count, transfer, deleted, opening_balance, reconciliation, other
+    ref_type VARCHAR(50),
+    ref_id INTEGER,
+    user_id INTEGER,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Stock Snapshot Runs / Stock Snapshots tables (periodic ledger balances)
+CREATE TABLE IF NOT EXISTS stock_snapshot_runs (
+    id SERIAL PRIMARY KEY,
+    watermark BIGINT NOT NULL DEFAULT 0,  -- Last stock_movements.id included
+    covered_until TIMESTAMP NOT NULL,
+    row_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS stock_snapshots (
+    id BIGSERIAL PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES stock_snapshot_runs(id) ON DELETE CASCADE,
+    item_id INTEGER NOT NULL,
+    warehouse_id INTEGER,
+    location_id INTEGER,
+    quantity INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS stock_daily_snapshots (
+    id BIGSERIAL PRIMARY KEY,
+    snapshot_date DATE NOT NULL,
+    item_id INTEGER NOT NULL,
+    warehouse_id INTEGER,
+    location_id INTEGER,
+    quantity INTEGER NOT NULL
+);
+
 -- ===================================================================
 -- ORDER MANAGEMENT TABLES
 -- ===================================================================
@@ -146,6 +190,7 @@ CREATE TABLE IF NOT EXISTS purchase_orders (
     total_amount NUMERIC(10, 2),
     created_by INTEGER REFERENCES users(id),
     -- Approval workflow fields
+    submitted_date TIMESTAMP,
     approved_by INTEGER REFERENCES users(id),
     approved_date TIMESTAMP,
     rejected_by INTEGER REFERENCES users(id),
@@ -156,12 +201,24 @@ CREATE TABLE IF NOT EXISTS purchase_orders (
     expected_delivery_date DATE,
     actual_delivery_date DATE,
     comments TEXT,
+    -- Optimistic concurrency control (bumped on every workflow transition)
+    version INTEGER NOT NULL DEFAULT 1,
     CONSTRAINT chk_po_status CHECK (status IN ('draft', 'pending_approval', 'approved', 'rejected', 'sent', 'delivered', 'cancelled'))
 );
 
 COMMENT ON COLUMN purchase_orders.expected_delivery_date IS 'Expected delivery date from supplier';
 COMMENT ON COLUMN purchase_orders.actual_delivery_date IS 'Actual date when order was delivered';
 
+-- Purchase order lines (written by the replenishment engine)
+CREATE TABLE IF NOT EXISTS purchase_order_lines (
+    id SERIAL PRIMARY KEY,
+    purchase_order_id INTEGER NOT NULL REFERENCES purchase_orders(id) ON DELETE CASCADE,
+    item_id INTEGER NOT NULL REFERENCES items(id),
+    location_id INTEGER REFERENCES locations(id),
+    quantity INTEGER NOT NULL CHECK (quantity > 0),
+    unit_price NUMERIC(10, 2) NOT NULL
+);
+
 -- Approval History table
 CREATE TABLE IF NOT EXISTS approval_history (
     id SERIAL PRIMARY KEY,
@@ -186,6 +243,30 @@ CREATE TABLE IF NOT EXISTS sales_orders (
     CONSTRAINT chk_so_status CHECK (status IN ('pending', 'processing', 'shipped', 'delivered', 'cancelled'))
 );
 
+-- Supplier Scorecards table (incrementally maintained supplier KPIs)
+CREATE TABLE IF NOT EXISTS supplier_scorecards (
+    supplier_id INTEGER PRIMARY KEY REFERENCES suppliers(id) ON DELETE CASCADE,
+    sent_orders INTEGER NOT NULL DEFAULT 0,
+    delivered_orders INTEGER NOT NULL DEFAULT 0,
+    on_time_eligible INTEGER NOT NULL DEFAULT 0,
+    on_time_orders INTEGER NOT NULL DEFAULT 0,
+    total_delivery_days INTEGER NOT NULL DEFAULT 0,
+    delivery_days_orders INTEGER NOT NULL DEFAULT 0,  -- delivered orders with a sent date (avg_delivery_days denominator)
+    total_spend NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    on_time_rate DOUBLE PRECISION,
+    avg_delivery_days DOUBLE PRECISION,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Dashboard Summary table (precomputed totals; warehouse_id 0 = all warehouses)
+CREATE TABLE IF NOT EXISTS dashboard_summary (
+    warehouse_id INTEGER PRIMARY KEY,
+    total_items INTEGER NOT NULL DEFAULT 0,
+    total_stock BIGINT NOT NULL DEFAULT 0,
+    low_stock_items INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- ===================================================================
 -- SYSTEM TABLES
 -- ===================================================================
@@ -203,16 +284,32 @@ CREATE TABLE IF NOT EXISTS notifications (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Audit Logs table
+-- Audit Logs table (monthly range partitions audit_logs_YYYY_MM, created by
+-- ensure_audit_log_partitions; audit_logs_default catches anything outside them)
 CREATE TABLE IF NOT EXISTS audit_logs (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     user_id INTEGER REFERENCES users(id),
     action VARCHAR(100) NOT NULL,
     entity_type VARCHAR(50),
     entity_id INTEGER,
     details TEXT,
-    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+CREATE TABLE IF NOT EXISTS audit_logs_default PARTITION OF audit_logs DEFAULT;
+
+-- Audit Logs Archive table (partitions past the retention period, detached from audit_logs)
+CREATE TABLE IF NOT EXISTS audit_logs_archive (
+    id INTEGER NOT NULL,
+    user_id INTEGER,
+    action VARCHAR(100) NOT NULL,
+    entity_type VARCHAR(50),
+    entity_id INTEGER,
+    details TEXT,
+    timestamp TIMESTAMP NOT NULL,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
 
 -- Import Jobs table
 CREATE TABLE IF NOT EXISTS import_jobs (
@@ -230,6 +327,22 @@ CREATE TABLE IF NOT EXISTS import_jobs (
     CONSTRAINT chk_import_status CHECK (status IN ('pending', 'processing', 'completed', 'failed'))
 );
 
+-- Email Outbox table (transactional outbox drained by Celery)
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id SERIAL PRIMARY KEY,
+    to_email VARCHAR(120) NOT NULL,
+    subject VARCHAR(255) NOT NULL,
+    body TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    claimed_at TIMESTAMP,
+    sent_at TIMESTAMP,
+    CONSTRAINT chk_email_outbox_status CHECK (status IN ('pending', 'sending', 'sent', 'failed'))
+);
+
 -- ===================================================================
 -- VIEWS
 -- ===================================================================
@@ -310,6 +423,99 @@ CREATE TRIGGER stock_locations_update_timestamp
     FOR EACH ROW
     EXECUTE FUNCTION update_stock_location_timestamp();
 
+-- Create (if missing) the partition holding the month of month_start.
+-- Rows that landed in the default partition for that month are moved into it.
+CREATE OR REPLACE FUNCTION create_audit_log_partition(month_start DATE)
+RETURNS TEXT AS $$
+DECLARE
+    range_start DATE := date_trunc('month', month_start)::DATE;
+    range_end DATE := (date_trunc('month', month_start) + INTERVAL '1 month')::DATE;
+    partition_name TEXT := 'audit_logs_' || to_char(month_start, 'YYYY_MM');
+    has_default BOOLEAN := to_regclass('audit_logs_default') IS NOT NULL;
+    default_rows BOOLEAN := FALSE;
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    IF has_default THEN
+        EXECUTE format(
+            'SELECT EXISTS (SELECT 1 FROM audit_logs_default WHERE timestamp >= %L AND timestamp < %L)',
+            range_start, range_end
+        ) INTO default_rows;
+    END IF;
+
+    IF default_rows THEN
+        ALTER TABLE audit_logs DETACH PARTITION audit_logs_default;
+    END IF;
+
+    EXECUTE format(
+        'CREATE TABLE %I PARTITION OF audit_logs FOR VALUES FROM (%L) TO (%L)',
+        partition_name, range_start, range_end
+    );
+
+    IF default_rows THEN
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM audit_logs_default WHERE timestamp >= %L AND timestamp < %L RETURNING *) '
+            'INSERT INTO audit_logs SELECT * FROM moved',
+            range_start, range_end
+        );
+        ALTER TABLE audit_logs ATTACH PARTITION audit_logs_default DEFAULT;
+    END IF;
+
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Make sure partitions exist for the current month and the next months_ahead months
+CREATE OR REPLACE FUNCTION ensure_audit_log_partitions(months_ahead INTEGER DEFAULT 2)
+RETURNS INTEGER AS $$
+DECLARE
+    offset_months INTEGER;
+BEGIN
+    FOR offset_months IN 0..months_ahead LOOP
+        PERFORM create_audit_log_partition((date_trunc('month', CURRENT_DATE) + make_interval(months => offset_months))::DATE);
+    END LOOP;
+    RETURN months_ahead + 1;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Move every monthly partition that ends on or before cutoff from audit_logs to
+-- audit_logs_archive. Detaching is a catalog change; no rows are copied.
+CREATE OR REPLACE FUNCTION archive_audit_log_partitions(cutoff DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    part RECORD;
+    range_start DATE;
+    archived INTEGER := 0;
+BEGIN
+    FOR part IN
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'audit_logs'
+          AND child.relname ~ '^audit_logs_[0-9]{4}_[0-9]{2}$'
+        ORDER BY child.relname
+    LOOP
+        range_start := to_date(substring(part.relname FROM '([0-9]{4}_[0-9]{2})$'), 'YYYY_MM');
+        IF (range_start + INTERVAL '1 month')::DATE > cutoff THEN
+            CONTINUE;
+        END IF;
+        EXECUTE format('ALTER TABLE audit_logs DETACH PARTITION %I', part.relname);
+        EXECUTE format(
+            'ALTER TABLE audit_logs_archive ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+            part.relname, range_start, (range_start + INTERVAL '1 month')::DATE
+        );
+        archived := archived + 1;
+    END LOOP;
+    RETURN archived;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Partitions for the current and next two months
+SELECT ensure_audit_log_partitions(2);
+
 -- ===================================================================
 -- INDEXES
 -- ===================================================================
@@ -323,19 +529,39 @@ CREATE INDEX IF NOT EXISTS idx_items_supplier ON items(supplier_id);
 -- Stock indexes
 CREATE INDEX IF NOT EXISTS idx_stock_item ON stock(item_id);
 CREATE INDEX IF NOT EXISTS idx_stock_warehouse ON stock(warehouse_id);
+CREATE INDEX IF NOT EXISTS idx_stock_low ON stock(id) WHERE is_low_stock;
+CREATE INDEX IF NOT EXISTS idx_stock_low_warehouse ON stock(warehouse_id, id) WHERE is_low_stock;
 
 -- Stock Locations indexes
 CREATE INDEX IF NOT EXISTS idx_stock_locations_item ON stock_locations(item_id);
 CREATE INDEX IF NOT EXISTS idx_stock_locations_location ON stock_locations(location_id);
+CREATE INDEX IF NOT EXISTS idx_stock_locations_low ON stock_locations(id) WHERE is_low_stock;
+CREATE INDEX IF NOT EXISTS idx_stock_locations_low_location ON stock_locations(location_id, id) WHERE is_low_stock;
 
 -- Stock Transfers indexes
 CREATE INDEX IF NOT EXISTS idx_stock_transfers_item ON stock_transfers(item_id);
 CREATE INDEX IF NOT EXISTS idx_stock_transfers_date ON stock_transfers(transfer_date);
 
+-- Stock Ledger indexes
+CREATE INDEX IF NOT EXISTS idx_stock_movements_item ON stock_movements(item_id, id);
+CREATE INDEX IF NOT EXISTS idx_stock_movements_warehouse ON stock_movements(warehouse_id, id) WHERE warehouse_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_stock_movements_location ON stock_movements(location_id, id) WHERE location_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_stock_movements_created ON stock_movements(created_at);
+CREATE INDEX IF NOT EXISTS idx_stock_snapshot_runs_covered ON stock_snapshot_runs(covered_until);
+CREATE INDEX IF NOT EXISTS idx_stock_snapshots_run_item ON stock_snapshots(run_id, item_id);
+CREATE INDEX IF NOT EXISTS idx_stock_daily_snapshots_date ON stock_daily_snapshots USING BRIN (snapshot_date);
+CREATE INDEX IF NOT EXISTS idx_stock_daily_snapshots_item ON stock_daily_snapshots(item_id, snapshot_date);
+-- One row per stock record per day, so a retried or overlapping capture cannot write a day twice
+CREATE UNIQUE INDEX IF NOT EXISTS uq_stock_daily_snapshots_record
+    ON stock_daily_snapshots(snapshot_date, item_id, COALESCE(warehouse_id, 0), COALESCE(location_id, 0));
+
 -- Purchase Orders indexes
 CREATE INDEX IF NOT EXISTS idx_purchase_orders_status ON purchase_orders(status);
 CREATE INDEX IF NOT EXISTS idx_purchase_orders_supplier ON purchase_orders(supplier_id);
+CREATE INDEX IF NOT EXISTS idx_purchase_order_lines_order ON purchase_order_lines(purchase_order_id);
+CREATE INDEX IF NOT EXISTS idx_purchase_order_lines_item_location ON purchase_order_lines(item_id, location_id);
 CREATE INDEX IF NOT EXISTS idx_purchase_orders_warehouse ON purchase_orders(warehouse_id);
+CREATE INDEX IF NOT EXISTS idx_purchase_orders_pending_inbox ON purchase_orders(submitted_date, id) WHERE status = 'pending_approval';
 
 -- Approval History indexes
 CREATE INDEX IF NOT EXISTS idx_approval_history_po ON approval_history(purchase_order_id);
@@ -346,19 +572,26 @@ CREATE INDEX IF NOT EXISTS idx_sales_orders_status ON sales_orders(status);
 CREATE INDEX IF NOT EXISTS idx_sales_orders_warehouse ON sales_orders(warehouse_id);
 
 -- Notifications indexes
-CREATE INDEX IF NOT EXISTS idx_notifications_user_id ON notifications(user_id);
-CREATE INDEX IF NOT EXISTS idx_notifications_is_read ON notifications(is_read);
+CREATE INDEX IF NOT EXISTS idx_notifications_user_created ON notifications(user_id, created_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_notifications_created_at ON notifications(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_notifications_user_unread ON notifications(user_id) WHERE is_read = FALSE;
+CREATE INDEX IF NOT EXISTS idx_notifications_dedupe ON notifications(user_id, type, entity_id, created_at);
 
 -- Audit Logs indexes
 CREATE INDEX IF NOT EXISTS idx_audit_logs_user ON audit_logs(user_id);
-CREATE INDEX IF NOT EXISTS idx_audit_logs_timestamp ON audit_logs(timestamp);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_timestamp_id ON audit_logs(timestamp DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_audit_logs_entity ON audit_logs(entity_type, entity_id);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_details_fts ON audit_logs USING GIN (to_tsvector('simple', coalesce(details, '')));
+CREATE INDEX IF NOT EXISTS idx_audit_logs_archive_timestamp_id ON audit_logs_archive(timestamp DESC, id DESC);
 
 -- Import Jobs indexes
 CREATE INDEX IF NOT EXISTS idx_import_jobs_status ON import_jobs(status);
 CREATE INDEX IF NOT EXISTS idx_import_jobs_created_by ON import_jobs(created_by);
 
+-- Email Outbox indexes
+CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox(next_attempt_at) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_email_outbox_sending ON email_outbox(claimed_at) WHERE status = 'sending';
+
 -- ===================================================================
 -- DEFAULT DATA
 -- ===================================================================
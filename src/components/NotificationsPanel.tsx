@@ -11,7 +11,7 @@ import {
   DropdownMenuSeparator,
   DropdownMenuTrigger,
 } from '@/components/ui/dropdown-menu';
-import { api } from '@/lib/api';
+import { api, openNotificationStream } from '@/lib/api';
 
 interface Notification {
   id: number;
@@ -47,9 +47,34 @@ export const NotificationsPanel = () => {
 
   useEffect(() => {
     fetchNotifications();
-    // Poll for new notifications every 30 seconds
-    const interval = setInterval(fetchNotifications, 30000);
-    return () => clearInterval(interval);
+
+    // New notifications are pushed over Server-Sent Events; poll every 30 seconds only if the stream is unavailable
+    let interval: ReturnType<typeof setInterval> | undefined;
+    const startPolling = () => {
+      if (!interval) interval = setInterval(fetchNotifications, 30000);
+    };
+
+    const source = openNotificationStream();
+    if (source) {
+      source.addEventListener('notification', (event) => {
+        const { unread_count, ...notification } = JSON.parse((event as MessageEvent).data);
+        setNotifications(prev => [notification, ...prev.filter(n => n.id !== notification.id)].slice(0, 50));
+        setUnreadCount(prev => unread_count ?? prev + 1);
+      });
+      source.addEventListener('unread_count', (event) => {
+        setUnreadCount(JSON.parse((event as MessageEvent).data).count);
+      });
+      source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) startPolling();
+      };
+    } else {
+      startPolling();
+    }
+
+    return () => {
+      source?.close();
+      if (interval) clearInterval(interval);
+    };
   }, []);
 
   const fetchNotifications = async () => {
@@ -3,17 +3,25 @@ import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogDescription } f
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '@/components/ui/table';
 import { Button } from '@/components/ui/button';
 import { Badge } from '@/components/ui/badge';
-import { api } from '@/lib/api';
+import { reportsApi } from '@/lib/api';
 import { Download, AlertTriangle } from 'lucide-react';
 import { Skeleton } from '@/components/ui/skeleton';
 
 interface LowStockItem {
   id: number;
+  stock_id: number;
   sku: string;
   name: string;
   current_stock: number;
   reorder_level: number;
   warehouse_id: number;
+  warehouse_name?: string;
+}
+
+interface LowStockPage {
+  items: LowStockItem[];
+  next_cursor: string | null;
+  total: number;
 }
 
 interface LowStockModalProps {
@@ -23,6 +31,8 @@ interface LowStockModalProps {
 
 export const LowStockModal = ({ isOpen, onClose }: LowStockModalProps) => {
   const [items, setItems] = useState<LowStockItem[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [total, setTotal] = useState(0);
   const [isLoading, setIsLoading] = useState(false);
 
   useEffect(() => {
@@ -31,11 +41,13 @@ export const LowStockModal = ({ isOpen, onClose }: LowStockModalProps) => {
     }
   }, [isOpen]);
 
-  const fetchLowStockItems = async () => {
+  const fetchLowStockItems = async (cursor?: string) => {
     setIsLoading(true);
     try {
-      const data = await api.get<LowStockItem[]>('/reports/low-stock');
-      setItems(data);
+      const data: LowStockPage = await reportsApi.getLowStock({ limit: 100, ...(cursor && { cursor }) });
+      setItems(prev => (cursor ? [...prev, ...data.items] : data.items));
+      setNextCursor(data.next_cursor);
+      setTotal(data.total);
     } catch (error) {
       console.error('Failed to fetch low stock items:', error);
     } finally {
@@ -44,11 +56,11 @@ export const LowStockModal = ({ isOpen, onClose }: LowStockModalProps) => {
   };
 
   const exportToCSV = () => {
-    const headers = ['SKU', 'Name', 'Current Stock', 'Reorder Level', 'Warehouse ID'];
+    const headers = ['SKU', 'Name', 'Current Stock', 'Reorder Level', 'Warehouse ID', 'Warehouse'];
     const csvContent = [
       headers.join(','),
       ...items.map(item => 
-        [item.sku, item.name, item.current_stock, item.reorder_level, item.warehouse_id].join(',')
+        [item.sku, item.name, item.current_stock, item.reorder_level, item.warehouse_id, item.warehouse_name ?? ''].join(',')
       )
     ].join('\n');
 
@@ -76,7 +88,9 @@ export const LowStockModal = ({ isOpen, onClose }: LowStockModalProps) => {
             <AlertTriangle className="h-5 w-5 text-orange-500" />
             Low Stock Items
           </DialogTitle>
-          <DialogDescription>Items that are below their reorder threshold</DialogDescription>
+          <DialogDescription>
+            Items that are below their reorder threshold{total > 0 ? ` (${items.length} of ${total})` : ''}
+          </DialogDescription>
         </DialogHeader>
 
         <div className="flex justify-end mb-4">
@@ -87,7 +101,7 @@ export const LowStockModal = ({ isOpen, onClose }: LowStockModalProps) => {
         </div>
 
         <div className="flex-1 overflow-auto">
-          {isLoading ? (
+          {isLoading && items.length === 0 ? (
             <div className="space-y-2">
               {[...Array(5)].map((_, i) => (
                 <Skeleton key={i} className="h-12 w-full" />
@@ -105,6 +119,7 @@ export const LowStockModal = ({ isOpen, onClose }: LowStockModalProps) => {
                   <TableHead>Name</TableHead>
                   <TableHead>Current Stock</TableHead>
                   <TableHead>Reorder Level</TableHead>
+                  <TableHead>Warehouse</TableHead>
                   <TableHead>Status</TableHead>
                 </TableRow>
               </TableHeader>
@@ -112,11 +127,12 @@ export const LowStockModal = ({ isOpen, onClose }: LowStockModalProps) => {
                 {items.map((item) => {
                   const status = getStockLevel(item.current_stock, item.reorder_level);
                   return (
-                    <TableRow key={item.id}>
+                    <TableRow key={item.stock_id}>
                       <TableCell className="font-mono">{item.sku}</TableCell>
                       <TableCell>{item.name}</TableCell>
                       <TableCell className="font-semibold">{item.current_stock}</TableCell>
                       <TableCell>{item.reorder_level}</TableCell>
+                      <TableCell>{item.warehouse_name ?? item.warehouse_id}</TableCell>
                       <TableCell>
                         <Badge variant={status.variant}>{status.label}</Badge>
                       </TableCell>
@@ -126,6 +142,13 @@ export const LowStockModal = ({ isOpen, onClose }: LowStockModalProps) => {
               </TableBody>
             </Table>
           )}
+          {nextCursor && (
+            <div className="flex justify-center py-4">
+              <Button variant="outline" size="sm" disabled={isLoading} onClick={() => fetchLowStockItems(nextCursor)}>
+                Load more
+              </Button>
+            </div>
+          )}
         </div>
       </DialogContent>
     </Dialog>
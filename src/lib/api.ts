@@ -1,4 +1,5 @@
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:5000/api';
+const STREAM_URL = import.meta.env.VITE_STREAM_URL || 'http://localhost:5001/api';
 
 class ApiClient {
   private getToken(): string | null {
@@ -166,11 +167,33 @@ export const suppliersApi = {
   exportOrders: (id: number) => api.downloadFile(`/suppliers/${id}/orders/export`),
 };
 
+// Notifications stream (Server-Sent Events; EventSource cannot send headers)
+export const openNotificationStream = (): EventSource | null => {
+  const token = localStorage.getItem('token');
+  if (!token || typeof EventSource === 'undefined') return null;
+  return new EventSource(`${STREAM_URL}/notifications/stream?token=${encodeURIComponent(token)}`);
+};
+
 // Orders API
 export const ordersApi = {
   getPurchaseOrders: () => api.get<any[]>('/orders/purchase'),
   getPurchaseOrderById: (id: number) => api.get<any>(`/orders/purchase/${id}`),
   createPurchaseOrder: (data: any) => api.post<any>('/orders/purchase', data),
+  getReplenishmentSuggestions: (params?: {
+    location_id?: number;
+    supplier_id?: number;
+    window_days?: number;
+    coverage_days?: number;
+    limit?: number;
+  }) =>
+    api.get<any>(`/orders/replenishment?${new URLSearchParams(params as any).toString()}`),
+  createReplenishmentOrders: (data: {
+    warehouse_id: number;
+    location_id?: number;
+    supplier_id?: number;
+    window_days?: number;
+    coverage_days?: number;
+  }) => api.post<any>('/orders/replenishment', data),
   getSalesOrders: () => api.get<any[]>('/orders/sales'),
   getSalesOrderById: (id: number) => api.get<any>(`/orders/sales/${id}`),
   createSalesOrder: (data: any) => api.post<any>('/orders/sales', data),
@@ -190,6 +213,12 @@ export const approvalsApi = {
     api.post<any>(`/approvals/purchase-order/${orderId}/deliver`, { comments }),
   getApprovalHistory: (orderId: number) =>
     api.get<any[]>(`/approvals/purchase-order/${orderId}/history`),
+  getApprovalHistories: (orderIds: number[]) =>
+    api.get<Record<string, any[]>>(`/approvals/purchase-orders/history?ids=${orderIds.join(',')}`),
+  bulkTransition: (orderIds: number[], status: string, comments?: string) =>
+    api.post<any>('/approvals/purchase-orders/bulk', { order_ids: orderIds, status, comments }),
+  getInbox: (params?: { limit?: number; cursor?: string; supplier_id?: number; warehouse_id?: number }) =>
+    api.get<any>(`/approvals/inbox?${new URLSearchParams(params as any).toString()}`),
 };
 
 // Locations API
@@ -209,16 +238,69 @@ export const locationsApi = {
     api.post<any>('/locations/transfer', data),
   getTransfers: (params?: { item_id?: number; location_id?: number; page?: number }) =>
     api.get<any>(`/locations/transfers?${new URLSearchParams(params as any).toString()}`),
+  getRebalancePlan: (params?: { item_id?: number; location_id?: number; limit?: number }) =>
+    api.get<any>(`/locations/rebalance?${new URLSearchParams(params as any).toString()}`),
+  executeRebalance: (data: {
+    transfers?: { item_id: number; from_location_id: number; to_location_id: number; quantity: number }[];
+    item_id?: number;
+    location_id?: number;
+  }) => api.post<any>('/locations/rebalance', data),
 };
 
 // Reports API
 export const reportsApi = {
-  getDashboard: () => api.get<any>('/reports/dashboard'),
-  getLowStock: (threshold?: number) =>
-    api.get<any[]>(`/reports/low-stock${threshold ? `?threshold=${threshold}` : ''}`),
+  getDashboard: (warehouseId?: number) =>
+    api.get<any>(`/reports/dashboard${warehouseId ? `?warehouse_id=${warehouseId}` : ''}`),
+  getLowStock: (params?: { warehouse_id?: number; limit?: number; cursor?: string }) =>
+    api.get<any>(`/reports/low-stock?${new URLSearchParams(params as any).toString()}`),
+  getLowStockLocations: (params?: { location_id?: number; limit?: number; cursor?: string }) =>
+    api.get<any>(`/reports/low-stock/locations?${new URLSearchParams(params as any).toString()}`),
+  getStockMovements: (params?: {
+    item_id?: number;
+    warehouse_id?: number;
+    location_id?: number;
+    reason?: string;
+    start_date?: string;
+    end_date?: string;
+    limit?: number;
+    cursor?: string;
+  }) =>
+    api.get<any>(`/reports/stock-movements?${new URLSearchParams(params as any).toString()}`),
+  getStockOnHand: (params?: {
+    as_of?: string;
+    item_id?: number;
+    warehouse_id?: number;
+    location_id?: number;
+    level?: 'warehouse' | 'location';
+  }) =>
+    api.get<any>(`/reports/stock-on-hand?${new URLSearchParams(params as any).toString()}`),
+  getStockTrends: (params?: {
+    days?: number;
+    bucket?: 'day' | 'week' | 'month';
+    group_by?: 'item' | 'category' | 'warehouse' | 'location' | 'total';
+    level?: 'warehouse' | 'location';
+    item_id?: number;
+    category_id?: number;
+    warehouse_id?: number;
+    location_id?: number;
+    limit?: number;
+  }) =>
+    api.get<any>(`/reports/stock-trends?${new URLSearchParams(params as any).toString()}`),
+  getAbcClassification: (params?: {
+    days?: number;
+    category_id?: number;
+    location_id?: number;
+    class?: 'A' | 'B' | 'C';
+    page?: number;
+    per_page?: number;
+  }) =>
+    api.get<any>(`/reports/abc-classification?${new URLSearchParams(params as any).toString()}`),
   getAuditLogs: (params?: { 
     page?: number; 
     per_page?: number;
+    cursor?: string;
+    count?: 'exact' | 'estimate' | 'none';
+    q?: string;
     user_id?: string;
     action?: string;
     entity_type?: string;
@@ -228,12 +310,14 @@ export const reportsApi = {
   }) =>
     api.get<any>(`/reports/audit-logs?${new URLSearchParams(params as any).toString()}`),
   exportAuditLogs: (params?: {
+    q?: string;
     user_id?: string;
     action?: string;
     entity_type?: string;
     entity_id?: string;
     start_date?: string;
     end_date?: string;
+    gzip?: string;
   }) =>
     api.downloadFile(`/reports/audit-logs/export?${new URLSearchParams(params as any).toString()}`),
 };
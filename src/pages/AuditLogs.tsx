@@ -19,6 +19,7 @@ export default function AuditLogs() {
   // Filter states
   const [showFilters, setShowFilters] = useState(false);
   const [filters, setFilters] = useState({
+    q: "",
     user_id: "",
     action: "",
     entity_type: "",
@@ -64,6 +65,7 @@ export default function AuditLogs() {
   
   const clearFilters = () => {
     setFilters({
+      q: "",
       user_id: "",
       action: "",
       entity_type: "",
@@ -134,6 +136,18 @@ export default function AuditLogs() {
             </CardHeader>
             <CardContent>
               <div className="grid grid-cols-1 md:grid-cols-3 gap-4">
+                <div className="space-y-2 md:col-span-3">
+                  <label className="text-sm font-medium">Search Details</label>
+                  <Input
+                    type="search"
+                    placeholder="Words in the details, e.g. ABC-123"
+                    value={filters.q}
+                    onChange={(e) => {
+                      setFilters({ ...filters, q: e.target.value });
+                      setPage(1);
+                    }}
+                  />
+                </div>
                 <div className="space-y-2">
                   <label className="text-sm font-medium">User ID</label>
                   <Input